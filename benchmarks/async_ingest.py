@@ -0,0 +1,115 @@
+"""
+Sync vs async ingest / latest-location endpoints under concurrent load,
+in-process through Django's AsyncClient (same ASGI handler as uvicorn).
+Any failed request exits 1: error responses would make the numbers
+meaningless.
+
+    python benchmarks/async_ingest.py --requests 2000 --concurrency 50
+    BENCH_DB=postgres python benchmarks/async_ingest.py   # real database
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+
+from users.models import EmployeeProfile, User  # noqa: E402
+from users.serializers import ClaimsTokenObtainPairSerializer  # noqa: E402
+
+
+def setup_users():
+    call_command("migrate", verbosity=0)
+    User.objects.filter(email__endswith="@bench.local").delete()
+
+    admin = User.objects.create_user(
+        email="admin@bench.local", password="x", name="Bench Admin", role="SUPERADMIN"
+    )
+    employee = User.objects.create_user(
+        email="employee@bench.local", password="x", name="Bench Employee", role="EMPLOYEE"
+    )
+    EmployeeProfile.objects.create(user=employee, admin=admin)
+
+    def bearer(user):
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        return f"Bearer {token}"
+
+    return employee, bearer(employee), bearer(admin)
+
+
+async def load(name, call, total, concurrency):
+    latencies = []
+    errors = 0
+    queue = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            started = time.perf_counter()
+            response = await call(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{name:<22}{total / elapsed:>9.0f} req/s   p50 {p50:>7.1f} ms   "
+          f"p99 {p99:>7.1f} ms   errors {errors}")
+    return errors
+
+
+async def run(total, concurrency):
+    employee, employee_auth, admin_auth = await sync_to_async(setup_users)()
+    client = AsyncClient()
+    base_millis = int(time.time() * 1000) - total * 2000
+
+    def send(path, offset):
+        async def call(i):
+            return await client.post(
+                path,
+                {"latitude": "23.810300", "longitude": "90.412500",
+                 "millis": base_millis + (offset + i) * 1000},
+                content_type="application/json",
+                headers={"Authorization": employee_auth},
+            )
+        return call
+
+    def latest(path):
+        async def call(i):
+            return await client.get(path, headers={"Authorization": admin_auth})
+        return call
+
+    errors = 0
+    errors += await load("sync  send", send("/api/locations/send/", 0), total, concurrency)
+    errors += await load("async send", send("/api/locations/async/send/", total), total, concurrency)
+
+    user_id = employee.id
+    errors += await load("sync  latest", latest(f"/api/locations/user/{user_id}/latest/"), total, concurrency)
+    errors += await load("async latest", latest(f"/api/locations/async/user/{user_id}/latest/"), total, concurrency)
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.requests, args.concurrency)))
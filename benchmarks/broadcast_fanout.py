@@ -0,0 +1,71 @@
+"""
+Request-path cost of a division broadcast: N employees in one division,
+time send_broadcast (Broadcast row + INSERT ... SELECT fan-out).
+
+    python benchmarks/broadcast_fanout.py --employees 10000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from messaging.broadcasts import send_broadcast  # noqa: E402
+from users.models import Division, EmployeeProfile, User  # noqa: E402
+
+
+def setup_division(count):
+    call_command("migrate", verbosity=0)
+    User.objects.filter(email__endswith="@bench.local").delete()
+    Division.objects.filter(name="Bench Division").delete()
+
+    division = Division.objects.create(name="Bench Division")
+    sender = User.objects.create_user(
+        email="broadcaster@bench.local", password="x", name="Bench Admin", role="SUPERADMIN"
+    )
+
+    password = make_password("x")
+    employees = User.objects.bulk_create(
+        [
+            User(
+                id=uuid.uuid4(),
+                email=f"employee{i}@bench.local",
+                name=f"Employee {i}",
+                role="EMPLOYEE",
+                password=password,
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    EmployeeProfile.objects.bulk_create(
+        [EmployeeProfile(user=user, division=division) for user in employees],
+        batch_size=1000,
+    )
+    return sender, division
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sender, division = setup_division(args.employees)
+
+    for run in range(args.runs):
+        started = time.perf_counter()
+        broadcast = send_broadcast(sender, division, f"Announcement {run}")
+        elapsed = time.perf_counter() - started
+        print(f"run {run}: {broadcast.recipient_count} recipients in {elapsed * 1000:.1f} ms")
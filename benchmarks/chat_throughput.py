@@ -0,0 +1,112 @@
+"""
+ChatConsumer throughput in one worker: P conversations, each sender
+pushing M messages through its socket; measures messages/sec until every
+echo is received, then how long the write buffer needs to persist them.
+
+    python benchmarks/chat_throughput.py --pairs 200 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from config.asgi import websocket_urlpatterns  # noqa: E402
+from messaging.buffer import get_write_buffer  # noqa: E402
+from messaging.models import Message  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+class BenchUser:
+    is_anonymous = False
+    is_authenticated = True
+    role = "SUPERADMIN"
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+def as_user(app, user_id):
+    async def middleware(scope, receive, send):
+        scope = dict(scope, user=BenchUser(user_id))
+        return await app(scope, receive, send)
+    return middleware
+
+
+def setup_users(pairs):
+    call_command("migrate", verbosity=0)
+    User.objects.filter(email__endswith="@bench.local").delete()
+
+    password = make_password("x")
+    users = User.objects.bulk_create([
+        User(
+            id=uuid.uuid4(),
+            email=f"chat{i}@bench.local",
+            name=f"Chat {i}",
+            role="SUPERADMIN",
+            password=password,
+        )
+        for i in range(pairs * 2)
+    ])
+    return [(users[i].id, users[i + 1].id) for i in range(0, len(users), 2)]
+
+
+async def run(pairs, messages):
+    conversations = await sync_to_async(setup_users)(pairs)
+    router = URLRouter(websocket_urlpatterns)
+
+    clients = [
+        WebsocketCommunicator(as_user(router, sender), f"/ws/chat/{receiver}/")
+        for sender, receiver in conversations
+    ]
+    await asyncio.gather(*(client.connect() for client in clients))
+
+    async def chat(client):
+        for i in range(messages):
+            await client.send_to(text_data=json.dumps({
+                "text": f"message {i}",
+                "client_id": str(uuid.uuid4()),
+            }))
+        for _ in range(messages):
+            json.loads(await client.receive_from(timeout=30))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(client) for client in clients))
+    elapsed = time.perf_counter() - started
+
+    buffer = get_write_buffer()
+    flush_started = time.perf_counter()
+    await buffer.drain()
+    flush_time = time.perf_counter() - flush_started
+
+    total = pairs * messages
+    stored = await Message.objects.filter(sender__email__endswith="@bench.local").acount()
+    print(f"messages   : {total} over {pairs} sockets")
+    print(f"delivered  : {elapsed:.2f}s ({total / elapsed:,.0f} msg/s per worker)")
+    print(f"persisted  : {stored} rows, buffer drained {flush_time * 1000:.0f} ms after the last echo")
+
+    await asyncio.gather(*(client.disconnect() for client in clients))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.pairs, args.messages))
@@ -0,0 +1,159 @@
+"""
+Rows/sec of the values_list() fast path against the ModelSerializers it
+replaces, for one large page per list endpoint (query + serialization).
+Both outputs are rendered with DRF's JSONRenderer and must match byte
+for byte; a mismatch exits 1.
+
+    python benchmarks/fast_serializers.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from locations.models import Attendance, LocationLog, Office  # noqa: E402
+from locations.serializers import (  # noqa: E402
+    AttendanceReportSerializer,
+    AttendanceReportValues,
+    LocationReadSerializer,
+    LocationReadValues,
+)
+from messaging.models import Message  # noqa: E402
+from messaging.serializers import MessageSerializer, MessageValues  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def setup(rows):
+    call_command("migrate", verbosity=0)
+    User.objects.filter(email__endswith="@fastpath.local").delete()
+    Office.objects.filter(name="Fastpath Office").delete()
+
+    password = make_password("x")
+    employee, admin = User.objects.bulk_create([
+        User(id=uuid.uuid4(), email="employee@fastpath.local", name="Fast Employee",
+             role="EMPLOYEE", password=password),
+        # blank name: exercises the email fallback of display_name
+        User(id=uuid.uuid4(), email="admin@fastpath.local", name="",
+             role="SUPERADMIN", password=password),
+    ])
+    office = Office.objects.create(name="Fastpath Office", latitude=23.810332, longitude=90.412518)
+
+    start = datetime(2026, 1, 1, 8, tzinfo=dt_timezone.utc)
+    LocationLog.objects.bulk_create([
+        LocationLog(
+            user=employee,
+            latitude=f"23.{810000 + i}",
+            longitude=f"90.{410000 + i}",
+            millis=int((start + timedelta(seconds=i)).timestamp() * 1000),
+            # a few fixes without device time
+            recorded_at=None if i % 997 == 0 else start + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ], batch_size=2000)
+
+    Attendance.objects.bulk_create([
+        Attendance(
+            user=employee,
+            office=office,
+            date=date(2000, 1, 1) + timedelta(days=i),
+            # absent, on time and late days
+            check_in=None if i % 7 == 0 else datetime.combine(
+                date(2000, 1, 1) + timedelta(days=i), datetime.min.time(), dt_timezone.utc
+            ) + timedelta(hours=9, minutes=i % 90),
+        )
+        for i in range(rows)
+    ], batch_size=2000)
+
+    Message.objects.bulk_create([
+        Message(
+            sender=employee if i % 2 else admin,
+            receiver=admin if i % 2 else employee,
+            text=f"message {i}",
+            client_id=uuid.uuid4() if i % 3 else None,
+            is_read=i % 5 == 0,
+        )
+        for i in range(rows)
+    ], batch_size=2000)
+
+    return employee
+
+
+def endpoints(employee):
+    return [
+        (
+            "locations",
+            LocationLog.objects.filter(user=employee).order_by("-recorded_at"),
+            LocationReadSerializer,
+            LocationReadValues,
+        ),
+        (
+            "attendance report",
+            Attendance.objects.filter(user=employee).select_related("office").order_by("date"),
+            AttendanceReportSerializer,
+            AttendanceReportValues,
+        ),
+        (
+            "messages",
+            Message.objects.filter(sender__email__endswith="@fastpath.local")
+            .select_related("sender", "receiver").order_by("id"),
+            MessageSerializer,
+            MessageValues,
+        ),
+    ]
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(rows, repeat):
+    employee = setup(rows)
+    renderer = JSONRenderer()
+    failed = 0
+
+    print(f"{'endpoint':<18} {'rows':>6} {'serializer':>14} {'fast path':>14} {'speedup':>8}")
+    for label, queryset, serializer_class, values_class in endpoints(employee):
+        slow, slow_data = best_of(
+            repeat, lambda: serializer_class(list(queryset.all()), many=True).data
+        )
+        fast, fast_data = best_of(
+            repeat, lambda: values_class.serialize(list(values_class.rows(queryset.all())))
+        )
+
+        same = renderer.render(slow_data) == renderer.render(fast_data)
+        failed += not same
+        count = len(fast_data)
+        print(
+            f"{label:<18} {count:>6} {count / slow:>10,.0f} r/s {count / fast:>10,.0f} r/s "
+            f"{slow / fast:>7.1f}x{'' if same else '  OUTPUT DIFFERS'}"
+        )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(run(args.rows, args.repeat))
@@ -0,0 +1,43 @@
+# Settings for the local benchmarks: SQLite (or BENCH_DB=postgres to keep
+# the configured database) and the in-process channel layer standing in
+# for Redis.
+import tempfile
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import REST_FRAMEWORK, config
+
+if config("BENCH_DB", default="sqlite") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            # a file, so executor threads share one database
+            "NAME": f"{tempfile.gettempdir()}/livetrack_bench.sqlite3",
+            "OPTIONS": {"timeout": 30},
+        }
+    }
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "CONFIG": {
+            "capacity": 1500,
+            "expiry": 10,
+        },
+    },
+}
+
+WEBSOCKET_CONNECTION_LIMITS = {}
+
+# Django's test clients send Host: testserver
+ALLOWED_HOSTS = ["testserver"]
+
+# benchmarks measure the views, not the throttle
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {
+        **REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
+        "gps": "1000000/min",
+    },
+}
+
+PUSH_BACKEND = "notifications.backends.FakeBackend"
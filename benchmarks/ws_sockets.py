@@ -0,0 +1,78 @@
+"""
+Live-map websocket load test: open N DivisionLocationConsumer sockets on
+one division group, push M live_location events and time the fan-out.
+
+    python benchmarks/ws_sockets.py --sockets 5000 --messages 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.layers import get_channel_layer  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+
+from config.asgi import websocket_urlpatterns  # noqa: E402
+from config.websocket import gauge  # noqa: E402
+
+
+class BenchUser:
+    id = "00000000-0000-0000-0000-000000000000"
+    is_anonymous = False
+    is_authenticated = True
+    role = "SUPERADMIN"
+
+
+def with_user(app):
+    async def middleware(scope, receive, send):
+        scope = dict(scope, user=BenchUser())
+        return await app(scope, receive, send)
+    return middleware
+
+
+async def run(sockets, messages):
+    app = with_user(URLRouter(websocket_urlpatterns))
+    path = "/ws/locations/division/1/"
+
+    started = time.perf_counter()
+    clients = [WebsocketCommunicator(app, path) for _ in range(sockets)]
+    results = await asyncio.gather(*(c.connect() for c in clients))
+    connect_time = time.perf_counter() - started
+    connected = sum(1 for ok, _ in results if ok)
+
+    layer = get_channel_layer()
+    started = time.perf_counter()
+    for i in range(messages):
+        await layer.group_send("division_1", {
+            "type": "live_location",
+            "data": {"user_id": str(i), "lat": 23.8, "lng": 90.4},
+        })
+        await asyncio.gather(*(c.receive_from(timeout=30) for c in clients))
+    fanout_time = time.perf_counter() - started
+
+    print(f"sockets connected : {connected}/{sockets} in {connect_time:.2f}s")
+    print(f"gauge             : {gauge.snapshot()}")
+    delivered = connected * messages
+    print(f"delivered         : {delivered} frames in {fanout_time:.2f}s "
+          f"({delivered / fanout_time:,.0f} frames/s)")
+
+    await asyncio.gather(*(c.disconnect() for c in clients))
+    print(f"gauge after close : {gauge.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.sockets, args.messages))
@@ -1,22 +1,40 @@
 import os
+
 from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+# app registry must be ready before consumers (and their models) are imported
+django_asgi_app = get_asgi_application()
+
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
+from users.middleware import JWTAuthMiddleware
 import locations.routing
 import messaging.routing
+from messaging.buffer import drain_write_buffer
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
-
-application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            messaging.routing.websocket_urlpatterns
-        )
-    ),
-})
-URLRouter(
+websocket_urlpatterns = (
     messaging.routing.websocket_urlpatterns +
     locations.routing.websocket_urlpatterns
 )
 
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # chat messages already delivered live but not yet written
+            await drain_write_buffer()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "lifespan": lifespan,
+    "websocket": JWTAuthMiddleware(
+        URLRouter(websocket_urlpatterns)
+    ),
+})
@@ -0,0 +1,96 @@
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class TieredCache(BaseCache):
+    """
+    Two-level cache: a per-process LOCAL cache in front of a SHARED one
+    (Redis). Reads hit process memory for up to LOCAL_TIMEOUT seconds;
+    writes and deletes go to both, so other workers see changes once their
+    local copy expires.
+    """
+
+    def __init__(self, location, params):
+        options = params.get("OPTIONS", {})
+        self.local_alias = options.get("LOCAL", "local")
+        self.shared_alias = options.get("SHARED", "default")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        super().__init__(params)
+
+    @property
+    def local(self):
+        return caches[self.local_alias]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = self.local.get(key, sentinel, version=version)
+        if value is not sentinel:
+            return value
+
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            return default
+
+        self.local.set(key, value, self.local_timeout, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.local.get_many(keys, version=version)
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            # one round trip (MGET) for everything not held locally
+            shared = self.shared.get_many(missing, version=version)
+            if shared:
+                self.local.set_many(shared, self.local_timeout, version=version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.local.set(key, value, self._local_timeout(timeout), version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.local.set(key, value, self._local_timeout(timeout), version=version)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self.local.set_many(data, self._local_timeout(timeout), version=version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.local.delete_many(keys, version=version)
+        self.shared.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # counters must be atomic: shared tier only
+        self.local.delete(key, version=version)
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
@@ -0,0 +1,171 @@
+# Read-only list serialization straight from values_list() rows. A
+# ModelSerializer builds a model instance, an OrderedDict and one
+# get_attribute/to_representation call per field per row; here every
+# field is compiled once per page into a getter on the row tuple, with
+# the same conversions DRF applies, so the JSON is byte-for-byte the same.
+import decimal
+from datetime import timezone as dt_timezone
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+
+# ======================================================
+# CONVERTERS (same output as the DRF fields)
+# ======================================================
+def decimal_converter(max_digits, decimal_places):
+    if not api_settings.COERCE_DECIMAL_TO_STRING:
+        return None
+
+    exponent = decimal.Decimal(".1") ** decimal_places
+    context = decimal.getcontext().copy()
+    if max_digits is not None:
+        context.prec = max_digits
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(exponent, context=context))
+    return convert
+
+
+def datetime_converter():
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None:
+        return None
+    # resolved per page: the active timezone can change per request
+    field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def convert(value):
+        if field_timezone is not None:
+            if timezone.is_aware(value):
+                value = value.astimezone(field_timezone)
+            else:
+                value = timezone.make_aware(value, field_timezone)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, dt_timezone.utc)
+
+        if output_format.lower() != ISO_8601:
+            return value.strftime(output_format)
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+    return convert
+
+
+def date_converter():
+    output_format = api_settings.DATE_FORMAT
+    if output_format is None:
+        return None
+    if output_format.lower() == ISO_8601:
+        return lambda value: value.isoformat()
+    return lambda value: value.strftime(output_format)
+
+
+def model_converter(field):
+    """What ModelSerializer's default field for `field` does to a value."""
+    if isinstance(field, models.ForeignKey):
+        # PrimaryKeyRelatedField: the raw pk
+        return None
+    if isinstance(field, models.DecimalField):
+        return decimal_converter(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return datetime_converter()
+    if isinstance(field, models.DateField):
+        return date_converter()
+    if isinstance(field, models.UUIDField):
+        return str
+    # ints, bools, text and JSON come back from the db as DRF returns them
+    return None
+
+
+# ======================================================
+# SERIALIZER
+# ======================================================
+class Computed:
+    """
+    SerializerMethodField stand-in: `function` gets the values of
+    `sources` (values() paths) and is called even when they are None.
+    """
+
+    def __init__(self, function, *sources):
+        self.function = function
+        self.sources = sources
+
+
+class ValuesSerializer:
+    """
+    Subclasses set `model`, `fields` (output keys in order) and
+    `computed` for keys that aren't plain columns of `model`.
+    """
+    model = None
+    fields = ()
+    computed = {}
+
+    @classmethod
+    def columns(cls):
+        columns = []
+        for name in cls.fields:
+            sources = cls.computed[name].sources if name in cls.computed else (name,)
+            for source in sources:
+                if source not in columns:
+                    columns.append(source)
+        return columns
+
+    @classmethod
+    def rows(cls, queryset):
+        return queryset.values_list(*cls.columns())
+
+    @classmethod
+    def compile(cls):
+        """(key, getter) per field; getters take a row tuple."""
+        index = {column: i for i, column in enumerate(cls.columns())}
+        plan = []
+
+        for name in cls.fields:
+            computed = cls.computed.get(name)
+
+            if computed is not None:
+                function = computed.function
+                if len(computed.sources) == 1:
+                    i = index[computed.sources[0]]
+                    plan.append((name, lambda row, i=i, f=function: f(row[i])))
+                else:
+                    get = itemgetter(*(index[source] for source in computed.sources))
+                    plan.append((name, lambda row, get=get, f=function: f(*get(row))))
+                continue
+
+            i = index[name]
+            convert = model_converter(cls.model._meta.get_field(name))
+            if convert is None:
+                plan.append((name, itemgetter(i)))
+            else:
+                # DRF skips the field's to_representation for None
+                plan.append((name, lambda row, i=i, c=convert: None if row[i] is None else c(row[i])))
+
+        return plan
+
+    @classmethod
+    def serialize(cls, rows):
+        plan = cls.compile()
+        return [{name: get(row) for name, get in plan} for row in rows]
+
+
+class ValuesListMixin:
+    """ListAPIView.list() over `values_serializer_class` rows; serializer_class stays for the schema."""
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.values_serializer_class
+        rows = serializer.rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+
+        return Response(serializer.serialize(rows))
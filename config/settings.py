@@ -12,33 +12,40 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
-import firebase_admin
-from firebase_admin import credentials
+from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-FIREBASE_SERVICE_ACCOUNT_PATH = BASE_DIR / "config" / "firebase_service_account.json"
 
+# development | production  (values come from env / .env)
+DJANGO_ENV = config("DJANGO_ENV", default="development")
+IS_PRODUCTION = DJANGO_ENV == "production"
 
-if FIREBASE_SERVICE_ACCOUNT_PATH.exists():
-    FIREBASE_CRED = credentials.Certificate(str(FIREBASE_SERVICE_ACCOUNT_PATH))
-else:
-    raise FileNotFoundError(f"Firebase file not found at: {FIREBASE_SERVICE_ACCOUNT_PATH}")
-
-firebase_admin.initialize_app(FIREBASE_CRED)
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-
+# Firebase is initialised lazily on first push (notifications.utils)
+FIREBASE_SERVICE_ACCOUNT_PATH = config(
+    "FIREBASE_SERVICE_ACCOUNT_PATH",
+    default=str(BASE_DIR / "config" / "firebase_service_account.json"),
+)
 
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-#h*_b7g^8bfqe1ilsihwm5ouja@irjej)9neu&5g&(o00()s83'
+# role / division are trusted from signed token claims, so production
+# never falls back to the public development key
+SECRET_KEY = config(
+    "SECRET_KEY",
+    default="" if IS_PRODUCTION else 'django-insecure-#h*_b7g^8bfqe1ilsihwm5ouja@irjej)9neu&5g&(o00()s83',
+)
+if IS_PRODUCTION and (not SECRET_KEY or SECRET_KEY.startswith("django-insecure-")):
+    raise ImproperlyConfigured("SECRET_KEY must be set when DJANGO_ENV=production")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# (DEBUG also keeps every SQL query in memory per connection)
+DEBUG = config("DEBUG", default=not IS_PRODUCTION, cast=bool)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = config("ALLOWED_HOSTS", default="", cast=Csv())
 # ALLOWED_HOSTS = ['test.hellopartybd.com', 'www.hellopartybd.com']
 
 # Application definition
@@ -62,15 +69,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -99,12 +104,23 @@ REST_FRAMEWORK.update({
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 })
 
+# cache alias holding GPSThrottle counters; None = in-process counters only
+GPS_THROTTLE_CACHE = config("GPS_THROTTLE_CACHE", default="default" if IS_PRODUCTION else "") or None
+# fixes per buffered upload (400 above) / throttle cost of one backlog fix
+GPS_MAX_UPLOAD_FIXES = 500
+GPS_BACKLOG_FIX_COST = 0.1
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.ClaimsTokenRefreshSerializer',
 }
 
+# validated websocket users are reused for reconnects within this window
+WS_USER_CACHE_TTL = 60
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -137,11 +153,14 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'livetrack', # Make sure you created this in pgAdmin first!
-        'USER': 'postgres',           # Or 'metaboxsoft' if you prefer
-        'PASSWORD': '',               # Leave this empty once 'trust' is enabled
-        'HOST': '127.0.0.1',
-        'PORT': '5432',
+        'NAME': config('DB_NAME', default='livetrack'), # Make sure you created this in pgAdmin first!
+        'USER': config('DB_USER', default='postgres'),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default='127.0.0.1'),
+        'PORT': config('DB_PORT', default='5432'),
+        # reuse connections across requests instead of reconnecting per request
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -196,15 +215,87 @@ ASGI_APPLICATION = 'config.asgi.application'
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
+REDIS_URL = config("REDIS_URL", default="")
+# per-process memory would quietly split revocation, presence and the
+# throttle counters between workers
+if IS_PRODUCTION and not REDIS_URL:
+    raise ImproperlyConfigured("REDIS_URL must be set when DJANGO_ENV=production")
+
+# Caches
+# "local": per-process memory, "default": Redis when REDIS_URL is set,
+# "tiered": local in front of default for hot, rarely changing lookups
+CACHES = {
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "livetrack",
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    "tiered": {
+        "BACKEND": "config.cache.TieredCache",
+        "OPTIONS": {
+            "LOCAL": "local",
+            "SHARED": "default",
+            # how long a value may be served from process memory
+            "LOCAL_TIMEOUT": 5,
+        },
+    },
+}
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+            "hosts": [config("CHANNEL_REDIS_URL", default=REDIS_URL or "redis://127.0.0.1:6379/0")],
+            # messages buffered per channel before ChannelFull; live map
+            # bursts need more than the default 100
+            "capacity": config("CHANNEL_CAPACITY", default=1500, cast=int),
+            # seconds an undelivered message lives
+            "expiry": config("CHANNEL_EXPIRY", default=10, cast=int),
+            # seconds a channel stays in a group without re-joining
+            "group_expiry": config("CHANNEL_GROUP_EXPIRY", default=86400, cast=int),
         },
     },
 }
 
+# Push notifications (notifications.dispatcher)
+# notifications.backends.FakeBackend sends nothing: tests / no credentials
+PUSH_BACKEND = config("PUSH_BACKEND", default="notifications.backends.FirebaseBackend")
+# threads sending FCM chunks concurrently, per worker process
+PUSH_WORKERS = config("PUSH_WORKERS", default=4, cast=int)
+# chunks (<= 500 tokens each) queued before new ones are dropped
+PUSH_MAX_PENDING_CHUNKS = config("PUSH_MAX_PENDING_CHUNKS", default=1000, cast=int)
+# send on the calling thread (tests)
+PUSH_SYNC = config("PUSH_SYNC", default=False, cast=bool)
+# devices kept per user / days before an unrefreshed token is expired
+FCM_MAX_TOKENS_PER_USER = config("FCM_MAX_TOKENS_PER_USER", default=5, cast=int)
+FCM_TOKEN_MAX_AGE_DAYS = config("FCM_TOKEN_MAX_AGE_DAYS", default=60, cast=int)
+
+# chat messages from one sender within this window become one push
+CHAT_PUSH_WINDOW_SECONDS = config("CHAT_PUSH_WINDOW_SECONDS", default=10, cast=int)
+
+# ChatConsumer persists messages in batches of up to CHAT_WRITE_BATCH,
+# at most CHAT_WRITE_DELAY_MS after they were broadcast
+CHAT_WRITE_BATCH = config("CHAT_WRITE_BATCH", default=200, cast=int)
+CHAT_WRITE_DELAY_MS = config("CHAT_WRITE_DELAY_MS", default=50, cast=int)
+
+# seconds a user stays online after their sockets' last heartbeat
+PRESENCE_TTL_SECONDS = config("PRESENCE_TTL_SECONDS", default=60, cast=int)
+
+# max open sockets per consumer class in one worker
+WEBSOCKET_CONNECTION_LIMITS = {
+    "LocationConsumer": config("WS_LIMIT_LOCATION", default=5000, cast=int),
+    "DivisionLocationConsumer": config("WS_LIMIT_DIVISION", default=5000, cast=int),
+    "ChatConsumer": config("WS_LIMIT_CHAT", default=5000, cast=int),
+}
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Employee Tracking API',
     'DESCRIPTION': 'Backend API for employee location tracking, attendance & messaging',
@@ -229,3 +320,9 @@ SPECTACULAR_SETTINGS['SECURITY_DEFINITIONS'] = {
 
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+if IS_PRODUCTION:
+    SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
@@ -5,6 +5,8 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from config.websocket import WebSocketConnectionsAPIView
+from notifications.views import PushStatsAPIView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -22,6 +24,9 @@ urlpatterns = [
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
+    path('api/ws/connections/', WebSocketConnectionsAPIView.as_view(), name='ws-connections'),
+    path('api/notifications/stats/', PushStatsAPIView.as_view(), name='push-stats'),
+
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
 
     path(
@@ -0,0 +1,74 @@
+from collections import defaultdict
+
+from django.conf import settings
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.permissions import IsSuperAdmin
+
+
+class ConnectionGauge:
+    """
+    Open websocket connections per consumer class in this worker.
+    Consumers all run on the worker's event loop, so no locking needed.
+    """
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+
+    def acquire(self, name, limit=None):
+        if limit is not None and self._counts[name] >= limit:
+            return False
+        self._counts[name] += 1
+        return True
+
+    def release(self, name):
+        if self._counts[name] > 0:
+            self._counts[name] -= 1
+
+    def snapshot(self):
+        return {name: count for name, count in self._counts.items() if count}
+
+
+gauge = ConnectionGauge()
+
+
+class ConnectionLimitMixin:
+    """
+    Counts the consumer's sockets in `gauge` and refuses the handshake once
+    WEBSOCKET_CONNECTION_LIMITS[<consumer class name>] is reached.
+    """
+
+    async def websocket_connect(self, message):
+        name = type(self).__name__
+        limit = getattr(settings, "WEBSOCKET_CONNECTION_LIMITS", {}).get(name)
+
+        if not gauge.acquire(name, limit):
+            await self.close()
+            return
+
+        self.gauge_name = name
+        await super().websocket_connect(message)
+
+    async def websocket_disconnect(self, message):
+        if getattr(self, "gauge_name", None):
+            gauge.release(self.gauge_name)
+            self.gauge_name = None
+
+        await super().websocket_disconnect(message)
+
+
+class WebSocketConnectionsAPIView(APIView):
+    permission_classes = [IsSuperAdmin]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Open websocket connections per consumer in the worker serving this request."
+    )
+    def get(self, request):
+        connections = gauge.snapshot()
+        return Response({
+            "connections": connections,
+            "total": sum(connections.values()),
+        })
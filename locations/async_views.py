@@ -0,0 +1,166 @@
+# Async-native versions of the hot location endpoints for the uvicorn
+# workers: no DRF sync view machinery, auth from token claims on the event
+# loop, channel layer awaited directly.
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+
+from users.authentication import ClaimsJWTAuthentication, ais_revoked
+from users.permissions import manages_employee
+
+from .models import LocationLog
+from .pipeline import run_pipeline
+from .serializers import LocationCreateSerializer
+from .throttles import GPSThrottle
+from .views import division_latest_locations, live_location_row
+
+authenticator = ClaimsJWTAuthentication()
+
+
+def error(status, detail, **headers):
+    response = JsonResponse({"detail": detail}, status=status)
+    for name, value in headers.items():
+        response[name.replace("_", "-")] = value
+    return response
+
+
+async def authenticate(request):
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+
+    raw = authenticator.get_raw_token(header)
+    if raw is None:
+        return None
+
+    try:
+        token = authenticator.get_validated_token(raw)
+    except InvalidToken:
+        return None
+
+    # tokens issued before role claims existed need the User row
+    if "role" not in token:
+        try:
+            return await sync_to_async(JWTAuthentication.get_user)(authenticator, token)
+        except (AuthenticationFailed, InvalidToken):
+            return None
+
+    if await ais_revoked(token):
+        return None
+
+    return TokenUser(token)
+
+
+class ThrottleRequest:
+    """The bits of a DRF Request that GPSThrottle reads."""
+
+    def __init__(self, request, user, data):
+        self.user = user
+        self.data = data
+        self.META = request.META
+
+
+# ======================================================
+# SEND LOCATION (EMPLOYEE)
+# ======================================================
+@csrf_exempt
+async def send_location(request):
+    if request.method != "POST":
+        return error(405, f'Method "{request.method}" not allowed.')
+
+    user = await authenticate(request)
+    if user is None:
+        return error(401, "Authentication credentials were not provided or are invalid.")
+    if user.role != "EMPLOYEE":
+        return error(403, "You do not have permission to perform this action.")
+
+    try:
+        data = json.loads(request.body or b"null")
+    except ValueError:
+        return error(400, "JSON parse error.")
+
+    # counters live in the (sync) cache backend: keep them off the loop
+    throttle = GPSThrottle()
+    allowed = await sync_to_async(throttle.allow_request)(ThrottleRequest(request, user, data), None)
+    if not allowed:
+        return error(429, "Request was throttled.", Retry_After=str(throttle.wait() or 1))
+
+    many = isinstance(data, list)
+    serializer = LocationCreateSerializer(data=data, many=many)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400, safe=False)
+
+    fixes = serializer.validated_data if many else [serializer.validated_data]
+
+    # the write path is several transactions (attendance, stops, rollups)
+    # and the async ORM has no atomic(): one executor hop for all of it
+    events = await sync_to_async(run_pipeline)(user, fixes)
+
+    channel_layer = get_channel_layer()
+    if channel_layer and events:
+        await asyncio.gather(*(
+            channel_layer.group_send(group, message)
+            for group, message in events
+        ))
+
+    return JsonResponse(serializer.data, status=201, safe=False)
+
+
+# ======================================================
+# LATEST LOCATION (MAP MARKER)
+# ======================================================
+async def latest_location(request, user_id):
+    if request.method != "GET":
+        return error(405, f'Method "{request.method}" not allowed.')
+
+    user = await authenticate(request)
+    if user is None:
+        return error(401, "Authentication credentials were not provided or are invalid.")
+
+    allowed = user.role == "SUPERADMIN"
+    if user.role == "ADMIN":
+        allowed = await sync_to_async(manages_employee)(user, user_id)
+    if not allowed:
+        return error(403, "This employee is not assigned to you")
+
+    loc = await LocationLog.objects.filter(
+        user_id=user_id
+    ).order_by("-recorded_at").values(
+        "latitude", "longitude", "recorded_at"
+    ).afirst()
+
+    if not loc:
+        return JsonResponse({})
+
+    return JsonResponse({
+        "lat": loc["latitude"],
+        "lng": loc["longitude"],
+        "time": loc["recorded_at"],
+    })
+
+
+# ======================================================
+# DIVISION LIVE LOCATION (MAP LOAD)
+# ======================================================
+async def division_live_locations(request, division_id):
+    if request.method != "GET":
+        return error(405, f'Method "{request.method}" not allowed.')
+
+    user = await authenticate(request)
+    if user is None:
+        return error(401, "Authentication credentials were not provided or are invalid.")
+    if user.role not in ("ADMIN", "SUPERADMIN"):
+        return error(403, "You do not have permission to perform this action.")
+
+    data = [
+        live_location_row(row)
+        async for row in division_latest_locations(division_id, user)
+    ]
+    return JsonResponse(data, safe=False)
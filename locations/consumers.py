@@ -1,10 +1,14 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from users.models import User, EmployeeProfile
+from users.models import User
+from users.permissions import manages_employee
+from config.websocket import ConnectionLimitMixin
+from users.middleware import AuthSubprotocolMixin
+from users.presence import PresenceMixin
 
 
-class LocationConsumer(AsyncWebsocketConsumer):
+class LocationConsumer(ConnectionLimitMixin, AuthSubprotocolMixin, PresenceMixin, AsyncWebsocketConsumer):
 
     async def connect(self):
         self.request_user = self.scope["user"]
@@ -30,8 +34,15 @@ class LocationConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
+        await self.start_presence(self.request_user.id)
 
     async def disconnect(self, close_code):
+        await self.stop_presence()
+
+        # rejected handshakes never joined a group
+        if not hasattr(self, "group_name"):
+            return
+
         await self.channel_layer.group_discard(
             self.group_name,
             self.channel_name
@@ -45,27 +56,14 @@ class LocationConsumer(AsyncWebsocketConsumer):
     # -------------------------
     @database_sync_to_async
     def is_allowed(self):
-        try:
-            employee = User.objects.get(id=self.employee_id)
-        except User.DoesNotExist:
+        # SuperAdmin: anyone, Admin: assigned employees (cached), Employee: no one
+        if not manages_employee(self.request_user, self.employee_id):
             return False
 
-        # SuperAdmin can see anyone
-        if self.request_user.role == "SUPERADMIN":
-            return True
-
-        # Admin can see only assigned employees
-        if self.request_user.role == "ADMIN":
-            return EmployeeProfile.objects.filter(
-                user=employee,
-                admin=self.request_user
-            ).exists()
+        return User.objects.filter(id=self.employee_id).exists()
 
-        # Employee cannot watch anyone
-        return False
 
-
-class DivisionLocationConsumer(AsyncWebsocketConsumer):
+class DivisionLocationConsumer(ConnectionLimitMixin, AuthSubprotocolMixin, PresenceMixin, AsyncWebsocketConsumer):
     async def connect(self):
         user = self.scope["user"]
 
@@ -82,8 +80,15 @@ class DivisionLocationConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
+        await self.start_presence(user.id)
 
     async def disconnect(self, close_code):
+        await self.stop_presence()
+
+        # rejected handshakes never joined a group
+        if not hasattr(self, "group_name"):
+            return
+
         await self.channel_layer.group_discard(
             self.group_name,
             self.channel_name
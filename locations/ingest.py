@@ -0,0 +1,302 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from time import monotonic
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Attendance, GeofenceEvent, LocationLog, Office
+from .utils import calculate_distance
+
+
+def fix_time(millis):
+    # device clock is epoch millis in UTC, never naive local time
+    return datetime.fromtimestamp(millis / 1000.0, tz=dt_timezone.utc)
+
+
+def is_inside(office, lat, lng):
+    try:
+        distance = calculate_distance(
+            float(lat),
+            float(lng),
+            float(office.latitude),
+            float(office.longitude),
+        )
+    except (TypeError, ValueError):
+        return None
+
+    return distance <= office.radius_meters
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+# ======================================================
+# IDEMPOTENCY
+# ======================================================
+class RecentFixes:
+    """
+    Short-lived, bounded memory of (user_id, millis) keys this worker has
+    already stored, so mobile retries are dropped before touching the DB.
+    The unique constraint on LocationLog stays the source of truth.
+    """
+
+    def __init__(self, ttl=300, max_size=50000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, user_id, millis):
+        key = (user_id, millis)
+        with self._lock:
+            expires = self._keys.get(key)
+            if expires is None:
+                return False
+            if expires < monotonic():
+                del self._keys[key]
+                return False
+            return True
+
+    def add(self, user_id, millis_list):
+        expires = monotonic() + self.ttl
+        with self._lock:
+            for millis in millis_list:
+                key = (user_id, millis)
+                self._keys[key] = expires
+                self._keys.move_to_end(key)
+
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+
+
+recent_fixes = RecentFixes(
+    ttl=getattr(settings, "LOCATION_DEDUP_TTL", 300),
+    max_size=getattr(settings, "LOCATION_DEDUP_SIZE", 50000),
+)
+
+
+def store_fixes(user, fixes):
+    """
+    Insert validated fixes with ON CONFLICT DO NOTHING and return only the
+    LocationLog rows that were actually created. Replays come back empty.
+    """
+    pending = {}
+    for fix in fixes:
+        millis = fix["millis"]
+        if millis in pending or recent_fixes.seen(user.id, millis):
+            continue
+        pending[millis] = LocationLog(user_id=user.id, **fix)
+
+    if not pending:
+        return []
+
+    LocationLog.objects.bulk_create(pending.values(), ignore_conflicts=True)
+
+    # ignore_conflicts gives no pks back; a row is ours when its created_at
+    # matches the value auto_now_add stamped on our instance
+    stored = LocationLog.objects.filter(
+        user_id=user.id,
+        millis__in=list(pending),
+    ).values_list("id", "millis", "created_at")
+
+    created = []
+    for pk, millis, created_at in stored:
+        location = pending[millis]
+        if created_at == location.created_at:
+            location.pk = pk
+            created.append(location)
+
+    # remembered only once the upload commits: a rolled back upload must
+    # not turn its retry into a replay
+    millis_list = list(pending)
+    transaction.on_commit(lambda: recent_fixes.add(user.id, millis_list))
+    return created
+
+
+# ======================================================
+# STATE MACHINE
+# ======================================================
+def apply_fix(attendance, at, inside):
+    """
+    Advance one attendance day by a single fix. Mutates `attendance`
+    in memory and returns the geofence event ("ENTER"/"EXIT") or None.
+    """
+    if inside and attendance.check_in is None:
+        attendance.check_in = at
+
+    if not inside and attendance.check_in and attendance.check_out is None:
+        attendance.check_out = at
+
+    event = None
+    if inside and not attendance.was_inside:
+        event = "ENTER"
+    if not inside and attendance.was_inside:
+        event = "EXIT"
+
+    attendance.was_inside = inside
+    attendance.last_fix_at = at
+    return event
+
+
+# ======================================================
+# INGEST
+# ======================================================
+def ingest_fixes(user, locations):
+    """
+    Evaluate attendance + geofence state for saved LocationLog rows.
+
+    Fixes are ordered by device time (the per-upload reorder buffer) and
+    compared against the day's watermark (`Attendance.last_fix_at`).
+    In-order fixes advance the state machine; late fixes are merged when
+    their stored neighbours agree with them, otherwise the whole day is
+    replayed by `recompute_attendance`.
+    """
+    office = Office.objects.first()
+    if not office:
+        return
+
+    days = {}
+    late_days = set()
+
+    # attendance rows locked until saved (in date order): concurrent
+    # uploads for the same user-day queue up instead of overwriting each
+    # other's check-in/out or emitting the same ENTER/EXIT twice
+    with transaction.atomic():
+        for location in sorted(locations, key=lambda l: l.recorded_at):
+            inside = is_inside(office, location.latitude, location.longitude)
+            if inside is None:
+                continue
+
+            at = location.recorded_at
+            day = timezone.localdate(at)
+
+            if day in late_days:
+                continue
+
+            attendance = days.get(day)
+            if attendance is None:
+                attendance, _ = Attendance.objects.select_for_update().get_or_create(
+                    user_id=user.id,
+                    date=day,
+                    defaults={"office": office},
+                )
+                days[day] = attendance
+
+            if attendance.last_fix_at and at < attendance.last_fix_at:
+                if not merges_cleanly(location, inside, office):
+                    late_days.add(day)
+                continue
+
+            event = apply_fix(attendance, at, inside)
+            if event:
+                GeofenceEvent.objects.create(
+                    user_id=user.id,
+                    office=office,
+                    event=event,
+                    occurred_at=at,
+                )
+
+            attendance.save(update_fields=[
+                "check_in",
+                "check_out",
+                "was_inside",
+                "last_fix_at",
+            ])
+
+    for day in late_days:
+        recompute_attendance(user, day, office)
+
+
+def merges_cleanly(location, inside, office):
+    """
+    A late fix cannot change check-in/out or create a transition when the
+    fixes stored directly before and after it (same day) are on the same
+    side of the geofence.
+    """
+    start, end = day_bounds(timezone.localdate(location.recorded_at))
+    neighbours = LocationLog.objects.filter(
+        user_id=location.user_id,
+        recorded_at__gte=start,
+        recorded_at__lt=end,
+    ).exclude(pk=location.pk)
+
+    before = neighbours.filter(
+        recorded_at__lte=location.recorded_at
+    ).order_by("-recorded_at").values_list("latitude", "longitude").first()
+
+    after = neighbours.filter(
+        recorded_at__gt=location.recorded_at
+    ).order_by("recorded_at").values_list("latitude", "longitude").first()
+
+    if before is None or after is None:
+        return False
+
+    return is_inside(office, *before) == inside == is_inside(office, *after)
+
+
+# ======================================================
+# RECOMPUTATION
+# ======================================================
+def recompute_attendance(user, day, office=None):
+    """
+    Rebuild one attendance day (check-in/out, watermark and geofence
+    events) by replaying its fixes in device-time order.
+    """
+    office = office or Office.objects.first()
+    if not office:
+        return
+
+    start, end = day_bounds(day)
+
+    with transaction.atomic():
+        attendance, _ = Attendance.objects.select_for_update().get_or_create(
+            user_id=user.id,
+            date=day,
+            defaults={"office": office},
+        )
+        attendance.check_in = None
+        attendance.check_out = None
+        attendance.was_inside = False
+        attendance.last_fix_at = None
+
+        fixes = LocationLog.objects.filter(
+            user_id=user.id,
+            recorded_at__gte=start,
+            recorded_at__lt=end,
+        ).order_by("recorded_at").values_list(
+            "latitude", "longitude", "recorded_at"
+        )
+
+        events = []
+        for lat, lng, at in fixes.iterator():
+            inside = is_inside(office, lat, lng)
+            if inside is None:
+                continue
+
+            event = apply_fix(attendance, at, inside)
+            if event:
+                events.append(GeofenceEvent(
+                    user_id=user.id,
+                    office=office,
+                    event=event,
+                    occurred_at=at,
+                ))
+
+        GeofenceEvent.objects.filter(
+            user_id=user.id,
+            occurred_at__gte=start,
+            occurred_at__lt=end,
+        ).delete()
+        GeofenceEvent.objects.bulk_create(events)
+
+        attendance.save(update_fields=[
+            "check_in",
+            "check_out",
+            "was_inside",
+            "last_fix_at",
+        ])
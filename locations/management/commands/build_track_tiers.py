@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from locations.tiers import build_tiers
+
+
+class Command(BaseCommand):
+    help = "Fold new LocationLog rows into the downsampled TrackPoint tiers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = build_tiers(batch_size=options["batch_size"])
+            if not processed:
+                break
+            total += processed
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} fixes"))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from locations.ingest import day_bounds
+from locations.models import LocationLog, Office
+from locations.rollups import rebuild_rollup
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute DailyRollup rows from LocationLog (default: yesterday)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="YYYY-MM-DD, defaults to yesterday")
+        parser.add_argument("--user", help="only rebuild this user id")
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            day = parse_date(options["date"])
+            if day is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            day = timezone.localdate() - timedelta(days=1)
+
+        start, end = day_bounds(day)
+        user_ids = LocationLog.objects.filter(
+            recorded_at__gte=start,
+            recorded_at__lt=end,
+        ).values_list("user_id", flat=True).distinct()
+
+        if options["user"]:
+            user_ids = user_ids.filter(user_id=options["user"])
+
+        offices = list(Office.objects.all())
+        count = 0
+        for user in User.objects.filter(id__in=list(user_ids)).iterator():
+            rebuild_rollup(user, day, offices)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollups for {day}"))
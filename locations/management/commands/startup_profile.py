@@ -0,0 +1,109 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|( +)(\S+)")
+SETUP_DONE = "-- setup done --"
+
+PROJECT_MODULES = [
+    "config.urls",
+    "config.asgi",
+    "notifications.utils",
+]
+APP_MODULES = ["models", "views", "urls", "consumers", "routing"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Report startup cost: django.setup() plus the import time of each "
+        "project app module, every one measured in a fresh interpreter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=3,
+                            help="heaviest direct imports to list per module")
+
+    def handle(self, *args, **options):
+        setup_us, _, _ = self.profile(None)
+        self.stdout.write(f"{'django.setup()':<32}{setup_us / 1000:>10.1f} ms")
+
+        for module in self.target_modules():
+            _, module_us, children = self.profile(module)
+
+            if module_us is None:
+                self.stdout.write(f"{module:<32}{'failed':>13}")
+                continue
+            if module_us == 0:
+                self.stdout.write(f"{module:<32}{'in setup':>13}")
+                continue
+
+            self.stdout.write(f"{module:<32}{module_us / 1000:>10.1f} ms")
+            for name, us in children[:options["top"]]:
+                self.stdout.write(f"    {name:<28}{us / 1000:>10.1f} ms")
+
+    def target_modules(self):
+        modules = []
+        for app in settings.INSTALLED_APPS:
+            app_dir = settings.BASE_DIR / app
+            if not app_dir.is_dir():
+                continue
+            modules += [
+                f"{app}.{name}" for name in APP_MODULES
+                if (app_dir / f"{name}.py").exists()
+            ]
+        return modules + PROJECT_MODULES
+
+    def profile(self, module):
+        """
+        Returns (setup us, module us, [(direct import, us), ...]).
+        Module us is 0 when setup already imported it, None on failure.
+        """
+        code = (
+            "import sys, django\n"
+            "django.setup()\n"
+            f"sys.stderr.write({SETUP_DONE!r} + '\\n')\n"
+        )
+        if module:
+            code += f"import {module}\n"
+
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE},
+        )
+        if result.returncode != 0:
+            return None, None, []
+
+        setup_us = 0
+        module_us = 0
+        children = []
+        after_setup = False
+
+        for line in result.stderr.splitlines():
+            if line == SETUP_DONE:
+                after_setup = True
+                continue
+
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+
+            cumulative, indent, name = int(match.group(1)), len(match.group(2)), match.group(3)
+
+            if not after_setup:
+                if indent == 1:
+                    setup_us += cumulative
+            elif name == module:
+                module_us = cumulative
+            elif indent == 3:
+                # direct children of the target are nested one level deeper
+                children.append((name, cumulative))
+
+        children.sort(key=lambda row: -row[1])
+        return setup_us, module_us, children
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:41
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+def delete_duplicate_fixes(apps, schema_editor):
+    # client retries already wrote the same fix more than once; keep the
+    # first copy (lowest id) of every (user, millis)
+    LocationLog = apps.get_model('locations', 'LocationLog')
+    earlier = LocationLog.objects.filter(
+        user_id=OuterRef('user_id'),
+        millis=OuterRef('millis'),
+        id__lt=OuterRef('id'),
+    )
+    LocationLog.objects.filter(Exists(earlier)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0008_attendance_last_fix_at_alter_geofenceevent_occurred_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_fixes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='locationlog',
+            unique_together={('user', 'millis')},
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0009_alter_locationlog_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stop',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stops', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'started_at'], name='locations_s_user_id_619cea_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('distance_meters', models.FloatField(default=0)),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('end_stop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='arrivals', to='locations.stop')),
+                ('start_stop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='departures', to='locations.stop')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'started_at'], name='locations_t_user_id_2d5f02_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SegmentState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_at', models.DateTimeField(blank=True, null=True)),
+                ('last_latitude', models.FloatField(blank=True, null=True)),
+                ('last_longitude', models.FloatField(blank=True, null=True)),
+                ('anchor_latitude', models.FloatField(blank=True, null=True)),
+                ('anchor_longitude', models.FloatField(blank=True, null=True)),
+                ('cluster_started_at', models.DateTimeField(blank=True, null=True)),
+                ('cluster_ended_at', models.DateTimeField(blank=True, null=True)),
+                ('cluster_count', models.PositiveIntegerField(default=0)),
+                ('cluster_latitude_sum', models.FloatField(default=0)),
+                ('cluster_longitude_sum', models.FloatField(default=0)),
+                ('cluster_distance', models.FloatField(default=0)),
+                ('stop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='locations.stop')),
+                ('trip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='locations.trip')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='segment_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
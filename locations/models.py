@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
@@ -11,6 +12,12 @@ class LocationLog(models.Model):
     recorded_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # client retries resend the same fix; (user, millis) is its identity
+        unique_together = ('user', 'millis')
+        indexes = [
+            models.Index(fields=["user", "recorded_at"]),
+        ]
 
 
 class Office(models.Model):
@@ -40,6 +47,9 @@ class Attendance(models.Model):
     check_out = models.DateTimeField(null=True, blank=True)
     date = models.DateField()
 
+    # device time of the newest fix evaluated for this day (ingest watermark)
+    last_fix_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         unique_together = ('user', 'date')
 
@@ -52,7 +62,143 @@ class GeofenceEvent(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     office = models.ForeignKey(Office, on_delete=models.CASCADE)
     event = models.CharField(max_length=5, choices=EVENT_CHOICES)
-    occurred_at = models.DateTimeField(auto_now_add=True)
+    occurred_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.user} {self.event}"
+
+
+# ======================================================
+# STOPS / TRIPS (segmented track)
+# ======================================================
+class Stop(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="stops")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    point_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} stop {self.started_at}"
+
+
+class Trip(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="trips")
+    start_stop = models.ForeignKey(
+        Stop,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="departures"
+    )
+    end_stop = models.ForeignKey(
+        Stop,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="arrivals"
+    )
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    distance_meters = models.FloatField(default=0)
+    point_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} trip {self.started_at}"
+
+
+class SegmentState(models.Model):
+    """
+    Where the streaming stop/trip segmenter left off for one user: the
+    last fix seen, the current stay-point candidate and the open stop/trip.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="segment_state"
+    )
+    last_at = models.DateTimeField(null=True, blank=True)
+    last_latitude = models.FloatField(null=True, blank=True)
+    last_longitude = models.FloatField(null=True, blank=True)
+
+    anchor_latitude = models.FloatField(null=True, blank=True)
+    anchor_longitude = models.FloatField(null=True, blank=True)
+    cluster_started_at = models.DateTimeField(null=True, blank=True)
+    cluster_ended_at = models.DateTimeField(null=True, blank=True)
+    cluster_count = models.PositiveIntegerField(default=0)
+    cluster_latitude_sum = models.FloatField(default=0)
+    cluster_longitude_sum = models.FloatField(default=0)
+    cluster_distance = models.FloatField(default=0)
+
+    stop = models.ForeignKey(
+        Stop,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+
+
+class DailyRollup(models.Model):
+    """
+    Per-user per-day totals maintained from the ingest path, so reports
+    read one row per employee-day instead of raw fixes.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_rollups")
+    date = models.DateField()
+
+    distance_meters = models.FloatField(default=0)
+    moving_seconds = models.PositiveIntegerField(default=0)
+    # {"<office_id>": seconds spent inside that office's geofence}
+    office_seconds = models.JSONField(default=dict, blank=True)
+    fix_count = models.PositiveIntegerField(default=0)
+
+    first_fix_at = models.DateTimeField(null=True, blank=True)
+    last_fix_at = models.DateTimeField(null=True, blank=True)
+    last_latitude = models.FloatField(null=True, blank=True)
+    last_longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+
+# ======================================================
+# DOWNSAMPLED TRACK TIERS
+# ======================================================
+class TrackPoint(models.Model):
+    """One representative fix (the earliest) per user per time bucket."""
+    RESOLUTIONS = (10, 60, 600)  # seconds per bucket
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="track_points")
+    resolution = models.PositiveIntegerField()
+    bucket = models.DateTimeField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'resolution', 'bucket')
+
+
+class TrackTierCursor(models.Model):
+    # highest LocationLog.id already folded into TrackPoint tiers
+    last_location_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,76 @@
+from django.db import transaction
+
+from users.authentication import user_division_id
+
+from .ingest import ingest_fixes, store_fixes
+from .rollups import update_rollups
+from .segmentation import segment_fixes
+
+
+def run_pipeline(user, fixes):
+    """
+    All DB work for one upload, shared by the sync and async ingest views.
+    Returns the live broadcasts as (group, message) pairs; empty for
+    replays, which skip every stage after the insert. One transaction:
+    a failing stage rolls the insert back too, so the client's retry is
+    processed in full instead of being dropped as a replay.
+    """
+    with transaction.atomic():
+        locations = store_fixes(user, fixes)
+        if not locations:
+            return []
+
+        # --------------------------------------------------
+        # ATTENDANCE + GEOFENCE (device time order)
+        # --------------------------------------------------
+        ingest_fixes(user, locations)
+
+        # --------------------------------------------------
+        # STOPS / TRIPS
+        # --------------------------------------------------
+        segment_fixes(user, locations)
+
+        # --------------------------------------------------
+        # DAILY DISTANCE / DWELL ROLLUP
+        # --------------------------------------------------
+        update_rollups(user, locations)
+
+    return live_events(user, locations)
+
+
+def live_events(user, locations):
+    latest = max(locations, key=lambda l: l.recorded_at)
+    lat = float(latest.latitude)
+    lng = float(latest.longitude)
+
+    # personal websocket
+    events = [(
+        f"location_{user.id}",
+        {
+            "type": "send_location",
+            "data": {
+                "lat": lat,
+                "lng": lng,
+                "millis": latest.millis,
+            },
+        },
+    )]
+
+    # division live map
+    division_id = user_division_id(user)
+    if division_id:
+        events.append((
+            f"division_{division_id}",
+            {
+                "type": "live_location",
+                "data": {
+                    "user_id": str(user.id),
+                    "name": user.name,
+                    "lat": lat,
+                    "lng": lng,
+                    "time": latest.recorded_at.isoformat(),
+                },
+            },
+        ))
+
+    return events
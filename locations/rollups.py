@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import day_bounds, is_inside
+from .models import DailyRollup, LocationLog, Office
+from .utils import calculate_distance
+
+# intervals longer than this (app killed, no signal) are not credited
+MAX_GAP_SECONDS = getattr(settings, "ROLLUP_MAX_GAP_SECONDS", 900)
+# slower than this between two fixes counts as standing still
+MOVING_SPEED_MPS = getattr(settings, "ROLLUP_MOVING_SPEED_MPS", 0.5)
+
+
+def advance_rollup(rollup, lat, lng, at, offices):
+    """Add one fix (newer than rollup.last_fix_at) to the day totals."""
+    lat = float(lat)
+    lng = float(lng)
+
+    if rollup.last_fix_at is not None:
+        step = calculate_distance(rollup.last_latitude, rollup.last_longitude, lat, lng)
+        seconds = (at - rollup.last_fix_at).total_seconds()
+
+        rollup.distance_meters += step
+
+        if 0 < seconds <= MAX_GAP_SECONDS:
+            if step / seconds >= MOVING_SPEED_MPS:
+                rollup.moving_seconds += int(seconds)
+
+            # dwell is credited to the office the previous fix was in
+            for office in offices:
+                if is_inside(office, rollup.last_latitude, rollup.last_longitude):
+                    key = str(office.id)
+                    rollup.office_seconds[key] = rollup.office_seconds.get(key, 0) + int(seconds)
+
+    if rollup.first_fix_at is None:
+        rollup.first_fix_at = at
+
+    rollup.fix_count += 1
+    rollup.last_fix_at = at
+    rollup.last_latitude = lat
+    rollup.last_longitude = lng
+
+
+def update_rollups(user, locations):
+    """
+    Fold freshly stored fixes into the user's daily rollups. A fix older
+    than its day's last_fix_at causes that day to be rebuilt instead.
+    """
+    offices = list(Office.objects.all())
+    days = {}
+    late_days = set()
+
+    # day rows locked until saved (in date order): concurrent uploads for
+    # the same user-day queue up instead of overwriting each other
+    with transaction.atomic():
+        for location in sorted(locations, key=lambda l: l.recorded_at):
+            at = location.recorded_at
+            day = timezone.localdate(at)
+
+            if day in late_days:
+                continue
+
+            rollup = days.get(day)
+            if rollup is None:
+                rollup, _ = DailyRollup.objects.select_for_update().get_or_create(
+                    user_id=user.id,
+                    date=day,
+                )
+                days[day] = rollup
+
+            if rollup.last_fix_at and at <= rollup.last_fix_at:
+                late_days.add(day)
+                continue
+
+            advance_rollup(rollup, location.latitude, location.longitude, at, offices)
+
+        for day, rollup in days.items():
+            if day not in late_days:
+                rollup.save()
+
+    for day in late_days:
+        rebuild_rollup(user, day, offices)
+
+
+def rebuild_rollup(user, day, offices=None):
+    """Recompute one user-day from LocationLog in a single pass."""
+    if offices is None:
+        offices = list(Office.objects.all())
+
+    start, end = day_bounds(day)
+
+    with transaction.atomic():
+        rollup, _ = DailyRollup.objects.select_for_update().get_or_create(
+            user_id=user.id,
+            date=day,
+        )
+        rollup.distance_meters = 0
+        rollup.moving_seconds = 0
+        rollup.office_seconds = {}
+        rollup.fix_count = 0
+        rollup.first_fix_at = None
+        rollup.last_fix_at = None
+        rollup.last_latitude = None
+        rollup.last_longitude = None
+
+        fixes = LocationLog.objects.filter(
+            user_id=user.id,
+            recorded_at__gte=start,
+            recorded_at__lt=end,
+        ).order_by("recorded_at").values_list(
+            "latitude", "longitude", "recorded_at"
+        )
+
+        for lat, lng, at in fixes.iterator():
+            advance_rollup(rollup, lat, lng, at, offices)
+
+        rollup.save()
@@ -0,0 +1,268 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import LocationLog, SegmentState, Stop, Trip
+from .utils import calculate_distance
+
+# a stop = fixes staying within STOP_RADIUS of the first one for STOP_MIN_SECONDS
+STOP_RADIUS_METERS = getattr(settings, "SEGMENT_STOP_RADIUS_METERS", 100)
+STOP_MIN_SECONDS = getattr(settings, "SEGMENT_STOP_MIN_SECONDS", 300)
+
+
+def _coord(value):
+    return Decimal(value).quantize(Decimal("0.000001"))
+
+
+class Segmenter:
+    """
+    Single-pass stay-point detector. Feed fixes in device-time order;
+    Stop/Trip rows are created and extended as the track unfolds and the
+    in-between state lives in SegmentState, so the next upload carries on
+    where this one stopped.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.dirty = set()
+        # rows resegment() is replacing, oldest first: reused in order so
+        # an unchanged stop/trip keeps its id
+        self.spare_stops = []
+        self.spare_trips = []
+
+    @classmethod
+    def load(cls, user):
+        # locked for the caller's transaction: concurrent uploads for one
+        # user take turns instead of advancing from the same state.
+        # of=self: stop/trip are the nullable side of an outer join
+        state, _ = SegmentState.objects.select_related(
+            "stop", "trip"
+        ).select_for_update(of=("self",)).get_or_create(user_id=user.id)
+        return cls(state)
+
+    # -------------------------
+    # STREAM
+    # -------------------------
+    def feed(self, lat, lng, at):
+        s = self.state
+        lat = float(lat)
+        lng = float(lng)
+
+        if s.anchor_latitude is None:
+            self._start_cluster(lat, lng, at)
+        else:
+            step = calculate_distance(s.last_latitude, s.last_longitude, lat, lng)
+            from_anchor = calculate_distance(
+                s.anchor_latitude, s.anchor_longitude, lat, lng
+            )
+
+            if from_anchor <= STOP_RADIUS_METERS:
+                self._extend_cluster(lat, lng, at, step)
+            else:
+                self._leave_cluster(at, step)
+                self._start_cluster(lat, lng, at)
+
+        s.last_latitude = lat
+        s.last_longitude = lng
+        s.last_at = at
+
+    def reset(self, trip=None):
+        """Back to an empty cluster, with `trip` (if any) open again."""
+        s = self.state
+        s.last_at = s.last_latitude = s.last_longitude = None
+        s.anchor_latitude = s.anchor_longitude = None
+        s.cluster_started_at = s.cluster_ended_at = None
+        s.cluster_count = 0
+        s.cluster_latitude_sum = s.cluster_longitude_sum = 0
+        s.cluster_distance = 0
+        s.stop = None
+        s.trip = trip
+
+        if trip is not None:
+            trip.end_stop = None
+            self.dirty.add(trip)
+
+    def save(self):
+        for obj in self.dirty:
+            obj.save()
+        self.dirty.clear()
+        self.state.save()
+
+    def _new(self, spares, model, **fields):
+        if not spares:
+            return model.objects.create(**fields)
+        obj = spares.pop(0)
+        for name, value in fields.items():
+            setattr(obj, name, value)
+        obj.save()
+        return obj
+
+    # -------------------------
+    # CLUSTER HANDLING
+    # -------------------------
+    def _start_cluster(self, lat, lng, at):
+        s = self.state
+        s.anchor_latitude = lat
+        s.anchor_longitude = lng
+        s.cluster_started_at = at
+        s.cluster_ended_at = at
+        s.cluster_count = 1
+        s.cluster_latitude_sum = lat
+        s.cluster_longitude_sum = lng
+        s.cluster_distance = 0
+
+    def _extend_cluster(self, lat, lng, at, step):
+        s = self.state
+        s.cluster_ended_at = at
+        s.cluster_count += 1
+        s.cluster_latitude_sum += lat
+        s.cluster_longitude_sum += lng
+        s.cluster_distance += step
+
+        if s.stop is not None:
+            stop = s.stop
+            stop.ended_at = at
+            stop.point_count = s.cluster_count
+            stop.latitude = _coord(s.cluster_latitude_sum / s.cluster_count)
+            stop.longitude = _coord(s.cluster_longitude_sum / s.cluster_count)
+            self.dirty.add(stop)
+            return
+
+        duration = (s.cluster_ended_at - s.cluster_started_at).total_seconds()
+        if duration >= STOP_MIN_SECONDS:
+            self._confirm_stop()
+
+    def _confirm_stop(self):
+        s = self.state
+        stop = self._new(
+            self.spare_stops,
+            Stop,
+            user_id=s.user_id,
+            latitude=_coord(s.cluster_latitude_sum / s.cluster_count),
+            longitude=_coord(s.cluster_longitude_sum / s.cluster_count),
+            started_at=s.cluster_started_at,
+            ended_at=s.cluster_ended_at,
+            point_count=s.cluster_count,
+        )
+
+        # the trip leading here ends where the stay began
+        if s.trip is not None:
+            trip = s.trip
+            trip.ended_at = s.cluster_started_at
+            trip.end_stop = stop
+            trip.save()
+            self.dirty.discard(trip)
+            s.trip = None
+
+        s.stop = stop
+
+    def _leave_cluster(self, at, step):
+        s = self.state
+
+        if s.stop is not None:
+            # departing a stop starts a new trip
+            trip = self._new(
+                self.spare_trips,
+                Trip,
+                user_id=s.user_id,
+                start_stop=s.stop,
+                end_stop=None,
+                started_at=s.stop.ended_at,
+                ended_at=at,
+                distance_meters=step,
+                point_count=0,
+            )
+            if s.stop in self.dirty:
+                s.stop.save()
+                self.dirty.discard(s.stop)
+            s.stop = None
+            s.trip = trip
+            return
+
+        # a cluster too short to be a stop is just part of the trip
+        trip = s.trip
+        if trip is None:
+            trip = self._new(
+                self.spare_trips,
+                Trip,
+                user_id=s.user_id,
+                start_stop=None,
+                end_stop=None,
+                started_at=s.cluster_started_at,
+                ended_at=at,
+                distance_meters=0,
+                point_count=0,
+            )
+            s.trip = trip
+
+        trip.distance_meters += s.cluster_distance + step
+        trip.point_count += s.cluster_count
+        trip.ended_at = at
+        self.dirty.add(trip)
+
+
+# ======================================================
+# INGEST HOOKS
+# ======================================================
+def segment_fixes(user, locations):
+    """
+    Extend the user's stops/trips with freshly stored fixes. Fixes older
+    than the segmenter's position trigger a resegmentation from there.
+    """
+    if not locations:
+        return
+
+    locations = sorted(locations, key=lambda l: l.recorded_at)
+
+    with transaction.atomic():
+        segmenter = Segmenter.load(user)
+        last_at = segmenter.state.last_at
+
+        if last_at and locations[0].recorded_at <= last_at:
+            resegment(user, locations[0].recorded_at)
+            return
+
+        for location in locations:
+            segmenter.feed(location.latitude, location.longitude, location.recorded_at)
+        segmenter.save()
+
+
+def resegment(user, since):
+    """
+    Rebuild stops/trips from the last stop that began before `since`.
+    The segmenter restarts at that stop's first fix with the trip leading
+    into it open again (nothing earlier changes), and the stops/trips from
+    there on are reused in order, so ids survive a late fix; only rows the
+    new pass no longer needs are deleted.
+    """
+    with transaction.atomic():
+        segmenter = Segmenter.load(user)
+
+        fixes = LocationLog.objects.filter(user_id=user.id)
+        stops = Stop.objects.filter(user_id=user.id)
+        trips = Trip.objects.filter(user_id=user.id)
+
+        restart = stops.filter(started_at__lt=since).order_by("-started_at").first()
+        if restart is None:
+            # nothing settled before `since`: from the first fix
+            segmenter.reset()
+        else:
+            fixes = fixes.filter(recorded_at__gte=restart.started_at)
+            stops = stops.filter(started_at__gte=restart.started_at)
+            trips = trips.filter(started_at__gte=restart.started_at)
+            segmenter.reset(Trip.objects.filter(end_stop=restart).first())
+
+        segmenter.spare_stops = list(stops.order_by("started_at", "id"))
+        segmenter.spare_trips = list(trips.order_by("started_at", "id"))
+
+        fixes = fixes.order_by("recorded_at", "id").values_list(
+            "latitude", "longitude", "recorded_at"
+        )
+        for lat, lng, at in fixes.iterator():
+            segmenter.feed(lat, lng, at)
+        segmenter.save()
+
+        # trips first: deleting a stop would null their links
+        Trip.objects.filter(pk__in=[t.pk for t in segmenter.spare_trips]).delete()
+        Stop.objects.filter(pk__in=[s.pk for s in segmenter.spare_stops]).delete()
@@ -1,8 +1,41 @@
 from rest_framework import serializers
-from .models import LocationLog, Attendance,GeofenceEvent
+from .models import LocationLog, Attendance,GeofenceEvent, Stop, Trip, DailyRollup
+from .ingest import fix_time
 from datetime import datetime
+from django.conf import settings
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema_field # Import this if using drf-spectacular
+from config.fastserializers import Computed, ValuesSerializer
+
+
+def recorded_millis(recorded_at):
+    if recorded_at:
+        return int(recorded_at.timestamp() * 1000)
+    return 0
+
+
+def attendance_status(check_in, work_start_time):
+    if not check_in:
+        return "ABSENT"
+    if check_in.time() > work_start_time:
+        return "LATE"
+    return "PRESENT"
+
+
+def late_minutes(day, check_in, work_start_time):
+    if not check_in:
+        return 0
+
+    start_dt = timezone.make_aware(datetime.combine(day, work_start_time))
+    if check_in <= start_dt:
+        return 0
+
+    return int((check_in - start_dt).total_seconds() / 60)
+
+
+# one buffered upload carries at most this many fixes (offline backlog)
+MAX_UPLOAD_FIXES = getattr(settings, "GPS_MAX_UPLOAD_FIXES", 500)
+
 
 # -------------------------
 # CREATE (INPUT) SERIALIZER
@@ -15,14 +48,23 @@ class LocationCreateSerializer(serializers.ModelSerializer):
         model = LocationLog
         fields = ['latitude', 'longitude', 'millis']
 
-    def create(self, validated_data):
-        # millis data-ti niye recorded_at field-e convert kora (optional logic)
-        millis = validated_data.pop('millis', None)
-        if millis:
-            # millisecond ke datetime object-e convert kora
-            validated_data['recorded_at'] = datetime.fromtimestamp(millis / 1000.0)
-        
-        return super().create(validated_data)
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        kwargs.setdefault("max_length", MAX_UPLOAD_FIXES)
+        return super().many_init(*args, **kwargs)
+
+    def validate(self, attrs):
+        # millis (device time) theke recorded_at banano, UTC aware.
+        # (user, millis) fix-er idempotency key, tai millis shob shomoy thakbe
+        millis = attrs.get('millis')
+        if millis is not None:
+            attrs['recorded_at'] = fix_time(millis)
+        else:
+            now = timezone.now()
+            attrs['millis'] = int(now.timestamp() * 1000)
+            attrs['recorded_at'] = now
+
+        return attrs
 
 
 # -------------------------
@@ -37,9 +79,26 @@ class LocationReadSerializer(serializers.ModelSerializer):
 
     # Add '-> int' to fix the type hint warning
     def get_millis(self, obj) -> int:
-        if obj.recorded_at:
-            return int(obj.recorded_at.timestamp() * 1000)
-        return 0
+        return recorded_millis(obj.recorded_at)
+
+
+class LocationReadValues(ValuesSerializer):
+    """LocationReadSerializer output from values_list() rows (list endpoints)."""
+    model = LocationLog
+    fields = LocationReadSerializer.Meta.fields
+    computed = {
+        "millis": Computed(recorded_millis, "recorded_at"),
+    }
+
+
+class TrackPointValues(LocationReadValues):
+    """
+    The same fields for downsampled_track() tuples (latitude, longitude,
+    recorded_at): ?points playback keeps the raw list's types.
+    """
+    fields = ("latitude", "longitude", "millis", "recorded_at")
+
+
 # -------------------------
 # ATTENDANCE SERIALIZER
 # -------------------------
@@ -69,32 +128,28 @@ class AttendanceReportSerializer(serializers.ModelSerializer):
     def get_status(self, obj) -> str:
         if not obj.check_in:
             return "ABSENT"
-
-        office = obj.office
-        if obj.check_in.time() > office.work_start_time:
-            return "LATE"
-
-        return "PRESENT"
+        return attendance_status(obj.check_in, obj.office.work_start_time)
 
     # Add -> int to tell the documentation it returns an integer
     def get_late_minutes(self, obj) -> int:
         if not obj.check_in:
             return 0
+        return late_minutes(obj.date, obj.check_in, obj.office.work_start_time)
 
-        office = obj.office
-        start_dt = timezone.make_aware(
-            datetime.combine(obj.date, office.work_start_time)
-        )
 
-        if obj.check_in <= start_dt:
-            return 0
-
-        return int((obj.check_in - start_dt).total_seconds() / 60)
+class AttendanceReportValues(ValuesSerializer):
+    """AttendanceReportSerializer output from values_list() rows."""
+    model = Attendance
+    fields = AttendanceReportSerializer.Meta.fields
+    computed = {
+        "status": Computed(attendance_status, "check_in", "office__work_start_time"),
+        "late_minutes": Computed(late_minutes, "date", "check_in", "office__work_start_time"),
+    }
 
 
 class GeofenceEventSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(
-        source="user.full_name",
+        source="user.display_name",
         read_only=True
     )
 
@@ -107,3 +162,51 @@ class GeofenceEventSerializer(serializers.ModelSerializer):
             "event",
             "occurred_at",
         ]
+
+
+# -------------------------
+# STOP / TRIP SERIALIZERS
+# -------------------------
+class StopSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Stop
+        fields = [
+            "id",
+            "latitude",
+            "longitude",
+            "started_at",
+            "ended_at",
+            "point_count",
+        ]
+
+
+class TripSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Trip
+        fields = [
+            "id",
+            "start_stop",
+            "end_stop",
+            "started_at",
+            "ended_at",
+            "distance_meters",
+            "point_count",
+        ]
+
+
+# -------------------------
+# DAILY ROLLUP SERIALIZER
+# -------------------------
+class DailyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyRollup
+        fields = [
+            "user",
+            "date",
+            "distance_meters",
+            "moving_seconds",
+            "office_seconds",
+            "fix_count",
+            "first_fix_at",
+            "last_fix_at",
+        ]
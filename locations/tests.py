@@ -1,3 +1,548 @@
-from django.test import TestCase
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from users.models import Division, EmployeeProfile, User
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+from .models import Attendance, DailyRollup, GeofenceEvent, LocationLog, Office, SegmentState, Stop, TrackPoint, TrackTierCursor, Trip
+from .serializers import (
+    MAX_UPLOAD_FIXES,
+    AttendanceReportSerializer,
+    AttendanceReportValues,
+    LocationCreateSerializer,
+    LocationReadSerializer,
+    LocationReadValues,
+)
+from .throttles import GPSThrottle
+from .pipeline import run_pipeline
+from .rollups import rebuild_rollup
+from .tiers import build_tiers
+
+
+def make_user(email, role="EMPLOYEE"):
+    return User.objects.create_user(email=email, password="x", name=email.split("@")[0], role=role)
+
+
+# ======================================================
+# GPS THROTTLE / UPLOADS
+# ======================================================
+class GPSThrottleCostTests(SimpleTestCase):
+    def cost(self, fixes):
+        throttle = GPSThrottle()
+        throttle.num_requests, throttle.duration = 60, 60
+        return throttle.get_cost(SimpleNamespace(data=fixes))
+
+    def test_single_fix_costs_one(self):
+        self.assertEqual(self.cost({"latitude": "23.8", "longitude": "90.4"}), 1)
+
+    def test_live_fixes_are_charged_in_full(self):
+        now = int(time.time() * 1000)
+        self.assertEqual(self.cost([{"millis": now - i * 1000} for i in range(10)]), 10)
+
+    def test_backdated_fixes_are_not_free(self):
+        old = int(time.time() * 1000) - 3600 * 1000
+        self.assertEqual(self.cost([{"millis": old - i} for i in range(200)]), 20)
+
+    def test_cost_never_exceeds_the_window(self):
+        now = int(time.time() * 1000)
+        self.assertEqual(self.cost([{"millis": now}] * 100), 60)
+
+
+class LocationUploadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("employee@test.local"))
+
+    def test_oversized_upload_is_rejected(self):
+        now = int(time.time() * 1000)
+        fixes = [
+            {"latitude": "23.8", "longitude": "90.4", "millis": now - i * 1000}
+            for i in range(MAX_UPLOAD_FIXES + 1)
+        ]
+
+        response = self.client.post("/api/locations/send/", fixes, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RunPipelineTests(TestCase):
+    def setUp(self):
+        self.user = make_user("employee@test.local")
+        Office.objects.create(name="Office", latitude="23.8", longitude="90.4")
+        at = datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc)
+        self.fixes = [{
+            "latitude": "23.8", "longitude": "90.4",
+            "millis": int(at.timestamp() * 1000), "recorded_at": at,
+        }]
+
+    def test_failed_stage_rolls_back_the_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch("locations.pipeline.update_rollups", side_effect=RuntimeError("boom")):
+                with self.assertRaises(RuntimeError):
+                    run_pipeline(self.user, self.fixes)
+
+        self.assertFalse(LocationLog.objects.exists())
+        self.assertFalse(Attendance.objects.exists())
+
+        # the retry is processed, not dropped as a replay
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(run_pipeline(self.user, self.fixes))
+
+        self.assertEqual(LocationLog.objects.count(), 1)
+        self.assertIsNotNone(Attendance.objects.get().check_in)
+
+
+# ======================================================
+# ATTENDANCE (LATE FIXES)
+# ======================================================
+class LateFixTests(TestCase):
+    INSIDE, OUTSIDE = "23.800000", "23.900000"
+
+    def setUp(self):
+        self.user = make_user("employee@test.local")
+        Office.objects.create(name="Office", latitude="23.8", longitude="90.4")
+        self.start = datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc)
+
+    def upload(self, *fixes):
+        batch = []
+        for minutes, latitude in fixes:
+            at = self.start + timedelta(minutes=minutes)
+            batch.append({
+                "latitude": latitude, "longitude": "90.4",
+                "millis": int(at.timestamp() * 1000), "recorded_at": at,
+            })
+        run_pipeline(self.user, batch)
+
+    def events(self):
+        return list(GeofenceEvent.objects.order_by("occurred_at").values_list("event", "occurred_at"))
+
+    def test_late_fix_between_agreeing_neighbours_is_merged(self):
+        self.upload((0, self.INSIDE), (20, self.INSIDE))
+
+        with mock.patch("locations.ingest.recompute_attendance") as recompute:
+            self.upload((10, self.INSIDE))
+
+        recompute.assert_not_called()
+        attendance = Attendance.objects.get()
+        self.assertEqual(attendance.check_in, self.start)
+        self.assertEqual(attendance.last_fix_at, self.start + timedelta(minutes=20))
+        self.assertEqual(self.events(), [("ENTER", self.start)])
+
+    def test_late_fix_that_changes_the_day_is_recomputed(self):
+        self.upload((0, self.OUTSIDE), (20, self.INSIDE))
+        self.assertEqual(Attendance.objects.get().check_in, self.start + timedelta(minutes=20))
+
+        self.upload((10, self.INSIDE))
+
+        attendance = Attendance.objects.get()
+        self.assertEqual(attendance.check_in, self.start + timedelta(minutes=10))
+        self.assertEqual(attendance.last_fix_at, self.start + timedelta(minutes=20))
+        self.assertEqual(self.events(), [("ENTER", self.start + timedelta(minutes=10))])
+
+
+# ======================================================
+# STOPS / TRIPS
+# ======================================================
+class SegmentationTests(TestCase):
+    # ~2.2 km apart; one fix a minute
+    A, B, C = "23.800000", "23.820000", "23.840000"
+
+    def setUp(self):
+        self.user = make_user("employee@test.local")
+        self.start = datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc)
+
+    def upload(self, fixes):
+        batch = []
+        for minutes, latitude in fixes:
+            at = self.start + timedelta(minutes=minutes)
+            batch.append({
+                "latitude": latitude, "longitude": "90.400000",
+                "millis": int(at.timestamp() * 1000), "recorded_at": at,
+            })
+        run_pipeline(self.user, batch)
+
+    def stay(self, latitude, first, last, skip=()):
+        return [(m, latitude) for m in range(first, last + 1) if m not in skip]
+
+    def move(self, first, *latitudes):
+        return [(first + i, latitude) for i, latitude in enumerate(latitudes)]
+
+    def day(self, skip=()):
+        return (
+            self.stay(self.A, 0, 10, skip)
+            + self.move(11, "23.805000", "23.810000", "23.815000")
+            + self.stay(self.B, 14, 24, skip)
+            + self.move(25, "23.825000", "23.830000", "23.835000")
+            + self.stay(self.C, 28, 38, skip)
+        )
+
+    def snapshot(self):
+        stops = list(Stop.objects.order_by("started_at").values_list("id", "started_at", "ended_at", "point_count"))
+        trips = list(Trip.objects.order_by("started_at").values_list("id", "start_stop", "end_stop", "started_at", "ended_at"))
+        return stops, trips
+
+    def test_stop_trip_stop(self):
+        self.upload(self.day())
+
+        stops, trips = self.snapshot()
+        self.assertEqual([(s[1], s[2], s[3]) for s in stops], [
+            (self.start, self.start + timedelta(minutes=10), 11),
+            (self.start + timedelta(minutes=14), self.start + timedelta(minutes=24), 11),
+            (self.start + timedelta(minutes=28), self.start + timedelta(minutes=38), 11),
+        ])
+        self.assertEqual([(t[1], t[2]) for t in trips], [(stops[0][0], stops[1][0]), (stops[1][0], stops[2][0])])
+        self.assertEqual(trips[0][3:], (self.start + timedelta(minutes=10), self.start + timedelta(minutes=14)))
+
+    def test_late_fix_inside_an_earlier_stop(self):
+        self.upload(self.day())
+        expected = self.snapshot()
+        Stop.objects.all().delete()
+        Trip.objects.all().delete()
+        LocationLog.objects.all().delete()
+        SegmentState.objects.all().delete()
+
+        # the same track with minute 20 (inside stop B) arriving last
+        self.upload(self.day(skip=(20,)))
+        before = self.snapshot()
+        self.upload([(20, self.B)])
+        after = self.snapshot()
+
+        # same rows, trip A -> B still linked to B
+        self.assertEqual([s[0] for s in after[0]], [s[0] for s in before[0]])
+        self.assertEqual([t[0] for t in after[1]], [t[0] for t in before[1]])
+        strip = lambda snapshot: ([s[1:] for s in snapshot[0]], [t[3:] for t in snapshot[1]])
+        self.assertEqual(strip(after), strip(expected))
+        stop_ids = [s[0] for s in after[0]]
+        self.assertEqual([(t[1], t[2]) for t in after[1]], [(stop_ids[0], stop_ids[1]), (stop_ids[1], stop_ids[2])])
+
+
+# ======================================================
+# DAILY ROLLUPS
+# ======================================================
+class DailyRollupTests(TestCase):
+    FIELDS = (
+        "distance_meters", "moving_seconds", "office_seconds", "fix_count",
+        "first_fix_at", "last_fix_at", "last_latitude", "last_longitude",
+    )
+
+    def setUp(self):
+        self.user = make_user("employee@test.local")
+        Office.objects.create(name="Office", latitude="23.8", longitude="90.4")
+        self.start = datetime(2026, 1, 1, 3, tzinfo=dt_timezone.utc)
+        # in the office, a walk out, a stand-still, a walk back; a fix a minute
+        latitudes = ["23.800000"] * 5 + [f"23.80{i}000" for i in range(1, 10)] + ["23.809000"] * 5
+        latitudes += [f"23.80{i}000" for i in range(8, -1, -1)]
+        self.fixes = list(enumerate(latitudes))
+
+    def upload(self, fixes):
+        run_pipeline(self.user, [{
+            "latitude": latitude, "longitude": "90.400000",
+            "millis": int((self.start + timedelta(minutes=m)).timestamp() * 1000),
+            "recorded_at": self.start + timedelta(minutes=m),
+        } for m, latitude in fixes])
+
+    def totals(self):
+        return DailyRollup.objects.values(*self.FIELDS).get()
+
+    def assert_matches_rebuild(self):
+        incremental = self.totals()
+        rebuild_rollup(self.user, timezone.localdate(self.start))
+        rebuilt = self.totals()
+
+        self.assertAlmostEqual(incremental.pop("distance_meters"), rebuilt.pop("distance_meters"), places=6)
+        self.assertEqual(incremental, rebuilt)
+        return rebuilt
+
+    def test_two_batches_match_a_rebuild(self):
+        half = len(self.fixes) // 2
+        self.upload(self.fixes[:half])
+        self.upload(self.fixes[half:])
+
+        totals = self.assert_matches_rebuild()
+        self.assertEqual(totals["fix_count"], len(self.fixes))
+        self.assertGreater(totals["moving_seconds"], 0)
+        self.assertTrue(totals["office_seconds"])
+
+    def test_late_batch_matches_a_rebuild(self):
+        self.upload(self.fixes[::2])
+        self.upload(self.fixes[1::2])
+
+        self.assertEqual(self.assert_matches_rebuild()["fix_count"], len(self.fixes))
+
+
+class LocationCreateSerializerTests(SimpleTestCase):
+    def test_zero_millis_is_device_time(self):
+        serializer = LocationCreateSerializer(data={"latitude": "23.8", "longitude": "90.4", "millis": 0})
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data["millis"], 0)
+        self.assertEqual(serializer.validated_data["recorded_at"], datetime(1970, 1, 1, tzinfo=dt_timezone.utc))
+
+
+class DuplicateFixMigrationTests(TransactionTestCase):
+    before = [("locations", "0008_attendance_last_fix_at_alter_geofenceevent_occurred_at_and_more")]
+    after = [("locations", "0009_alter_locationlog_unique_together")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_removed_before_the_constraint(self):
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model("users", "User")
+        OldLocationLog = apps.get_model("locations", "LocationLog")
+
+        user = OldUser.objects.create(email="employee@test.local", name="employee", role="EMPLOYEE")
+        first, _, other = (
+            OldLocationLog.objects.create(user=user, latitude="23.8", longitude="90.4", millis=millis)
+            for millis in (1000, 1000, 2000)
+        )
+        OldLocationLog.objects.create(user=user, latitude="23.8", longitude="90.4", millis=1000)
+
+        apps = self.migrate(self.after)
+
+        ids = apps.get_model("locations", "LocationLog").objects.values_list("id", flat=True)
+        self.assertEqual(sorted(ids), [first.id, other.id])
+
+
+# ======================================================
+# TRACK TIERS
+# ======================================================
+class BuildTiersTests(TestCase):
+    def setUp(self):
+        self.user = make_user("employee@test.local")
+        self.start = datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc)
+
+    def fix(self, seconds, **fields):
+        at = self.start + timedelta(seconds=seconds)
+        return LocationLog.objects.create(
+            user=self.user, latitude="23.8", longitude="90.4",
+            millis=int(at.timestamp() * 1000), recorded_at=at, **fields
+        )
+
+    def test_late_commit_with_lower_id_is_folded_in(self):
+        self.fix(600, id=100)
+        build_tiers()
+        self.assertEqual(TrackTierCursor.objects.get().last_location_id, 0)
+
+        # inserted before id 100 but committed after the run above
+        self.fix(0, id=50)
+        build_tiers()
+
+        self.assertEqual(
+            TrackPoint.objects.filter(recorded_at=self.start).count(),
+            len(TrackPoint.RESOLUTIONS),
+        )
+
+    def test_cursor_moves_past_settled_rows(self):
+        old = self.fix(0)
+        LocationLog.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(minutes=5))
+        self.fix(60)
+
+        self.assertEqual(build_tiers(), 1)
+        self.assertEqual(TrackTierCursor.objects.get().last_location_id, old.id)
+
+    def test_points_playback_matches_the_list_types(self):
+        for seconds in (0, 60, 120):
+            self.fix(seconds)
+        client = APIClient()
+        client.force_authenticate(make_user("admin@test.local", role="SUPERADMIN"))
+        url = f"/api/locations/user/{self.user.id}/"
+
+        listed = client.get(url).json()
+        played = client.get(url, {"points": 1000}).json()
+
+        listed = listed.get("results", listed)
+        fields = ("latitude", "longitude", "millis", "recorded_at")
+        self.assertIsNone(played["resolution"])
+        self.assertEqual(played["results"], [{f: row[f] for f in fields} for row in listed])
+        self.assertIsInstance(played["results"][0]["latitude"], str)
+
+    def test_route_is_routed(self):
+        self.fix(0)
+        client = APIClient()
+        client.force_authenticate(make_user("admin@test.local", role="SUPERADMIN"))
+
+        response = client.get(f"/api/locations/user/{self.user.id}/route/?points=10")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+
+class AsyncSendLocationTests(TestCase):
+    def setUp(self):
+        user = make_user("employee@test.local")
+        access = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        self.headers = {"Authorization": f"Bearer {access}"}
+
+    async def post(self, data):
+        return await self.async_client.post(
+            "/api/locations/async/send/", data, content_type="application/json", headers=self.headers
+        )
+
+    async def test_fix_is_stored(self):
+        response = await self.post({"latitude": "23.8", "longitude": "90.4"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(await LocationLog.objects.acount(), 1)
+
+    async def test_throttled_upload(self):
+        with mock.patch.object(GPSThrottle, "allow_request", return_value=False), \
+                mock.patch.object(GPSThrottle, "wait", return_value=7):
+            response = await self.post({"latitude": "23.8", "longitude": "90.4"})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+
+
+# ======================================================
+# DIVISION LIVE LOCATIONS
+# ======================================================
+class DivisionLiveLocationTests(TestCase):
+    def setUp(self):
+        self.division = Division.objects.create(name="Live Division")
+        self.admin = make_user("admin@test.local", role="ADMIN")
+        self.client = APIClient()
+        self.start = datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc)
+
+    def employee(self, email, admin=None):
+        user = User.objects.create(email=email, name=email.split("@")[0], role="EMPLOYEE")
+        EmployeeProfile.objects.create(user=user, admin=admin, division=self.division)
+        for minutes in (0, 30, 10):
+            at = self.start + timedelta(minutes=minutes)
+            LocationLog.objects.create(
+                user=user, latitude=f"23.8{minutes:02d}", longitude="90.4",
+                millis=int(at.timestamp() * 1000), recorded_at=at,
+            )
+        return user
+
+    def live(self):
+        return self.client.get(f"/api/locations/division/{self.division.id}/live/")
+
+    def test_latest_fix_per_employee(self):
+        mine = self.employee("mine@test.local", admin=self.admin)
+        self.employee("other@test.local")
+        self.client.force_authenticate(self.admin)
+
+        response = self.live()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["user_id"] for row in response.data], [str(mine.id)])
+        self.assertEqual(response.data[0]["time"], self.start + timedelta(minutes=30))
+
+    def test_anonymous_is_rejected(self):
+        self.assertEqual(self.live().status_code, 401)
+
+
+# ======================================================
+# FAST SERIALIZERS
+# ======================================================
+class ValuesSerializerTests(TestCase):
+    """The values_list() fast path renders the same JSON bytes as the ModelSerializer."""
+
+    def setUp(self):
+        self.user = make_user("employee@test.local")
+        self.office = Office.objects.create(name="Office", latitude="23.810332", longitude="90.412518")
+        self.start = datetime(2026, 1, 1, 8, tzinfo=dt_timezone.utc)
+
+    def assert_same_json(self, queryset, serializer_class, values_class):
+        renderer = JSONRenderer()
+        slow = serializer_class(list(queryset), many=True).data
+        fast = values_class.serialize(list(values_class.rows(queryset)))
+
+        self.assertTrue(fast)
+        self.assertEqual(renderer.render(fast), renderer.render(slow))
+
+    def test_locations(self):
+        for i in range(5):
+            at = self.start + timedelta(seconds=i)
+            LocationLog.objects.create(
+                user=self.user, latitude=f"23.81{i}001", longitude="90.4125",
+                millis=int(at.timestamp() * 1000),
+                # a fix without device time
+                recorded_at=None if i == 2 else at,
+            )
+
+        self.assert_same_json(
+            LocationLog.objects.filter(user=self.user).order_by("-recorded_at"),
+            LocationReadSerializer,
+            LocationReadValues,
+        )
+
+    def test_attendance_report(self):
+        for i in range(6):
+            day = self.start.date() + timedelta(days=i)
+            # absent, on time and late days
+            check_in = None if i % 3 == 0 else self.start + timedelta(days=i, hours=i, minutes=7 * i)
+            Attendance.objects.create(user=self.user, office=self.office, date=day, check_in=check_in)
+
+        self.assert_same_json(
+            Attendance.objects.filter(user=self.user).select_related("office").order_by("date"),
+            AttendanceReportSerializer,
+            AttendanceReportValues,
+        )
+
+
+# ======================================================
+# QUERY BUDGETS
+# ======================================================
+class LocationQueryBudgetTests(TestCase):
+    """List endpoints run a fixed number of queries whatever the page size (no N+1)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user("admin@test.local", role="SUPERADMIN"))
+        self.employee = make_user("employee@test.local")
+        self.office = Office.objects.create(name="Budget Office", latitude="23.81", longitude="90.41")
+        self.start = datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc)
+        self.size = 0
+
+    def grow(self, size):
+        for i in range(self.size, size):
+            at = self.start + timedelta(days=i)
+            # a different user per event: user names come from a join
+            user = User.objects.create(email=f"walker{i}@test.local", name=f"Walker {i}", role="EMPLOYEE")
+            GeofenceEvent.objects.create(user=user, office=self.office, event="ENTER", occurred_at=at)
+            LocationLog.objects.create(
+                user=self.employee, latitude="23.81", longitude="90.41",
+                millis=int(at.timestamp() * 1000), recorded_at=at,
+            )
+            Stop.objects.create(
+                user=self.employee, latitude="23.81", longitude="90.41",
+                started_at=at, ended_at=at + timedelta(minutes=5),
+            )
+            Attendance.objects.create(user=self.employee, office=self.office, date=at.date(), check_in=at)
+        self.size = size
+
+    def assert_budget(self, url, budget):
+        for size in (3, 25):
+            self.grow(size)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_geofence_events(self):
+        self.assert_budget("/api/geofence/events/", 2)
+
+    def test_user_locations(self):
+        self.assert_budget(f"/api/locations/user/{self.employee.id}/", 2)
+
+    def test_user_stops(self):
+        self.assert_budget(f"/api/locations/user/{self.employee.id}/stops/", 2)
+
+    def test_monthly_attendance(self):
+        self.assert_budget(f"/api/attendance/user/{self.employee.id}/monthly/?month=2026-01", 2)
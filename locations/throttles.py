@@ -1,5 +1,175 @@
 # locations/throttles.py
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
 from rest_framework.throttling import UserRateThrottle
 
+logger = logging.getLogger(__name__)
+
+# share of a fix's cost charged for backlog fixes (device time before the
+# window); uploads themselves are capped by GPS_MAX_UPLOAD_FIXES
+BACKLOG_FIX_COST = getattr(settings, "GPS_BACKLOG_FIX_COST", 0.1)
+
+
+# ======================================================
+# COUNTER BACKENDS
+# ======================================================
+class LocalCounterBackend:
+    """In-process counters; used alone in dev or when the cache is down."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            values = {}
+            for key in keys:
+                entry = self._counters.get(key)
+                if entry and entry[0] > now:
+                    values[key] = entry[1]
+            return values
+
+    def incr(self, key, amount, ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counters.get(key)
+            value = entry[1] if entry and entry[0] > now else 0
+            value += amount
+            self._counters[key] = (now + ttl, value)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return value
+
+
+class CacheCounterBackend:
+    """Counters in a Django cache (Redis in production): atomic incr."""
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+
+    def get_many(self, keys):
+        return caches[self.alias].get_many(keys)
+
+    def incr(self, key, amount, ttl):
+        cache = caches[self.alias]
+        cache.add(key, 0, ttl)
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            # expired between add and incr
+            cache.set(key, amount, ttl)
+            return amount
+
+
+local_counters = LocalCounterBackend()
+
+
+def get_counter_backend():
+    alias = getattr(settings, "GPS_THROTTLE_CACHE", None)
+    if alias:
+        return CacheCounterBackend(alias)
+    return local_counters
+
+
+# ======================================================
+# SLIDING WINDOW COUNTER
+# ======================================================
+def sliding_window_hit(backend, key, cost, limit, window, now=None):
+    """
+    Two fixed-window counters weighted by overlap approximate a true
+    sliding window in O(1) memory per key. Returns (allowed, wait_seconds).
+    """
+    now = time.time() if now is None else now
+    index = int(now // window)
+    elapsed = now - index * window
+    weight = (window - elapsed) / window
+
+    current_key = f"{key}:{index}"
+    previous_key = f"{key}:{index - 1}"
+
+    previous = backend.get_many([previous_key]).get(previous_key, 0)
+    # incr first, then check: concurrent requests can't both slip under
+    current = backend.incr(current_key, cost, ttl=2 * window)
+
+    if previous * weight + current <= limit:
+        return True, 0
+
+    backend.incr(current_key, -cost, ttl=2 * window)
+    current -= cost
+
+    if current + cost > limit or not previous:
+        wait = window - elapsed
+    else:
+        # time until enough of the previous window has slid out
+        needed = previous * weight + current + cost - limit
+        wait = needed * window / previous
+    return False, wait
+
+
 class GPSThrottle(UserRateThrottle):
+    """
+    `gps` rate counted in fixes, not requests. A buffered upload is charged
+    in full for the fixes recorded inside the current window and at
+    BACKLOG_FIX_COST each for backlog fixes from earlier, so backdated
+    millis can't push fixes for free.
+    """
     scope = "gps"
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cost = self.get_cost(request)
+
+        try:
+            allowed, self.wait_seconds = sliding_window_hit(
+                get_counter_backend(), self.key, cost,
+                self.num_requests, self.duration,
+            )
+        except Exception:
+            logger.warning("GPS throttle cache unavailable, using local counters", exc_info=True)
+            allowed, self.wait_seconds = sliding_window_hit(
+                local_counters, self.key, cost,
+                self.num_requests, self.duration,
+            )
+
+        return allowed
+
+    def get_cost(self, request):
+        data = request.data
+        if not isinstance(data, list):
+            return 1
+
+        window_start = (time.time() - self.duration) * 1000
+        recent = 0
+        backlog = 0
+        for fix in data:
+            try:
+                millis = int(fix.get("millis"))
+            except (AttributeError, TypeError, ValueError):
+                # no device time: treated as live
+                recent += 1
+                continue
+            if millis >= window_start:
+                recent += 1
+            else:
+                backlog += 1
+
+        cost = recent + math.ceil(backlog * BACKLOG_FIX_COST)
+        return min(max(1, cost), self.num_requests)
+
+    def wait(self):
+        return math.ceil(self.wait_seconds) if self.wait_seconds else None
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import LocationLog, TrackPoint, TrackTierCursor
+
+# GPSThrottle allows 60 fixes/min, so raw density is at most one per second
+RAW_SECONDS_PER_POINT = 1
+# ids are assigned at insert, not commit: rows younger than this are folded
+# in but the cursor stays before them, so a lower id committing late is
+# still picked up by the next run (re-folding a row is a no-op)
+CURSOR_LAG = timedelta(seconds=60)
+
+
+def bucket_start(at, resolution):
+    ts = int(at.timestamp()) // resolution * resolution
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+# ======================================================
+# BACKGROUND BUILD
+# ======================================================
+def build_tiers(batch_size=5000):
+    """
+    Fold LocationLog rows newer than the cursor into every TrackPoint tier.
+    Late fixes have newer ids too, so they are picked up like any other
+    and replace a bucket's representative when they are earlier.
+    Returns the number of fixes the cursor moved past.
+    """
+    settled_before = timezone.now() - CURSOR_LAG
+
+    with transaction.atomic():
+        cursor, _ = TrackTierCursor.objects.select_for_update().get_or_create(pk=1)
+
+        rows = list(
+            LocationLog.objects.filter(
+                id__gt=cursor.last_location_id,
+                recorded_at__isnull=False,
+            ).order_by("id").values_list(
+                "id", "user_id", "latitude", "longitude", "recorded_at", "created_at"
+            )[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        for resolution in TrackPoint.RESOLUTIONS:
+            _merge_tier(resolution, [row[:5] for row in rows])
+
+        settled = 0
+        for row in rows:
+            if row[5] > settled_before:
+                break
+            settled += 1
+
+        if settled:
+            cursor.last_location_id = rows[settled - 1][0]
+            cursor.save(update_fields=["last_location_id", "updated_at"])
+
+    return settled
+
+
+def _merge_tier(resolution, rows):
+    # earliest fix per (user, bucket) within this batch
+    candidates = {}
+    for _, user_id, lat, lng, at in rows:
+        key = (user_id, bucket_start(at, resolution))
+        current = candidates.get(key)
+        if current is None or at < current[2]:
+            candidates[key] = (lat, lng, at)
+
+    buckets = [bucket for _, bucket in candidates]
+    existing = {
+        (point.user_id, point.bucket): point
+        for point in TrackPoint.objects.filter(
+            resolution=resolution,
+            user_id__in={user_id for user_id, _ in candidates},
+            bucket__gte=min(buckets),
+            bucket__lte=max(buckets),
+        )
+    }
+
+    created = []
+    updated = []
+    for (user_id, bucket), (lat, lng, at) in candidates.items():
+        point = existing.get((user_id, bucket))
+        if point is None:
+            created.append(TrackPoint(
+                user_id=user_id,
+                resolution=resolution,
+                bucket=bucket,
+                latitude=lat,
+                longitude=lng,
+                recorded_at=at,
+            ))
+        elif at < point.recorded_at:
+            point.latitude = lat
+            point.longitude = lng
+            point.recorded_at = at
+            updated.append(point)
+
+    TrackPoint.objects.bulk_create(created, batch_size=1000)
+    TrackPoint.objects.bulk_update(
+        updated,
+        ["latitude", "longitude", "recorded_at"],
+        batch_size=1000,
+    )
+
+
+# ======================================================
+# READ SIDE
+# ======================================================
+def pick_resolution(span_seconds, budget):
+    """
+    Finest source that fits `budget` points over the span: None for raw
+    fixes, otherwise a TrackPoint resolution (the coarsest if none fit).
+    """
+    if span_seconds / RAW_SECONDS_PER_POINT <= budget:
+        return None
+
+    for resolution in TrackPoint.RESOLUTIONS:
+        if span_seconds / resolution <= budget:
+            return resolution
+
+    return TrackPoint.RESOLUTIONS[-1]
+
+
+def track_span(user_id, start=None, end=None):
+    """Fill a missing start/end from the user's first/last fix (index only)."""
+    if start is None or end is None:
+        bounds = LocationLog.objects.filter(user_id=user_id).aggregate(
+            first=Min("recorded_at"),
+            last=Max("recorded_at"),
+        )
+        start = start or bounds["first"]
+        end = end or bounds["last"]
+    return start, end
+
+
+def downsampled_track(user_id, budget, start=None, end=None):
+    """
+    Ordered (latitude, longitude, recorded_at) tuples for the span, at
+    most `budget` of them. Returns (resolution, points); resolution is
+    None when raw fixes were used.
+    """
+    start, end = track_span(user_id, start, end)
+    if start is None or end is None:
+        return None, []
+
+    resolution = pick_resolution((end - start).total_seconds(), budget)
+
+    if resolution is None:
+        qs = LocationLog.objects.filter(
+            user_id=user_id,
+            recorded_at__gte=start,
+            recorded_at__lte=end,
+        ).order_by("recorded_at")
+    else:
+        # walk the (user, resolution, bucket) unique index
+        qs = TrackPoint.objects.filter(
+            user_id=user_id,
+            resolution=resolution,
+            bucket__gte=bucket_start(start, resolution),
+            bucket__lte=end,
+        ).order_by("bucket")
+
+    points = list(qs.values_list("latitude", "longitude", "recorded_at"))
+
+    # even the coarsest tier can overshoot a tiny budget: stride it down
+    if len(points) > budget:
+        stride = -(-len(points) // budget)
+        points = points[::stride]
+
+    return resolution, points
@@ -1,4 +1,5 @@
 from django.urls import path
+from . import async_views
 from .views import (
     SendLocationAPIView,
     MyLocationHistoryAPIView,
@@ -8,18 +9,32 @@ from .views import (
     AdminAttendanceSummaryAPIView,
     DivisionLiveLocationAPIView,
     GeofenceEventAPIView,
-    
+    UserStopAPIView,
+    UserTripAPIView,
+    DailyRollupAPIView,
+    LatestLocationAPIView,
+    RouteAPIView,
 )
 
 urlpatterns = [
     path('locations/send/', SendLocationAPIView.as_view()),
     path('locations/me/', MyLocationHistoryAPIView.as_view()),
     path('locations/user/<uuid:user_id>/', UserLocationAPIView.as_view()),
+    path('locations/user/<uuid:user_id>/stops/', UserStopAPIView.as_view()),
+    path('locations/user/<uuid:user_id>/trips/', UserTripAPIView.as_view()),
+    path('locations/user/<uuid:user_id>/route/', RouteAPIView.as_view()),
     path("attendance/me/monthly/", MyMonthlyAttendanceAPIView.as_view()),
     path("attendance/user/<uuid:user_id>/monthly/",EmployeeMonthlyAttendanceAPIView.as_view()),
     path("attendance/summary/", AdminAttendanceSummaryAPIView.as_view()),
+    path("reports/daily/", DailyRollupAPIView.as_view()),
     path("locations/division/<int:division_id>/live/",DivisionLiveLocationAPIView.as_view()),
     path("geofence/events/", GeofenceEventAPIView.as_view()),
+    path('locations/user/<uuid:user_id>/latest/', LatestLocationAPIView.as_view()),
+
+    # async-native variants (same payloads) for uvicorn workers
+    path('locations/async/send/', async_views.send_location),
+    path('locations/async/user/<uuid:user_id>/latest/', async_views.latest_location),
+    path('locations/async/division/<int:division_id>/live/', async_views.division_live_locations),
 
 
 ]
@@ -1,36 +1,58 @@
 from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework import status
 
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_datetime, parse_date
 from django.db import models
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
 from locations.throttles import GPSThrottle
-from users.permissions import IsEmployee, IsAdmin, IsSuperAdmin
-from users.models import EmployeeProfile, User
+from users.models import User
+from users.permissions import IsEmployee, IsAdminOrSuperAdmin, ManagesEmployee
+from users.authentication import ClaimsJWTAuthentication
 
 from drf_spectacular.utils import extend_schema, OpenApiTypes
+from config.fastserializers import ValuesListMixin
 from rest_framework import serializers # ensure serializers is imported
 
 from .models import (
     LocationLog,
-    Office,
     Attendance,
     GeofenceEvent,
+    Stop,
+    Trip,
+    DailyRollup,
 )
 from .serializers import (
     LocationCreateSerializer,
     LocationReadSerializer,
+    LocationReadValues,
+    TrackPointValues,
     AttendanceSerializer,
     AttendanceReportSerializer,
-    GeofenceEventSerializer
+    AttendanceReportValues,
+    GeofenceEventSerializer,
+    StopSerializer,
+    TripSerializer,
+    DailyRollupSerializer,
 )
-from .utils import calculate_distance
+from .pipeline import run_pipeline
+from .tiers import downsampled_track
+
+
+MAX_POINT_BUDGET = 5000
+
+
+def point_budget(request):
+    try:
+        budget = int(request.query_params["points"])
+    except (KeyError, ValueError):
+        return None
+    return max(1, min(budget, MAX_POINT_BUDGET))
 
 
 # ======================================================
@@ -38,121 +60,34 @@ from .utils import calculate_distance
 # ======================================================
 class SendLocationAPIView(CreateAPIView):
     serializer_class = LocationCreateSerializer
+    # user comes from token claims: no User query per fix
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsEmployee]
     throttle_classes = [GPSThrottle]
 
-    def perform_create(self, serializer):
-        user = self.request.user
-        location = serializer.save(user=user)
-        vd = serializer.validated_data
+    def create(self, request, *args, **kwargs):
+        # single fix ba buffered fix-er list, duitai accept kora hoy
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
 
-        lat = vd.get("latitude")
-        lng = vd.get("longitude")
-        now = timezone.now()
+        fixes = serializer.validated_data if many else [serializer.validated_data]
+        events = run_pipeline(request.user, fixes)
 
-        # --------------------------------------------------
-        # PERSONAL WEBSOCKET (optional)
-        # --------------------------------------------------
         channel_layer = get_channel_layer()
         if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"location_{user.id}",
-                {
-                    "type": "send_location",
-                    "data": {
-                        "lat": lat,
-                        "lng": lng,
-                        "millis": vd.get("millis"),
-                    },
-                },
-            )
-
-        # --------------------------------------------------
-        # ATTENDANCE + GEOFENCE
-        # --------------------------------------------------
-        office = Office.objects.first()
-        if not office:
-            return
-
-        try:
-            lat = float(lat)
-            lng = float(lng)
-            office_lat = float(office.latitude)
-            office_lng = float(office.longitude)
-        except (TypeError, ValueError):
-            return
-
-        distance = calculate_distance(lat, lng, office_lat, office_lng)
-        inside = distance <= office.radius_meters
-
-        today = now.date()
-
-        attendance, _ = Attendance.objects.get_or_create(
-            user=user,
-            date=today,
-            defaults={"office": office},
-        )
+            for group, message in events:
+                async_to_sync(channel_layer.group_send)(group, message)
 
-        # CHECK IN
-        if inside and attendance.check_in is None:
-            attendance.check_in = now
-            attendance.save(update_fields=["check_in"])
-
-        # CHECK OUT
-        if not inside and attendance.check_in and attendance.check_out is None:
-            attendance.check_out = now
-            attendance.save(update_fields=["check_out"])
-
-        # --------------------------------------------------
-        # GEOFENCE ENTER / EXIT
-        # --------------------------------------------------
-        if inside and not attendance.was_inside:
-            GeofenceEvent.objects.create(
-                user=user,
-                office=office,
-                event="ENTER",
-            )
-
-        if not inside and attendance.was_inside:
-            GeofenceEvent.objects.create(
-                user=user,
-                office=office,
-                event="EXIT",
-            )
-
-        attendance.was_inside = inside
-        attendance.save(update_fields=["was_inside"])
-
-        # --------------------------------------------------
-        # DIVISION LIVE MAP BROADCAST
-        # --------------------------------------------------
-        try:
-            profile = EmployeeProfile.objects.get(user=user)
-            division_id = profile.division_id
-        except EmployeeProfile.DoesNotExist:
-            division_id = None
-
-        if division_id and channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"division_{division_id}",
-                {
-                    "type": "live_location",
-                    "data": {
-                        "user_id": str(user.id),
-                        "name": user.full_name,
-                        "lat": lat,
-                        "lng": lng,
-                        "time": now.isoformat(),
-                    },
-                },
-            )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 # ======================================================
 # EMPLOYEE LOCATION HISTORY
 # ======================================================
-class MyLocationHistoryAPIView(ListAPIView):
+class MyLocationHistoryAPIView(ValuesListMixin, ListAPIView):
     serializer_class = LocationReadSerializer
+    values_serializer_class = LocationReadValues
 
     def get_queryset(self):
         return LocationLog.objects.filter(
@@ -163,20 +98,13 @@ class MyLocationHistoryAPIView(ListAPIView):
 # ======================================================
 # ADMIN / SUPERADMIN USER LOCATIONS
 # ======================================================
-class UserLocationAPIView(ListAPIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+class UserLocationAPIView(ValuesListMixin, ListAPIView):
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
     serializer_class = LocationReadSerializer
+    values_serializer_class = LocationReadValues
 
     def get_queryset(self):
         user_id = self.kwargs["user_id"]
-        request_user = self.request.user
-
-        if request_user.role == "ADMIN":
-            if not EmployeeProfile.objects.filter(
-                user_id=user_id,
-                admin=request_user,
-            ).exists():
-                raise PermissionDenied("This employee is not assigned to you")
 
         qs = LocationLog.objects.filter(user_id=user_id)
 
@@ -195,12 +123,82 @@ class UserLocationAPIView(ListAPIView):
 
         return qs.order_by("-recorded_at")
 
+    def list(self, request, *args, **kwargs):
+        # ?points=N -> bounded playback from the downsampled tiers
+        budget = point_budget(request)
+        if budget is None:
+            return super().list(request, *args, **kwargs)
+
+        start = parse_datetime(request.query_params.get("start") or "")
+        end = parse_datetime(request.query_params.get("end") or "")
+        resolution, points = downsampled_track(
+            self.kwargs["user_id"], budget, start, end
+        )
+
+        return Response({
+            "resolution": resolution,
+            "results": TrackPointValues.serialize(reversed(points)),
+        })
+
+
+# ======================================================
+# STOPS / TRIPS (ADMIN / SUPERADMIN)
+# ======================================================
+class UserStopAPIView(ListAPIView):
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
+    serializer_class = StopSerializer
+
+    def get_queryset(self):
+        user_id = self.kwargs["user_id"]
+
+        qs = Stop.objects.filter(user_id=user_id)
+
+        start = self.request.query_params.get("start")
+        end = self.request.query_params.get("end")
+
+        if start:
+            start_dt = parse_datetime(start)
+            if start_dt:
+                qs = qs.filter(ended_at__gte=start_dt)
+
+        if end:
+            end_dt = parse_datetime(end)
+            if end_dt:
+                qs = qs.filter(started_at__lte=end_dt)
+
+        return qs.order_by("-started_at")
+
+
+class UserTripAPIView(ListAPIView):
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
+    serializer_class = TripSerializer
+
+    def get_queryset(self):
+        user_id = self.kwargs["user_id"]
+
+        qs = Trip.objects.filter(user_id=user_id)
+
+        start = self.request.query_params.get("start")
+        end = self.request.query_params.get("end")
+
+        if start:
+            start_dt = parse_datetime(start)
+            if start_dt:
+                qs = qs.filter(ended_at__gte=start_dt)
+
+        if end:
+            end_dt = parse_datetime(end)
+            if end_dt:
+                qs = qs.filter(started_at__lte=end_dt)
+
+        return qs.order_by("-started_at")
+
 
 # ======================================================
 # LATEST LOCATION (MAP MARKER)
 # ======================================================
 class LatestLocationAPIView(APIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
 
     def get(self, request, user_id):
         loc = LocationLog.objects.filter(
@@ -221,9 +219,20 @@ class LatestLocationAPIView(APIView):
 # ROUTE / POLYLINE
 # ======================================================
 class RouteAPIView(APIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
 
     def get(self, request, user_id):
+        budget = point_budget(request)
+        if budget is not None:
+            start = parse_datetime(request.query_params.get("start") or "")
+            end = parse_datetime(request.query_params.get("end") or "")
+            _, points = downsampled_track(user_id, budget, start, end)
+
+            return Response([
+                {"lat": lat, "lng": lng}
+                for lat, lng, _ in points
+            ])
+
         locations = LocationLog.objects.filter(
             user_id=user_id
         ).order_by("recorded_at")
@@ -250,19 +259,11 @@ class MyAttendanceAPIView(ListAPIView):
 # ATTENDANCE (ADMIN / SUPERADMIN)
 # ======================================================
 class UserAttendanceAPIView(ListAPIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
     serializer_class = AttendanceSerializer
 
     def get_queryset(self):
         user_id = self.kwargs["user_id"]
-        request_user = self.request.user
-
-        if request_user.role == "ADMIN":
-            if not EmployeeProfile.objects.filter(
-                user_id=user_id,
-                admin=request_user,
-            ).exists():
-                raise PermissionDenied("This employee is not assigned to you")
 
         return Attendance.objects.filter(
             user_id=user_id
@@ -272,34 +273,29 @@ class UserAttendanceAPIView(ListAPIView):
 # ======================================================
 # MONTHLY REPORTS
 # ======================================================
-class MyMonthlyAttendanceAPIView(ListAPIView):
+class MyMonthlyAttendanceAPIView(ValuesListMixin, ListAPIView):
     serializer_class = AttendanceReportSerializer
+    values_serializer_class = AttendanceReportValues
 
     def get_queryset(self):
         month = self.request.query_params.get("month")  # YYYY-MM
         year, month = map(int, month.split("-"))
 
+        # the report reads office.work_start_time per row
         return Attendance.objects.filter(
             user=self.request.user,
             date__year=year,
             date__month=month,
-        ).order_by("date")
+        ).select_related("office").order_by("date")
 
 
-class EmployeeMonthlyAttendanceAPIView(ListAPIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+class EmployeeMonthlyAttendanceAPIView(ValuesListMixin, ListAPIView):
+    permission_classes = [IsAdminOrSuperAdmin, ManagesEmployee]
     serializer_class = AttendanceReportSerializer
+    values_serializer_class = AttendanceReportValues
 
     def get_queryset(self):
         user_id = self.kwargs["user_id"]
-        request_user = self.request.user
-
-        if request_user.role == "ADMIN":
-            if not EmployeeProfile.objects.filter(
-                user_id=user_id,
-                admin=request_user,
-            ).exists():
-                raise PermissionDenied("Not your employee")
 
         month = self.request.query_params.get("month")
         year, month = map(int, month.split("-"))
@@ -308,7 +304,47 @@ class EmployeeMonthlyAttendanceAPIView(ListAPIView):
             user_id=user_id,
             date__year=year,
             date__month=month,
-        ).order_by("date")
+        ).select_related("office").order_by("date")
+
+
+# ======================================================
+# DAILY DISTANCE / DWELL REPORT
+# ======================================================
+class DailyRollupAPIView(ListAPIView):
+    permission_classes = [IsAdminOrSuperAdmin]
+    serializer_class = DailyRollupSerializer
+
+    def get_queryset(self):
+        request_user = self.request.user
+        params = self.request.query_params
+
+        qs = DailyRollup.objects.all()
+
+        if request_user.role == "ADMIN":
+            qs = qs.filter(user__profile__admin=request_user)
+
+        division_id = params.get("division")
+        if division_id:
+            qs = qs.filter(user__profile__division_id=division_id)
+
+        user_id = params.get("user")
+        if user_id:
+            qs = qs.filter(user_id=user_id)
+
+        start = params.get("start")  # YYYY-MM-DD
+        end = params.get("end")
+
+        if start:
+            start_date = parse_date(start)
+            if start_date:
+                qs = qs.filter(date__gte=start_date)
+
+        if end:
+            end_date = parse_date(end)
+            if end_date:
+                qs = qs.filter(date__lte=end_date)
+
+        return qs.order_by("user_id", "date")
 
 
 # ======================================================
@@ -323,7 +359,7 @@ class EmployeeMonthlyAttendanceAPIView(ListAPIView):
 # ADMIN DASHBOARD SUMMARY
 # ======================================================
 class AdminAttendanceSummaryAPIView(APIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin]
 
     # 2. Add this decorator to explain the GET response
     @extend_schema(
@@ -360,29 +396,62 @@ class AdminAttendanceSummaryAPIView(APIView):
 # Inside locations/views.py
 
 class DivisionLiveLocationAPIView(APIView):
-    permission_classes = [IsAdmin, IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin]
 
     @extend_schema(
         responses={200: OpenApiTypes.OBJECT}, 
         description="Returns a list of the latest locations for all employees in a specific division."
     )
     def get(self, request, division_id):
-        # ... your existing code ...
-        user = request.user
-        # (The rest of your logic remains the same)
-        employees = User.objects.filter(
-            profile__division_id=division_id,
-            role="EMPLOYEE",
-        )
-        # ...
+        data = [
+            live_location_row(row)
+            for row in division_latest_locations(division_id, request.user)
+        ]
         return Response(data)
 
+
+def division_latest_locations(division_id, user):
+    # latest fix per employee: one LIMIT 1 probe of the (user, recorded_at)
+    # index per employee, not a DISTINCT ON over the division's history
+    employees = User.objects.filter(
+        profile__division_id=division_id,
+        role="EMPLOYEE",
+    )
+
+    if user.role == "ADMIN":
+        employees = employees.filter(profile__admin_id=user.id)
+
+    latest_id = LocationLog.objects.filter(
+        user_id=models.OuterRef("pk")
+    ).order_by("-recorded_at").values("id")[:1]
+
+    return LocationLog.objects.filter(
+        id__in=employees.annotate(latest_id=models.Subquery(latest_id)).values("latest_id")
+    ).order_by("user_id").values(
+        "user_id", "user__name", "latitude", "longitude", "recorded_at"
+    )
+
+
+def live_location_row(row):
+    return {
+        "user_id": str(row["user_id"]),
+        "name": row["user__name"],
+        "lat": row["latitude"],
+        "lng": row["longitude"],
+        "time": row["recorded_at"],
+    }
+
 class GeofenceEventAPIView(ListAPIView):
     serializer_class = GeofenceEventSerializer
-    permission_classes = [IsAdmin,IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin]
 
     def get_queryset(self):
-        qs = GeofenceEvent.objects.select_related("user")
+        qs = GeofenceEvent.objects.select_related("user").only(
+            "id", "event", "occurred_at", "user", "user__name", "user__email"
+        )
+
+        if self.request.user.role == "ADMIN":
+            qs = qs.filter(user__profile__admin=self.request.user)
 
         division_id = self.request.query_params.get("division")
         if division_id:
@@ -0,0 +1,114 @@
+# Division broadcasts: one Broadcast row, recipients fanned out in the
+# database with INSERT ... SELECT, live copies through one channel group
+# per division and pushes sent from the push dispatcher.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from notifications.dispatcher import dispatcher
+from notifications.utils import send_push_notification
+from users.presence import BROADCASTS
+from users.models import EmployeeProfile, User
+
+from .models import Broadcast, BroadcastReceipt
+from .unread import add_broadcast_unread
+
+# employee profile ids per INSERT ... SELECT statement
+FANOUT_CHUNK = 5000
+
+
+def broadcast_group(division_id):
+    return f"broadcasts_division_{division_id}"
+
+
+def fan_out(broadcast):
+    """Create a BroadcastReceipt per recipient without loading them. Returns the count."""
+    profiles = EmployeeProfile.objects.filter(division_id=broadcast.division_id)
+    if broadcast.own_employees_only:
+        profiles = profiles.filter(admin_id=broadcast.sender_id)
+
+    bounds = profiles.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return 0
+
+    qn = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {qn(BroadcastReceipt._meta.db_table)} "
+        f"({qn('broadcast_id')}, {qn('user_id')}, {qn('is_read')}) "
+        f"SELECT %s, {qn('user_id')}, %s FROM {qn(EmployeeProfile._meta.db_table)} "
+        f"WHERE {qn('division_id')} = %s AND {qn('id')} >= %s AND {qn('id')} < %s"
+    )
+    params = [broadcast.id, False, broadcast.division_id]
+    if broadcast.own_employees_only:
+        sql += f" AND {qn('admin_id')} = %s"
+        # raw params skip field conversion: UUIDs are char(32) outside Postgres
+        sender_id = User._meta.pk.get_db_prep_value(broadcast.sender_id, connection)
+
+    total = 0
+    with connection.cursor() as cursor:
+        for start in range(bounds["first"], bounds["last"] + 1, FANOUT_CHUNK):
+            chunk_params = params + [start, start + FANOUT_CHUNK]
+            if broadcast.own_employees_only:
+                chunk_params.append(sender_id)
+            cursor.execute(sql, chunk_params)
+            total += cursor.rowcount
+    return total
+
+
+def send_broadcast(sender, division, text):
+    broadcast = Broadcast(
+        sender=sender,
+        division=division,
+        own_employees_only=sender.role == "ADMIN",
+        text=text,
+    )
+
+    with transaction.atomic():
+        broadcast.save()
+        broadcast.recipient_count = fan_out(broadcast)
+        broadcast.save(update_fields=["recipient_count"])
+        add_broadcast_unread(broadcast.id)
+
+        transaction.on_commit(lambda: deliver_live(broadcast))
+        # token lookup and FCM calls both happen on the push pool
+        transaction.on_commit(lambda: dispatcher.call_later(0, push_broadcast, broadcast.id))
+
+    return broadcast
+
+
+def deliver_live(broadcast):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    # one group message per division; ChatConsumer drops it for
+    # employees outside an admin's own team
+    async_to_sync(channel_layer.group_send)(
+        broadcast_group(broadcast.division_id),
+        {
+            "type": "broadcast_message",
+            "admin_id": str(broadcast.sender_id) if broadcast.own_employees_only else None,
+            "message": {
+                "broadcast": broadcast.id,
+                "sender": str(broadcast.sender_id),
+                "text": broadcast.text,
+                "created_at": broadcast.created_at.isoformat(),
+            },
+        },
+    )
+
+
+def push_broadcast(broadcast_id):
+    broadcast = Broadcast.objects.filter(id=broadcast_id).values("text").first()
+    if broadcast is None:
+        return
+
+    send_push_notification(
+        users=User.objects.filter(broadcast_receipts__broadcast_id=broadcast_id),
+        title="Announcement",
+        body=broadcast["text"][:80],
+        data={"type": "broadcast", "broadcast": str(broadcast_id)},
+        # employees with a ChatConsumer socket in the broadcast group got it live
+        skip_online_in=BROADCASTS,
+    )
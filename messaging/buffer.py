@@ -0,0 +1,158 @@
+# Async write buffer for ChatConsumer: messages are broadcast as soon as
+# they arrive and persisted here in batches, one executor hop and a
+# handful of statements per batch instead of per message.
+import asyncio
+import logging
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+
+from .conversations import record_message, record_messages
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+# flush when this many messages are waiting ...
+WRITE_BATCH = getattr(settings, "CHAT_WRITE_BATCH", 200)
+# ... or this long after the first one arrived
+WRITE_DELAY = getattr(settings, "CHAT_WRITE_DELAY_MS", 50) / 1000
+# a batch that hits a deadlock is retried whole this many times ...
+BULK_ATTEMPTS = 3
+# ... and messages that still can't be written are requeued, up to
+WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+
+def write_messages(batch):
+    """
+    Insert a batch of unsaved Messages, skipping client retries. Returns
+    (rows written, messages a database error kept out) so the caller can
+    requeue the latter.
+    """
+    stored = set(Message.objects.filter(
+        client_id__in={message.client_id for message in batch}
+    ).values_list("sender_id", "client_id"))
+
+    fresh = []
+    for message in batch:
+        key = (message.sender_id, message.client_id)
+        if key not in stored:
+            stored.add(key)
+            fresh.append(message)
+
+    for attempt in range(1, BULK_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(fresh)
+                record_messages(fresh)
+            return len(fresh), []
+        except IntegrityError:
+            # a retry landed through another worker meanwhile: go one by one
+            break
+        except OperationalError:
+            # deadlock / serialization failure: the whole batch rolled back
+            logger.warning("Chat batch write failed (attempt %d)", attempt, exc_info=True)
+            for message in fresh:
+                message.pk = None
+
+    written = 0
+    failed = []
+    for message in fresh:
+        message.pk = None
+        try:
+            with transaction.atomic():
+                message.save()
+                record_message(message)
+            written += 1
+        except IntegrityError:
+            continue
+        except OperationalError:
+            failed.append(message)
+    return written, failed
+
+
+class MessageWriteBuffer:
+    """Pending Messages of every ChatConsumer on one event loop."""
+
+    def __init__(self, max_batch=WRITE_BATCH, max_delay=WRITE_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self.written = 0
+        self._full = asyncio.Event()
+        self._task = None
+
+    def add(self, message):
+        self.pending.append(message)
+        if len(self.pending) >= self.max_batch:
+            self._full.set()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self.pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+
+        try:
+            written, failed = await database_sync_to_async(write_messages)(batch)
+        except Exception:
+            # database unreachable: nothing of the batch was written
+            logger.warning("Chat batch of %d messages not written", len(batch), exc_info=True)
+            written, failed = 0, batch
+
+        self.written += written
+        if failed:
+            self.requeue(failed)
+            await asyncio.sleep(RETRY_DELAY)
+        return written
+
+    def requeue(self, messages):
+        retry = []
+        for message in messages:
+            message._write_attempts = getattr(message, "_write_attempts", 0) + 1
+            if message._write_attempts < WRITE_ATTEMPTS:
+                retry.append(message)
+
+        dropped = len(messages) - len(retry)
+        if dropped:
+            # already delivered live; the sender's client still has them
+            logger.error("Dropped %d chat messages after %d attempts", dropped, WRITE_ATTEMPTS)
+        # ahead of newer messages, so conversations still end on the latest
+        self.pending[:0] = retry
+
+    async def drain(self):
+        """Wait until everything added so far is written."""
+        while self._task is not None and not self._task.done():
+            self._full.set()
+            await self._task
+
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+def get_write_buffer():
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = _buffers[loop] = MessageWriteBuffer()
+    return buffer
+
+
+async def drain_write_buffer():
+    """Write out the running loop's pending messages (ASGI lifespan shutdown)."""
+    buffer = _buffers.get(asyncio.get_running_loop())
+    if buffer is not None:
+        await buffer.drain()
@@ -1,12 +1,22 @@
 import json
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth import get_user_model
-from asgiref.sync import sync_to_async
+from django.utils import timezone
+from channels.db import database_sync_to_async
+from rest_framework_simplejwt.models import TokenUser
 from .models import Message
+from .broadcasts import broadcast_group
+from .buffer import get_write_buffer
+from .notifications import chat_scope
+from users.models import EmployeeProfile
+from config.websocket import ConnectionLimitMixin
+from users.middleware import AuthSubprotocolMixin
+from users.presence import BROADCASTS, PresenceMixin
 
 User = get_user_model()
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(ConnectionLimitMixin, AuthSubprotocolMixin, PresenceMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
 
@@ -16,6 +26,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         self.other_user_id = self.scope["url_route"]["kwargs"]["user_id"]
 
+        # peer and permission resolved once per socket, not per message
+        peer_role = await self.get_peer_role()
+        if peer_role is None:
+            await self.close()
+            return
+        if self.user.role == "EMPLOYEE" and peer_role != "SUPERADMIN":
+            # Employees can only message SuperAdmin
+            await self.close()
+            return
+
         users = sorted([str(self.user.id), str(self.other_user_id)])
         self.room_name = f"chat_{users[0]}_{users[1]}"
 
@@ -24,41 +44,87 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
+        # employees also get their division's broadcasts live
+        self.broadcast_group = None
+        if self.user.role == "EMPLOYEE":
+            self.division_id, self.admin_id = await self.get_team()
+            if self.division_id:
+                self.broadcast_group = broadcast_group(self.division_id)
+                await self.channel_layer.group_add(
+                    self.broadcast_group,
+                    self.channel_name
+                )
+
         await self.accept()
+        # no chat pushes from this peer while the conversation is open;
+        # broadcast pushes skip only users who get them live here
+        scopes = [chat_scope(self.other_user_id)]
+        if self.broadcast_group:
+            scopes.append(BROADCASTS)
+        await self.start_presence(self.user.id, scopes=scopes)
 
     async def disconnect(self, close_code):
+        await self.stop_presence()
+
+        # rejected handshakes never joined a room
+        if not hasattr(self, "room_name"):
+            return
+
         await self.channel_layer.group_discard(
             self.room_name,
             self.channel_name
         )
+        if self.broadcast_group:
+            await self.channel_layer.group_discard(
+                self.broadcast_group,
+                self.channel_name
+            )
 
     async def receive(self, text_data):
         data = json.loads(text_data)
+
+        if data.get("type") == "typing":
+            # ephemeral: relayed to the room, never stored
+            await self.channel_layer.group_send(
+                self.room_name,
+                {
+                    "type": "chat_typing",
+                    "sender": str(self.user.id),
+                    "typing": bool(data.get("typing", True)),
+                }
+            )
+            return
+
         text = data.get("text")
 
         if not text:
             return
 
-        receiver = await sync_to_async(User.objects.get)(
-            id=self.other_user_id
-        )
+        try:
+            client_id = uuid.UUID(str(data.get("client_id")))
+        except ValueError:
+            client_id = uuid.uuid4()
 
-        message = await sync_to_async(Message.objects.create)(
-            sender=self.user,
-            receiver=receiver,
-            text=text
-        )
+        # persisted by the write buffer; the room hears about it right away
+        get_write_buffer().add(Message(
+            # TokenUser ids are str
+            sender_id=uuid.UUID(str(self.user.id)),
+            receiver_id=self.other_user_id,
+            text=text,
+            client_id=client_id,
+        ))
 
         await self.channel_layer.group_send(
             self.room_name,
             {
                 "type": "chat_message",
                 "message": {
-                    "id": message.id,
+                    "id": None,
+                    "client_id": str(client_id),
                     "sender": str(self.user.id),
-                    "receiver": str(receiver.id),
-                    "text": message.text,
-                    "created_at": message.created_at.isoformat(),
+                    "receiver": str(self.other_user_id),
+                    "text": text,
+                    "created_at": timezone.now().isoformat(),
                 }
             }
         )
@@ -67,3 +133,42 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.send(
             text_data=json.dumps(event["message"])
         )
+
+    async def chat_typing(self, event):
+        # the typist's own sockets don't need it
+        if event["sender"] == str(self.user.id):
+            return
+
+        await self.send(
+            text_data=json.dumps({
+                "type": "typing",
+                "sender": event["sender"],
+                "typing": event["typing"],
+            })
+        )
+
+    async def broadcast_message(self, event):
+        # ADMIN broadcasts are for that admin's own employees only
+        if event["admin_id"] and event["admin_id"] != str(self.admin_id):
+            return
+
+        await self.send(
+            text_data=json.dumps({"type": "broadcast", **event["message"]})
+        )
+
+    @database_sync_to_async
+    def get_peer_role(self):
+        return User.objects.filter(id=self.other_user_id).values_list(
+            "role", flat=True
+        ).first()
+
+    @database_sync_to_async
+    def get_team(self):
+        # (division_id, admin_id) from the token claims, or the profile
+        if isinstance(self.user, TokenUser):
+            return self.user.division_id, self.user.admin_id
+
+        team = EmployeeProfile.objects.filter(user_id=self.user.id).values_list(
+            "division_id", "admin_id"
+        ).first()
+        return team or (None, None)
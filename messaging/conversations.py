@@ -0,0 +1,126 @@
+# Maintains Conversation rows (inbox summary) as messages are sent/read.
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Conversation, Message
+from .unread import add_unread, remove_unread
+
+
+def _touch(owner_id, peer_id, message, unread):
+    # messages can commit out of order: never move back to an older one
+    newer = Q(last_message_at__isnull=True) | Q(last_message_at__lte=message.created_at)
+    updates = {
+        "last_message": Case(
+            When(newer, then=Value(message.pk)),
+            default=F("last_message"),
+            output_field=BigIntegerField(),
+        ),
+        "last_message_at": Case(
+            When(newer, then=Value(message.created_at)),
+            default=F("last_message_at"),
+        ),
+    }
+    if unread:
+        updates["unread_count"] = F("unread_count") + unread
+
+    rows = Conversation.objects.filter(owner_id=owner_id, peer_id=peer_id)
+    if rows.update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            Conversation.objects.create(
+                owner_id=owner_id,
+                peer_id=peer_id,
+                last_message=message,
+                last_message_at=message.created_at,
+                unread_count=unread,
+            )
+    except IntegrityError:
+        # created concurrently by the other side's first message
+        rows.update(**updates)
+
+
+def record_message(message):
+    """Move both sides of the conversation to `message` and bump the receiver's badge."""
+    record_messages([message])
+
+
+def record_messages(messages):
+    """
+    record_message for a batch (in send order): each conversation is
+    touched once with its latest message and the summed unread counts.
+    """
+    latest = {}
+    unread = Counter()
+    for message in messages:
+        latest[frozenset((message.sender_id, message.receiver_id))] = message
+        # (owner, peer): messages from peer the owner hasn't read
+        unread[(message.receiver_id, message.sender_id)] += 1
+
+    touches = []
+    for message in latest.values():
+        sender_id, receiver_id = message.sender_id, message.receiver_id
+        touches.append((sender_id, receiver_id, message))
+        touches.append((receiver_id, sender_id, message))
+
+    badges = Counter()
+    for (owner_id, _), n in unread.items():
+        badges[owner_id] += n
+
+    # rows are locked in one global order (conversations, then counters,
+    # each by id): A->B and B->A batches flushed together can't deadlock
+    with transaction.atomic():
+        for owner_id, peer_id, message in sorted(touches, key=lambda t: (str(t[0]), str(t[1]))):
+            _touch(owner_id, peer_id, message, unread[(owner_id, peer_id)])
+
+        for owner_id in sorted(badges, key=str):
+            add_unread(owner_id, badges[owner_id])
+
+
+def mark_read(owner_id, peer_id, count):
+    """`count` messages from peer were just marked read by owner."""
+    if not count:
+        return
+
+    with transaction.atomic():
+        Conversation.objects.filter(owner_id=owner_id, peer_id=peer_id).update(
+            unread_count=Greatest(F("unread_count") - count, 0)
+        )
+        remove_unread(owner_id, count)
+
+
+def rebuild_conversations(user_id):
+    """Recompute every Conversation of one user from Message."""
+    messages = Message.objects.filter(Q(sender_id=user_id) | Q(receiver_id=user_id))
+
+    peers = {}
+    for sender_id, receiver_id, last_id in messages.values(
+        "sender_id", "receiver_id"
+    ).annotate(last_id=Max("id")).values_list("sender_id", "receiver_id", "last_id"):
+        peer_id = receiver_id if sender_id == user_id else sender_id
+        peers[peer_id] = max(peers.get(peer_id, 0), last_id)
+
+    unread = dict(
+        messages.filter(receiver_id=user_id, is_read=False).values(
+            "sender_id"
+        ).annotate(n=Count("id")).values_list("sender_id", "n")
+    )
+    last_messages = Message.objects.in_bulk(peers.values())
+
+    with transaction.atomic():
+        Conversation.objects.filter(owner_id=user_id).delete()
+        Conversation.objects.bulk_create([
+            Conversation(
+                owner_id=user_id,
+                peer_id=peer_id,
+                last_message_id=last_id,
+                last_message_at=last_messages[last_id].created_at,
+                unread_count=unread.get(peer_id, 0),
+            )
+            for peer_id, last_id in peers.items()
+        ])
+    return len(peers)
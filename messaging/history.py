@@ -0,0 +1,145 @@
+# Chat history without OFFSET/COUNT: keyset pages by message id and a
+# delta sync that resumes from a signed token.
+from datetime import timedelta
+from heapq import merge
+
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Message
+
+SYNC_SALT = "messaging.sync"
+# messages (ids) and reads (read_at) can commit slightly out of order:
+# the last SYNC_OVERLAP of both is scanned again on the next sync, and
+# clients apply messages (by id) and read receipts idempotently
+SYNC_OVERLAP = timedelta(seconds=5)
+MAX_LIMIT = 200
+
+
+def clamp_limit(value, default=50):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+# ======================================================
+# KEYSET PAGES
+# ======================================================
+def conversation_page(user_id, other_id, before=None, after=None, limit=50):
+    """
+    Up to `limit` messages of a thread, oldest first: the newest ones,
+    the ones just before `before`, or the ones just after `after`
+    (message ids). Returns (messages, has_more).
+
+    Each direction is a range of the (sender, receiver, id) index;
+    the two ranges are merged here instead of ORing them in SQL.
+    """
+    newest_first = after is None
+    order = "-id" if newest_first else "id"
+
+    sides = []
+    for sender_id, receiver_id in ((user_id, other_id), (other_id, user_id)):
+        qs = Message.objects.filter(
+            sender_id=sender_id, receiver_id=receiver_id
+        ).select_related("sender", "receiver")
+        if before is not None:
+            qs = qs.filter(id__lt=before)
+        if after is not None:
+            qs = qs.filter(id__gt=after)
+        sides.append(list(qs.order_by(order)[:limit + 1]))
+
+    key = (lambda m: -m.id) if newest_first else (lambda m: m.id)
+    messages = list(merge(*sides, key=key))
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if newest_first:
+        messages.reverse()
+    return messages, has_more
+
+
+# ======================================================
+# DELTA SYNC
+# ======================================================
+def make_sync_token(last_id, at):
+    return signing.dumps({"id": last_id, "at": at.isoformat()}, salt=SYNC_SALT)
+
+
+def read_sync_token(token):
+    """(last message id, time) or None if the token is invalid."""
+    try:
+        data = signing.loads(token, salt=SYNC_SALT)
+        return int(data["id"]), parse_datetime(data["at"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def sync(user_id, token=None, limit=100):
+    """
+    Everything that changed for `user_id` since `token`: new messages in
+    any conversation (by id) and messages marked read (by read_at).
+    Without a token only a fresh token is returned.
+
+    Ids are assigned at insert, not commit, so a lower id can show up
+    after a higher one was synced. The token's id therefore stops before
+    the first message younger than SYNC_OVERLAP; those are sent again
+    next time.
+    """
+    now = timezone.now()
+    settled_before = now - SYNC_OVERLAP
+    state = read_sync_token(token) if token else None
+    mine = Q(sender_id=user_id) | Q(receiver_id=user_id)
+
+    if state is None:
+        last_id = Message.objects.filter(
+            mine, created_at__lte=settled_before
+        ).order_by("-id").values_list("id", flat=True).first() or 0
+        return {
+            "messages": [],
+            "reads": [],
+            "has_more": False,
+            "token": make_sync_token(last_id, now),
+        }
+
+    last_id, since = state
+
+    messages = list(
+        Message.objects.filter(
+            mine,
+            id__gt=last_id,
+        ).select_related("sender", "receiver").order_by("id")[:limit + 1]
+    )
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+
+    reads = []
+    for side in ("sender_id", "receiver_id"):
+        reads += Message.objects.filter(
+            **{side: user_id},
+            read_at__gt=since - SYNC_OVERLAP,
+            id__lte=last_id,
+        ).values("id", "read_at")
+    reads.sort(key=lambda r: r["read_at"])
+
+    next_id = last_id
+    for message in messages:
+        if message.created_at > settled_before:
+            break
+        next_id = message.id
+    if has_more and next_id == last_id:
+        # more than a page inside the overlap: move on rather than loop
+        next_id = messages[-1].id
+
+    # more pages to fetch: keep the read window open until caught up
+    next_at = since if has_more else now
+
+    return {
+        "messages": messages,
+        "reads": reads,
+        "has_more": has_more,
+        "token": make_sync_token(next_id, next_at),
+    }
@@ -0,0 +1,65 @@
+# Inbox = direct messages + broadcast receipts, merged in the database
+# with one UNION query so paging and ordering stay in SQL.
+from django.db.models import CharField, DateTimeField, F, Q, UUIDField, Value
+
+from .models import BroadcastReceipt, Message
+
+# column order must match on both sides of the UNION
+INBOX_COLUMNS = (
+    "item_id", "kind", "from_id", "from_name", "from_email", "to_id",
+    "to_name", "to_email", "body", "read", "read_on", "client_uuid", "sent_at",
+)
+
+
+def direct_items(user):
+    return Message.objects.filter(
+        Q(sender=user) | Q(receiver=user)
+    ).order_by().annotate(
+        item_id=F("id"),
+        kind=Value("direct", output_field=CharField()),
+        from_id=F("sender_id"),
+        from_name=F("sender__name"),
+        from_email=F("sender__email"),
+        to_id=F("receiver_id"),
+        to_name=F("receiver__name"),
+        to_email=F("receiver__email"),
+        body=F("text"),
+        read=F("is_read"),
+        read_on=F("read_at"),
+        client_uuid=F("client_id"),
+        sent_at=F("created_at"),
+    ).values(*INBOX_COLUMNS)
+
+
+def broadcast_items(user):
+    return BroadcastReceipt.objects.filter(
+        user=user
+    ).order_by().annotate(
+        item_id=F("broadcast_id"),
+        kind=Value("broadcast", output_field=CharField()),
+        from_id=F("broadcast__sender_id"),
+        from_name=F("broadcast__sender__name"),
+        from_email=F("broadcast__sender__email"),
+        to_id=F("user_id"),
+        to_name=F("user__name"),
+        to_email=F("user__email"),
+        body=F("broadcast__text"),
+        read=F("is_read"),
+        # receipts keep no read time or client id
+        read_on=Value(None, output_field=DateTimeField()),
+        client_uuid=Value(None, output_field=UUIDField()),
+        sent_at=F("broadcast__created_at"),
+    ).values(*INBOX_COLUMNS)
+
+
+def inbox_items(user):
+    return direct_items(user).union(
+        broadcast_items(user), all=True
+    ).order_by("-sent_at", "-item_id")
+
+
+def unread_count(user):
+    return (
+        Message.objects.filter(receiver=user, is_read=False).count()
+        + BroadcastReceipt.objects.filter(user=user, is_read=False).count()
+    )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from messaging.conversations import rebuild_conversations
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute Conversation rows (inbox summaries) from Message."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="only rebuild this user id")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(id=options["user"])
+
+        count = 0
+        for user_id in users.values_list("id", flat=True).iterator():
+            count += rebuild_conversations(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} conversations"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from messaging.unread import reconcile
+
+
+class Command(BaseCommand):
+    help = "Repair UnreadCounter rows that drifted from the unread messages/broadcasts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", help="only check this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        fixed = reconcile(options["user"])
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} unread counters"))
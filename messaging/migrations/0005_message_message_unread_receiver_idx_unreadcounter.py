@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    Message = apps.get_model('messaging', 'Message')
+    BroadcastReceipt = apps.get_model('messaging', 'BroadcastReceipt')
+    UnreadCounter = apps.get_model('messaging', 'UnreadCounter')
+
+    counts = {}
+    for user_id, n in Message.objects.filter(is_read=False).values(
+        'receiver_id'
+    ).annotate(n=models.Count('id')).values_list('receiver_id', 'n'):
+        counts[user_id] = counts.get(user_id, 0) + n
+    for user_id, n in BroadcastReceipt.objects.filter(is_read=False).values(
+        'user_id'
+    ).annotate(n=models.Count('broadcast_id')).values_list('user_id', 'n'):
+        counts[user_id] = counts.get(user_id, 0) + n
+
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id, unread=n) for user_id, n in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_conversation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['receiver', 'sender'], name='message_unread_receiver_idx'),
+        ),
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
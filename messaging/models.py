@@ -15,12 +15,124 @@ class Message(models.Model):
         related_name="received_messages"
     )
     text = models.TextField()
+    # id the client generated before sending: echoed in live events and
+    # makes socket retries idempotent
+    client_id = models.UUIDField(null=True, blank=True)
 
     is_read = models.BooleanField(default=False)
+    # when is_read flipped; delta sync picks up read receipts by it
+    read_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sender", "client_id"],
+                name="message_sender_client_id_uniq",
+            ),
+        ]
+        indexes = [
+            # unread badge / mark-conversation-read: only unread rows indexed
+            models.Index(
+                fields=["receiver", "sender"],
+                condition=models.Q(is_read=False),
+                name="message_unread_receiver_idx",
+            ),
+            # one direction of a thread, walked by id (keyset pages)
+            models.Index(fields=["sender", "receiver", "id"]),
+            # read receipts since a sync token, for either side
+            models.Index(fields=["receiver", "read_at"]),
+            models.Index(fields=["sender", "read_at"]),
+        ]
 
     def __str__(self):
         return f"{self.sender} → {self.receiver}"
+
+
+class Broadcast(models.Model):
+    """A division announcement: the text is stored once, recipients in BroadcastReceipt."""
+    sender = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="sent_broadcasts"
+    )
+    division = models.ForeignKey(
+        "users.Division",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="broadcasts"
+    )
+    # ADMIN broadcasts only reach the sender's own employees
+    own_employees_only = models.BooleanField(default=False)
+    text = models.TextField()
+    recipient_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.sender} → division {self.division_id}"
+
+
+class BroadcastReceipt(models.Model):
+    """Per-recipient read state of a Broadcast: two ids and a flag, no surrogate key."""
+    # user first: a recipient's receipts are one primary key range
+    pk = models.CompositePrimaryKey("user", "broadcast")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="broadcast_receipts"
+    )
+    broadcast = models.ForeignKey(
+        Broadcast,
+        on_delete=models.CASCADE,
+        related_name="receipts"
+    )
+    is_read = models.BooleanField(default=False)
+
+
+class Conversation(models.Model):
+    """
+    Inbox summary of one side of a chat: one row per (owner, peer), so a
+    user's conversation list is one range of the (owner, -last_message_at)
+    index. Kept up to date by messaging.conversations.
+    """
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="conversations"
+    )
+    peer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    last_message = models.ForeignKey(
+        Message,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+"
+    )
+    last_message_at = models.DateTimeField()
+    # messages from peer the owner hasn't read
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("owner", "peer")
+        indexes = [
+            models.Index(fields=["owner", "-last_message_at"]),
+        ]
+
+
+class UnreadCounter(models.Model):
+    """Badge count (direct + broadcast unread) per user, see messaging.unread."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="unread_counter"
+    )
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,106 @@
+# Chat push notifications: bursts from one sender are coalesced per
+# recipient into a single push, and nothing is sent while the recipient
+# has that conversation open on a ChatConsumer socket.
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from notifications.dispatcher import dispatcher
+from notifications.utils import send_push_notification
+from users.presence import online_key
+
+# messages from one sender within this many seconds become one push
+CHAT_PUSH_WINDOW = getattr(settings, "CHAT_PUSH_WINDOW_SECONDS", 10)
+WINDOW_KEY = "chat_push:{}:{}"          # receiver, sender -> window id
+COUNT_KEY = "chat_push:{}:{}:{}:count"  # ... window id -> messages
+LAST_KEY = "chat_push:{}:{}:{}:last"    # ... window id -> latest text
+
+
+def get_cache():
+    # shared between workers: the socket and the REST call rarely share one
+    return caches["default"]
+
+
+# ======================================================
+# OPEN CONVERSATIONS (ChatConsumer)
+# ======================================================
+# The open conversation is a presence scope of the ChatConsumer socket:
+# refreshed by its heartbeat, so a worker that died without
+# disconnecting holds back pushes for at most PRESENCE_TTL.
+def chat_scope(peer_id):
+    return f"chat:{peer_id}"
+
+
+def is_chat_open(user_id, peer_id):
+    return get_cache().get(online_key(user_id, chat_scope(peer_id))) is not None
+
+
+# ======================================================
+# COALESCING
+# ======================================================
+def notify_chat_message(sender, receiver_id, text):
+    """
+    Count a message towards the receiver's pending push from `sender`.
+    The first message of a window schedules the flush; the rest only
+    bump the counter.
+    """
+    if is_chat_open(receiver_id, sender.id):
+        return
+
+    cache = get_cache()
+    window_key = WINDOW_KEY.format(receiver_id, sender.id)
+    ttl = CHAT_PUSH_WINDOW * 2
+
+    window = cache.get(window_key)
+    opened = False
+    if window is None:
+        window = uuid.uuid4().hex
+        opened = cache.add(window_key, window, ttl)
+        if not opened:
+            # another request opened it first
+            window = cache.get(window_key, window)
+
+    count_key = COUNT_KEY.format(receiver_id, sender.id, window)
+    cache.add(count_key, 0, ttl)
+    try:
+        cache.incr(count_key)
+    except ValueError:
+        cache.set(count_key, 1, ttl)
+    cache.set(LAST_KEY.format(receiver_id, sender.id, window), text[:50], ttl)
+
+    if opened:
+        dispatcher.call_later(
+            CHAT_PUSH_WINDOW,
+            flush_chat_notification,
+            receiver_id, sender.id, sender.name, window,
+        )
+
+
+def flush_chat_notification(receiver_id, sender_id, sender_name, window):
+    cache = get_cache()
+
+    # close the window first: later messages open a new one. A message
+    # counted between here and the read below is folded into this push.
+    cache.delete(WINDOW_KEY.format(receiver_id, sender_id))
+
+    count_key = COUNT_KEY.format(receiver_id, sender_id, window)
+    last_key = LAST_KEY.format(receiver_id, sender_id, window)
+    values = cache.get_many([count_key, last_key])
+    cache.delete_many([count_key, last_key])
+
+    count = values.get(count_key) or 0
+    if not count or is_chat_open(receiver_id, sender_id):
+        return
+
+    if count == 1:
+        body = f"{sender_name}: {values.get(last_key, '')}"
+    else:
+        body = f"{count} new messages from {sender_name}"
+
+    send_push_notification(
+        users=[receiver_id],
+        title="New Message",
+        body=body,
+        data={"type": "chat", "sender": str(sender_id), "count": str(count)},
+    )
@@ -1,13 +1,16 @@
 from rest_framework import serializers
-from .models import Message
+from config.fastserializers import Computed, ValuesSerializer
+from users.models import display_name
+from .models import Conversation, Message
 
 class MessageSerializer(serializers.ModelSerializer):
+    # lists must select_related("sender", "receiver")
     sender_name = serializers.CharField(
-        source="sender.full_name",
+        source="sender.display_name",
         read_only=True
     )
     receiver_name = serializers.CharField(
-        source="receiver.full_name",
+        source="receiver.display_name",
         read_only=True
     )
 
@@ -21,10 +24,73 @@ class MessageSerializer(serializers.ModelSerializer):
             "receiver_name",
             "text",
             "is_read",
+            "read_at",
+            "client_id",
             "created_at",
         ]
-        read_only_fields = ["sender", "is_read", "created_at"]
+        read_only_fields = ["sender", "is_read", "read_at", "client_id", "created_at"]
+
+
+class MessageValues(ValuesSerializer):
+    """MessageSerializer output from values_list() rows; names joined, not related objects."""
+    model = Message
+    fields = MessageSerializer.Meta.fields
+    computed = {
+        "sender_name": Computed(display_name, "sender__name", "sender__email"),
+        "receiver_name": Computed(display_name, "receiver__name", "receiver__email"),
+    }
 
 class BroadcastMessageSerializer(serializers.Serializer):
     division_id = serializers.IntegerField()
     text = serializers.CharField()
+
+
+class InboxItemSerializer(serializers.Serializer):
+    """
+    A row of messaging.inbox.inbox_items(): a direct message or a
+    broadcast. Direct items carry MessageSerializer's fields unchanged;
+    `kind` tells them apart (ids are per kind).
+    """
+    id = serializers.IntegerField(source="item_id")
+    kind = serializers.CharField()
+    sender = serializers.UUIDField(source="from_id")
+    sender_name = serializers.SerializerMethodField()
+    receiver = serializers.UUIDField(source="to_id")
+    receiver_name = serializers.SerializerMethodField()
+    text = serializers.CharField(source="body")
+    is_read = serializers.BooleanField(source="read")
+    read_at = serializers.DateTimeField(source="read_on")
+    client_id = serializers.UUIDField(source="client_uuid")
+    created_at = serializers.DateTimeField(source="sent_at")
+
+    def get_sender_name(self, obj) -> str:
+        return display_name(obj["from_name"], obj["from_email"])
+
+    def get_receiver_name(self, obj) -> str:
+        return display_name(obj["to_name"], obj["to_email"])
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    peer_name = serializers.CharField(source="peer.display_name", read_only=True)
+    last_message = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = [
+            "peer",
+            "peer_name",
+            "last_message",
+            "last_message_at",
+            "unread_count",
+        ]
+
+    def get_last_message(self, obj) -> dict | None:
+        message = obj.last_message
+        if message is None:
+            return None
+        return {
+            "id": message.id,
+            "sender": str(message.sender_id),
+            "text": message.text,
+            "created_at": message.created_at,
+        }
@@ -1,3 +1,446 @@
-from django.test import TestCase
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from users.models import Division, EmployeeProfile, User
+from users.presence import PRESENCE_TTL, get_cache, local_sockets, online_key, user_connected, user_disconnected
+
+from . import buffer
+from .broadcasts import send_broadcast
+from .buffer import MessageWriteBuffer, write_messages
+from .conversations import record_messages
+from .history import make_sync_token, sync
+from .models import Broadcast, BroadcastReceipt, Conversation, Message, UnreadCounter
+from .notifications import chat_scope, is_chat_open
+from .serializers import MessageSerializer, MessageValues
+from .unread import add_broadcast_unread, add_unread, get_unread, reconcile
+
+
+def make_user(email, role="SUPERADMIN"):
+    return User.objects.create(email=email, name=email.split("@")[0], role=role)
+
+
+# ======================================================
+# WRITE BUFFER
+# ======================================================
+class WriteMessagesTests(TestCase):
+    def setUp(self):
+        self.a = make_user("a@test.local")
+        self.b = make_user("b@test.local")
+
+    def message(self, sender, receiver, text):
+        return Message(sender_id=sender.id, receiver_id=receiver.id, text=text, client_id=uuid.uuid4())
+
+    def test_both_directions_in_one_batch(self):
+        written, failed = write_messages([
+            self.message(self.a, self.b, "hi"),
+            self.message(self.b, self.a, "hello"),
+            self.message(self.a, self.b, "how are you"),
+        ])
+
+        self.assertEqual((written, failed), (3, []))
+        self.assertEqual(Conversation.objects.get(owner=self.b, peer=self.a).unread_count, 2)
+        self.assertEqual(Conversation.objects.get(owner=self.a, peer=self.b).unread_count, 1)
+        self.assertEqual(get_unread(self.b.id), 2)
+
+    def test_client_retries_are_skipped(self):
+        first = self.message(self.a, self.b, "hi")
+        write_messages([first])
+
+        retry = Message(sender_id=self.a.id, receiver_id=self.b.id, text="hi", client_id=first.client_id)
+        self.assertEqual(write_messages([retry]), (0, []))
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_deadlocked_batch_falls_back_to_single_rows(self):
+        batch = [self.message(self.a, self.b, "hi"), self.message(self.b, self.a, "hello")]
+
+        with mock.patch.object(buffer, "record_messages", side_effect=OperationalError("deadlock detected")):
+            with self.assertLogs("messaging.buffer", "WARNING"):
+                written, failed = write_messages(batch)
+
+        self.assertEqual((written, failed), (2, []))
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(Conversation.objects.count(), 2)
+
+
+class WriteBufferTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(buffer, "RETRY_DELAY", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_failed_messages_are_requeued(self):
+        write_buffer = MessageWriteBuffer()
+        message = Message(text="hi")
+        write_buffer.pending = [message]
+
+        with mock.patch.object(buffer, "write_messages", side_effect=[(0, [message]), (1, [])]):
+            self.assertEqual(await write_buffer.flush(), 0)
+            self.assertEqual(write_buffer.pending, [message])
+
+            self.assertEqual(await write_buffer.flush(), 1)
+            self.assertEqual(write_buffer.pending, [])
+
+    async def test_unreachable_database_requeues_the_batch(self):
+        write_buffer = MessageWriteBuffer()
+        batch = [Message(text="hi"), Message(text="hello")]
+        write_buffer.pending = list(batch)
+
+        with mock.patch.object(buffer, "write_messages", side_effect=OperationalError("server closed the connection")):
+            with self.assertLogs("messaging.buffer", "WARNING"):
+                await write_buffer.flush()
+
+        self.assertEqual(write_buffer.pending, batch)
+
+    async def test_messages_are_dropped_after_the_last_attempt(self):
+        write_buffer = MessageWriteBuffer()
+        message = Message(text="hi")
+        write_buffer.pending = [message]
+
+        with mock.patch.object(buffer, "write_messages", side_effect=lambda batch: (0, batch)):
+            with self.assertLogs("messaging.buffer", "ERROR"):
+                for _ in range(buffer.WRITE_ATTEMPTS):
+                    await write_buffer.flush()
+
+        self.assertEqual(write_buffer.pending, [])
+
+
+class RecordMessagesTests(TestCase):
+    def test_rows_are_touched_in_id_order(self):
+        a, b, c = (make_user(f"{name}@test.local") for name in "abc")
+        messages = [
+            Message.objects.create(sender=sender, receiver=receiver, text="hi")
+            for sender, receiver in ((b, a), (c, b), (a, c))
+        ]
+
+        touched = []
+        with mock.patch("messaging.conversations._touch", side_effect=lambda o, p, m, n: touched.append((o, p))):
+            record_messages(messages)
+
+        self.assertEqual(len(touched), 6)
+        self.assertEqual(touched, sorted(touched, key=lambda t: (str(t[0]), str(t[1]))))
+
+
+# ======================================================
+# DELTA SYNC
+# ======================================================
+class SyncTests(TestCase):
+    def setUp(self):
+        self.a = make_user("a@test.local")
+        self.b = make_user("b@test.local")
+
+    def send(self, text, **fields):
+        return Message.objects.create(sender=self.b, receiver=self.a, text=text, **fields)
+
+    def test_late_commit_with_lower_id_is_not_skipped(self):
+        start = make_sync_token(0, timezone.now() - timedelta(minutes=1))
+        high = self.send("second", id=100)
+
+        changes = sync(self.a.id, start)
+        self.assertEqual([m.id for m in changes["messages"]], [high.id])
+
+        # inserted before `high` but committed after the sync above
+        low = self.send("first", id=50)
+
+        changes = sync(self.a.id, changes["token"])
+        self.assertEqual([m.id for m in changes["messages"]], [low.id, high.id])
+
+    def test_settled_messages_are_not_sent_again(self):
+        old = self.send("old")
+        Message.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(minutes=1))
+        recent = self.send("recent")
+
+        changes = sync(self.a.id, make_sync_token(0, timezone.now() - timedelta(minutes=2)))
+        self.assertEqual([m.id for m in changes["messages"]], [old.id, recent.id])
+
+        changes = sync(self.a.id, changes["token"])
+        self.assertEqual([m.id for m in changes["messages"]], [recent.id])
+
+    def test_full_page_inside_the_overlap_still_advances(self):
+        for i in range(3):
+            self.send(f"burst {i}")
+
+        changes = sync(self.a.id, make_sync_token(0, timezone.now()), limit=2)
+        self.assertTrue(changes["has_more"])
+
+        changes = sync(self.a.id, changes["token"], limit=2)
+        self.assertEqual([m.text for m in changes["messages"]], ["burst 2"])
+
+
+# ======================================================
+# CONVERSATIONS
+# ======================================================
+class ConversationTests(TestCase):
+    def setUp(self):
+        self.a = make_user("a@test.local")
+        self.b = make_user("b@test.local")
+
+    def test_older_message_committing_late_keeps_the_latest(self):
+        newer = Message.objects.create(sender=self.a, receiver=self.b, text="newer")
+        older = Message.objects.create(sender=self.b, receiver=self.a, text="older")
+        older.created_at = newer.created_at - timedelta(seconds=1)
+        older.save(update_fields=["created_at"])
+
+        record_messages([newer])
+        record_messages([older])
+
+        for owner, peer in ((self.a, self.b), (self.b, self.a)):
+            conversation = Conversation.objects.get(owner=owner, peer=peer)
+            self.assertEqual(conversation.last_message_id, newer.id)
+            self.assertEqual(conversation.last_message_at, newer.created_at)
+
+        # the unread count still includes the late one
+        self.assertEqual(Conversation.objects.get(owner=self.a, peer=self.b).unread_count, 1)
+
+
+# ======================================================
+# UNREAD COUNTER
+# ======================================================
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.a = make_user("a@test.local")
+        self.b = make_user("b@test.local")
+        self.client = APIClient()
+        self.client.force_authenticate(self.b)
+
+    def send(self, count):
+        write_messages([
+            Message(sender_id=self.a.id, receiver_id=self.b.id, text=f"hi {i}", client_id=uuid.uuid4())
+            for i in range(count)
+        ])
+
+    def badge(self):
+        return self.client.get("/api/messages/unread-count/").data["unread_count"]
+
+    def test_send_increments(self):
+        self.send(2)
+        self.send(1)
+
+        self.assertEqual(self.badge(), 3)
+        self.assertEqual(get_unread(self.a.id), 0)
+
+    def test_mark_read_decrements(self):
+        self.send(3)
+        first = Message.objects.order_by("id").first()
+
+        self.client.post(f"/api/messages/read/{first.id}/")
+        self.assertEqual(self.badge(), 2)
+
+        self.client.post(f"/api/messages/conversation/{self.a.id}/read/")
+        self.assertEqual(self.badge(), 0)
+
+        # reading again never goes below zero
+        self.client.post(f"/api/messages/conversation/{self.a.id}/read/")
+        self.assertEqual(self.badge(), 0)
+
+    def test_broadcast_upsert_creates_and_bumps_rows(self):
+        add_unread(self.a.id, 4)
+        broadcast = Broadcast.objects.create(sender=self.b, text="hello")
+        BroadcastReceipt.objects.bulk_create([
+            BroadcastReceipt(user=self.a, broadcast=broadcast),
+            BroadcastReceipt(user=self.b, broadcast=broadcast),
+        ])
+
+        add_broadcast_unread(broadcast.id)
+
+        self.assertEqual((get_unread(self.a.id), get_unread(self.b.id)), (5, 1))
+
+        self.client.post("/api/messages/broadcast/read/")
+        self.assertEqual(self.badge(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.send(2)
+        UnreadCounter.objects.filter(user=self.b).update(unread=7)
+        # a counter for someone with nothing unread
+        add_unread(self.a.id, 3)
+
+        self.assertEqual(reconcile(), 2)
+        self.assertEqual((get_unread(self.a.id), get_unread(self.b.id)), (0, 2))
+        self.assertEqual(reconcile(), 0)
+
+
+# ======================================================
+# BROADCASTS
+# ======================================================
+class BroadcastFanOutTests(TestCase):
+    def setUp(self):
+        self.division = Division.objects.create(name="Broadcast Division")
+        self.superadmin = make_user("superadmin@test.local")
+        self.admin = make_user("admin@test.local", role="ADMIN")
+        self.team = [self.employee(f"team{i}@test.local", self.admin) for i in range(3)]
+        self.others = [self.employee(f"other{i}@test.local", self.superadmin) for i in range(2)]
+        # another division never hears about it
+        self.employee("elsewhere@test.local", self.admin, Division.objects.create(name="Elsewhere"))
+
+    def employee(self, email, admin, division=None):
+        user = make_user(email, role="EMPLOYEE")
+        EmployeeProfile.objects.create(user=user, admin=admin, division=division or self.division)
+        return user
+
+    def recipients(self, broadcast):
+        return set(BroadcastReceipt.objects.filter(broadcast=broadcast).values_list("user_id", flat=True))
+
+    def test_superadmin_reaches_the_whole_division(self):
+        broadcast = send_broadcast(self.superadmin, self.division, "Office closed tomorrow")
+
+        self.assertEqual(broadcast.recipient_count, 5)
+        self.assertEqual(self.recipients(broadcast), {u.id for u in self.team + self.others})
+        self.assertEqual([get_unread(u.id) for u in self.team + self.others], [1] * 5)
+
+    def test_admin_reaches_only_their_team(self):
+        broadcast = send_broadcast(self.admin, self.division, "Team meeting at 3")
+
+        self.assertEqual(broadcast.recipient_count, 3)
+        self.assertEqual(self.recipients(broadcast), {u.id for u in self.team})
+        self.assertEqual([get_unread(u.id) for u in self.others], [0, 0])
+
+    def test_unread_counter_upsert_adds_to_existing_rows(self):
+        send_broadcast(self.admin, self.division, "first")
+        send_broadcast(self.superadmin, self.division, "second")
+
+        self.assertEqual([get_unread(u.id) for u in self.team], [2, 2, 2])
+        self.assertEqual([get_unread(u.id) for u in self.others], [1, 1])
+
+
+# ======================================================
+# INBOX
+# ======================================================
+class InboxTests(TestCase):
+    def test_direct_messages_and_broadcasts_are_merged_newest_first(self):
+        admin = make_user("admin@test.local")
+        employee = make_user("employee@test.local", role="EMPLOYEE")
+        now = timezone.now()
+
+        old = Message.objects.create(sender=admin, receiver=employee, text="old", client_id=uuid.uuid4())
+        broadcast = Broadcast.objects.create(sender=admin, text="announcement")
+        BroadcastReceipt.objects.create(user=employee, broadcast=broadcast)
+        new = Message.objects.create(sender=employee, receiver=admin, text="new")
+        for item, minutes in ((old, 3), (broadcast, 2), (new, 1)):
+            type(item).objects.filter(pk=item.pk).update(created_at=now - timedelta(minutes=minutes))
+
+        client = APIClient()
+        client.force_authenticate(employee)
+        data = client.get("/api/messages/inbox/").json()
+        items = data.get("results", data)
+
+        self.assertEqual(
+            [(item["kind"], item["text"]) for item in items],
+            [("direct", "new"), ("broadcast", "announcement"), ("direct", "old")],
+        )
+
+        # direct items keep the MessageSerializer fields
+        expected = client.get(f"/api/messages/conversation/{admin.id}/").json()
+        expected = {row["id"]: row for row in expected.get("results", expected)}[old.id]
+        self.assertEqual({k: v for k, v in items[2].items() if k != "kind"}, expected)
+        self.assertIsNone(items[1]["client_id"])
+
+
+# ======================================================
+# CHAT PUSHES
+# ======================================================
+class OpenChatTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        local_sockets.clear()
+        self.viewer, self.peer = str(uuid.uuid4()), str(uuid.uuid4())
+
+    def test_open_while_a_socket_is_connected(self):
+        scopes = (chat_scope(self.peer),)
+        async_to_sync(user_connected)(self.viewer, scopes)
+        async_to_sync(user_connected)(self.viewer, scopes)
+        self.assertTrue(is_chat_open(self.viewer, self.peer))
+        self.assertFalse(is_chat_open(self.peer, self.viewer))
+
+        async_to_sync(user_disconnected)(self.viewer, scopes)
+        self.assertTrue(is_chat_open(self.viewer, self.peer))
+        async_to_sync(user_disconnected)(self.viewer, scopes)
+        self.assertFalse(is_chat_open(self.viewer, self.peer))
+
+    def test_marker_expires_without_heartbeat(self):
+        async_to_sync(user_connected)(self.viewer, (chat_scope(self.peer),))
+
+        # a worker that died: only its last heartbeat is left
+        key = online_key(self.viewer, chat_scope(self.peer))
+        self.assertIsNotNone(get_cache().get(key))
+        with mock.patch("time.time", return_value=time.time() + PRESENCE_TTL + 1):
+            self.assertIsNone(get_cache().get(key))
+
+
+# ======================================================
+# FAST SERIALIZERS
+# ======================================================
+class MessageValuesTests(TestCase):
+    def test_same_json_as_the_model_serializer(self):
+        named = User.objects.create(email="named@test.local", name="Named Person", role="SUPERADMIN")
+        # blank name: display_name falls back to the email's local part
+        unnamed = User.objects.create(email="unnamed@test.local", name="", role="EMPLOYEE")
+        for i in range(4):
+            Message.objects.create(
+                sender=named if i % 2 else unnamed,
+                receiver=unnamed if i % 2 else named,
+                text=f"message {i}",
+                client_id=uuid.uuid4() if i % 3 else None,
+                is_read=i == 0,
+            )
+
+        queryset = Message.objects.select_related("sender", "receiver").order_by("id")
+        slow = MessageSerializer(list(queryset), many=True).data
+        fast = MessageValues.serialize(list(MessageValues.rows(queryset)))
+
+        self.assertEqual({row["sender_name"] for row in fast}, {"Named Person", "unnamed"})
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(slow))
+
+
+# ======================================================
+# QUERY BUDGETS
+# ======================================================
+class MessagingQueryBudgetTests(TestCase):
+    """List endpoints run a fixed number of queries whatever the page size (no N+1)."""
+
+    def setUp(self):
+        self.admin = make_user("admin@test.local")
+        self.employee = make_user("employee@test.local", role="EMPLOYEE")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.size = 0
+
+    def grow(self, size):
+        for i in range(self.size, size):
+            peer = User.objects.create(email=f"peer{i}@test.local", name=f"Peer {i}", role="EMPLOYEE")
+            for sender in (peer, self.employee):
+                message = Message.objects.create(sender=sender, receiver=self.admin, text=f"hello {i}")
+                record_messages([message])
+        self.size = size
+
+    def assert_budget(self, url, budget):
+        for size in (3, 25):
+            self.grow(size)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_inbox(self):
+        self.assert_budget("/api/messages/inbox/", 2)
+
+    def test_conversation_list(self):
+        self.assert_budget("/api/messages/conversations/", 2)
+
+    def test_conversation_pages(self):
+        self.assert_budget(f"/api/messages/conversation/{self.employee.id}/", 2)
+
+    def test_conversation_keyset(self):
+        self.assert_budget(f"/api/messages/conversation/{self.employee.id}/?limit=50", 2)
+
+    def test_sync(self):
+        token = make_sync_token(0, timezone.now() - timedelta(days=1))
+        self.assert_budget(f"/api/messages/sync/?token={token}", 3)
@@ -0,0 +1,104 @@
+# Per-user unread badge counter (UnreadCounter), bumped in the same
+# transaction as the write that changes the unread set. A missing row
+# means 0; reconcile() repairs drift against the real tables.
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .inbox import unread_count
+from .models import BroadcastReceipt, Message, UnreadCounter
+from users.models import User
+
+
+def add_unread(user_id, n=1):
+    if not n:
+        return
+
+    rows = UnreadCounter.objects.filter(user_id=user_id)
+    if rows.update(unread=F("unread") + n, updated_at=timezone.now()):
+        return
+
+    try:
+        with transaction.atomic():
+            UnreadCounter.objects.create(user_id=user_id, unread=n)
+    except IntegrityError:
+        rows.update(unread=F("unread") + n, updated_at=timezone.now())
+
+
+def remove_unread(user_id, n=1):
+    if n:
+        UnreadCounter.objects.filter(user_id=user_id).update(
+            unread=Greatest(F("unread") - n, 0),
+            updated_at=timezone.now(),
+        )
+
+
+def add_broadcast_unread(broadcast_id):
+    """+1 for every recipient of a broadcast, in one upsert."""
+    qn = connection.ops.quote_name
+    counter = qn(UnreadCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {counter} ({qn('user_id')}, {qn('unread')}, {qn('updated_at')}) "
+            f"SELECT {qn('user_id')}, 1, %s FROM {qn(BroadcastReceipt._meta.db_table)} "
+            f"WHERE {qn('broadcast_id')} = %s "
+            f"ON CONFLICT ({qn('user_id')}) DO UPDATE SET "
+            f"{qn('unread')} = {counter}.{qn('unread')} + 1, "
+            f"{qn('updated_at')} = EXCLUDED.{qn('updated_at')}",
+            # raw params skip field conversion (SQLite stores naive text)
+            [connection.ops.adapt_datetimefield_value(timezone.now()), broadcast_id],
+        )
+
+
+def get_unread(user_id):
+    return UnreadCounter.objects.filter(user_id=user_id).values_list(
+        "unread", flat=True
+    ).first() or 0
+
+
+# ======================================================
+# RECONCILIATION
+# ======================================================
+def reconcile(user_ids=None):
+    """
+    Compare counters with a grouped count of unread rows and recompute
+    the ones that differ, each under a row lock so concurrent bumps are
+    not lost. Returns the number of counters fixed.
+    """
+    messages = Message.objects.filter(is_read=False)
+    receipts = BroadcastReceipt.objects.filter(is_read=False)
+    counters = UnreadCounter.objects.all()
+    if user_ids is not None:
+        messages = messages.filter(receiver_id__in=user_ids)
+        receipts = receipts.filter(user_id__in=user_ids)
+        counters = counters.filter(user_id__in=user_ids)
+
+    actual = Counter()
+    for user_id, n in messages.values("receiver_id").annotate(
+        n=Count("id")
+    ).values_list("receiver_id", "n"):
+        actual[user_id] += n
+    for user_id, n in receipts.values("user_id").annotate(
+        n=Count("broadcast_id")
+    ).values_list("user_id", "n"):
+        actual[user_id] += n
+
+    stored = dict(counters.values_list("user_id", "unread"))
+    suspects = {
+        user_id for user_id in actual.keys() | stored.keys()
+        if actual[user_id] != stored.get(user_id, 0)
+    }
+
+    fixed = 0
+    for user in User.objects.filter(id__in=suspects).only("id"):
+        with transaction.atomic():
+            counter, _ = UnreadCounter.objects.select_for_update().get_or_create(user_id=user.id)
+            value = unread_count(user)
+            if counter.unread != value:
+                counter.unread = value
+                counter.save(update_fields=["unread", "updated_at"])
+                fixed += 1
+    return fixed
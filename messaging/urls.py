@@ -2,19 +2,27 @@ from django.urls import path
 from .views import (
     SendMessageAPIView,
     InboxAPIView,
+    ConversationListAPIView,
     ConversationAPIView,
+    SyncAPIView,
     MarkMessageReadAPIView,
     UnreadCountAPIView,
     MarkConversationReadAPIView,
     DivisionBroadcastAPIView,
+    MarkBroadcastReadAPIView,
+    MarkBroadcastsReadAPIView,
 )
 
 urlpatterns = [
     path("send/", SendMessageAPIView.as_view()),
     path("inbox/", InboxAPIView.as_view()),
+    path("conversations/", ConversationListAPIView.as_view(), name="conversation-list"),
     path("conversation/<uuid:user_id>/", ConversationAPIView.as_view()),
+    path("sync/", SyncAPIView.as_view(), name="message-sync"),
     path("read/<int:message_id>/",MarkMessageReadAPIView.as_view(),name="message-read"),
     path("unread-count/",UnreadCountAPIView.as_view(),name="unread-count"),
     path("conversation/<uuid:user_id>/read/",MarkConversationReadAPIView.as_view(),name="conversation-read"),
     path("broadcast/division/",DivisionBroadcastAPIView.as_view(),name="division-broadcast"),
+    path("broadcast/<int:broadcast_id>/read/",MarkBroadcastReadAPIView.as_view(),name="broadcast-read"),
+    path("broadcast/read/",MarkBroadcastsReadAPIView.as_view(),name="broadcasts-read"),
 ]
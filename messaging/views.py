@@ -1,21 +1,29 @@
 from rest_framework.generics import CreateAPIView, ListAPIView
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from .models import Message
-from .serializers import MessageSerializer,BroadcastMessageSerializer
+from .serializers import MessageSerializer,MessageValues,BroadcastMessageSerializer,InboxItemSerializer,ConversationSerializer
+from config.fastserializers import ValuesListMixin
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiTypes
-from notifications.utils import send_push_notification
-
-from .models import Message
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
+from .notifications import notify_chat_message
+from .broadcasts import send_broadcast
+from .inbox import inbox_items
+from .history import clamp_limit, conversation_page, sync
+from .unread import get_unread, remove_unread
+from .conversations import mark_read, record_message
+
+from .models import BroadcastReceipt, Conversation, Message
 from .serializers import MessageSerializer
 from .permissions import CanSendMessage
 from users.models import User
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
-from users.models import Division, EmployeeProfile
+from users.models import Division
 from rest_framework.exceptions import PermissionDenied
 
 class SendMessageAPIView(CreateAPIView):
@@ -34,24 +42,20 @@ class SendMessageAPIView(CreateAPIView):
         if sender.role == "EMPLOYEE" and receiver.role != "SUPERADMIN":
             raise PermissionDenied("Employees can only message SuperAdmin")
 
-        message = serializer.save(sender=sender, receiver=receiver)
+        with transaction.atomic():
+            message = serializer.save(sender=sender, receiver=receiver)
+            record_message(message)
 
-        send_push_notification(
-            users=[receiver],
-            title="New Message",
-            body=f"{sender.full_name}: {message.text[:50]}",
-            data={"type": "chat"}
-        )
+        # coalesced per sender and sent from the push dispatcher
+        notify_chat_message(sender, receiver.id, message.text)
 
 class InboxAPIView(ListAPIView):
-    serializer_class = MessageSerializer
+    serializer_class = InboxItemSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return Message.objects.filter(
-            Q(sender=user) | Q(receiver=user)
-        ).select_related("sender", "receiver")
+        # direct messages and broadcasts in one UNION, newest first
+        return inbox_items(self.request.user)
 
     
 class UnreadCountAPIView(APIView):
@@ -59,23 +63,30 @@ class UnreadCountAPIView(APIView):
 
     @extend_schema(
         responses={200: OpenApiTypes.OBJECT},
-        description="Returns the total count of unread messages for the logged-in user."
+        description="Returns the total count of unread messages (direct and broadcast) for the logged-in user."
     )
     def get(self, request):
-        user = request.user
-        count = Message.objects.filter(
-            receiver=user,
-            is_read=False
-        ).count()
-
+        # counter row maintained on every send / read
         return Response({
-            "unread_count": count
+            "unread_count": get_unread(request.user.id)
         })
 
 
 
-class ConversationAPIView(ListAPIView):
+class ConversationListAPIView(ListAPIView):
+    serializer_class = ConversationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # one range of the (owner, -last_message_at) index
+        return Conversation.objects.filter(
+            owner=self.request.user
+        ).select_related("peer", "last_message").order_by("-last_message_at")
+
+
+class ConversationAPIView(ValuesListMixin, ListAPIView):
     serializer_class = MessageSerializer
+    values_serializer_class = MessageValues
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -85,7 +96,59 @@ class ConversationAPIView(ListAPIView):
         return Message.objects.filter(
             Q(sender=user, receiver_id=other_id) |
             Q(sender_id=other_id, receiver=user)
-        ).order_by("created_at")
+        ).select_related("sender", "receiver").order_by("created_at")
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("before", int, description="Keyset: messages older than this id"),
+            OpenApiParameter("after", int, description="Keyset: messages newer than this id"),
+            OpenApiParameter("limit", int, description="Keyset: page size (max 200); alone = newest messages"),
+        ],
+    )
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if not {"before", "after", "limit"} & params.keys():
+            # legacy page-number listing, oldest first
+            return super().list(request, *args, **kwargs)
+
+        try:
+            before = int(params["before"]) if params.get("before") else None
+            after = int(params["after"]) if params.get("after") else None
+        except ValueError:
+            raise ValidationError("before/after must be message ids")
+
+        messages, has_more = conversation_page(
+            request.user.id,
+            self.kwargs["user_id"],
+            before=before,
+            after=after,
+            limit=clamp_limit(params.get("limit")),
+        )
+        return Response({
+            "results": self.get_serializer(messages, many=True).data,
+            "has_more": has_more,
+        })
+
+
+class SyncAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("token", str, description="token from the previous sync; omit on first run"),
+            OpenApiParameter("limit", int, description="max new messages per call (max 200)"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+        description="New messages and read receipts across all conversations since the sync token. Messages from the last few seconds can repeat on the next sync: dedupe by id."
+    )
+    def get(self, request):
+        changes = sync(
+            request.user.id,
+            request.query_params.get("token"),
+            limit=clamp_limit(request.query_params.get("limit"), default=100),
+        )
+        changes["messages"] = MessageSerializer(changes["messages"], many=True).data
+        return Response(changes)
 
 
 class MarkMessageReadAPIView(APIView):
@@ -102,9 +165,13 @@ class MarkMessageReadAPIView(APIView):
         if message.receiver != user:
             raise PermissionDenied("Not allowed")
 
-        if not message.is_read:
-            message.is_read = True
-            message.save(update_fields=["is_read"])
+        # conditional update: two concurrent reads decrement once
+        with transaction.atomic():
+            updated = Message.objects.filter(
+                id=message.id,
+                is_read=False
+            ).update(is_read=True, read_at=timezone.now())
+            mark_read(user.id, message.sender_id, updated)
 
         return Response({"status": "read"})
     
@@ -118,11 +185,13 @@ class MarkConversationReadAPIView(APIView):
     def post(self, request, user_id):
         user = request.user
 
-        Message.objects.filter(
-            sender_id=user_id,
-            receiver=user,
-            is_read=False
-        ).update(is_read=True)
+        with transaction.atomic():
+            updated = Message.objects.filter(
+                sender_id=user_id,
+                receiver=user,
+                is_read=False
+            ).update(is_read=True, read_at=timezone.now())
+            mark_read(user.id, user_id, updated)
 
         return Response({"status": "conversation_read"})
 
@@ -155,33 +224,53 @@ class DivisionBroadcastAPIView(APIView):
         except Division.DoesNotExist:
             raise PermissionDenied("Invalid division")
 
-        profiles = EmployeeProfile.objects.filter(
-            division=division
-        )
-
-        # Admin restriction
-        if user.role == "ADMIN":
-            profiles = profiles.filter(admin=user)
-
-        messages = [
-            Message(
-                sender=user,
-                receiver=profile.user,
-                text=text
-            )
-            for profile in profiles
-        ]
+        # deliveries are fanned out in SQL; live copies and pushes after commit
+        broadcast = send_broadcast(user, division, text)
 
-        Message.objects.bulk_create(messages)
-        
-        send_push_notification(
-        users=[p.user for p in profiles],
-        title="Announcement",
-        body=text[:80],
-        data={"type": "broadcast"}
-        )
         return Response({
-            "sent_to": len(messages),
+            "broadcast": broadcast.id,
+            "sent_to": broadcast.recipient_count,
             "division": division.name
         })
         
+
+
+class MarkBroadcastReadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=None,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def post(self, request, broadcast_id):
+        receipts = BroadcastReceipt.objects.filter(
+            user=request.user,
+            broadcast_id=broadcast_id,
+        )
+
+        with transaction.atomic():
+            updated = receipts.filter(is_read=False).update(is_read=True)
+            remove_unread(request.user.id, updated)
+
+        if not updated and not receipts.exists():
+            raise PermissionDenied("Not allowed")
+
+        return Response({"status": "read"})
+
+
+class MarkBroadcastsReadAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=None,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def post(self, request):
+        with transaction.atomic():
+            updated = BroadcastReceipt.objects.filter(
+                user=request.user,
+                is_read=False
+            ).update(is_read=True)
+            remove_unread(request.user.id, updated)
+
+        return Response({"status": "broadcasts_read"})
@@ -0,0 +1,71 @@
+import threading
+import time
+
+# per-token outcomes a backend reports
+OK = "ok"
+INVALID = "invalid"  # token is dead: delete the FCMToken row
+FAILED = "failed"    # transient / payload error: keep the token
+
+
+class FirebaseBackend:
+    """FCM through firebase_admin's send_each_for_multicast (max 500 tokens)."""
+
+    def send(self, tokens, title, body, data):
+        from firebase_admin import messaging
+
+        from .utils import get_firebase_app
+
+        message = messaging.MulticastMessage(
+            notification=messaging.Notification(
+                title=title,
+                body=body,
+            ),
+            data=data,
+            tokens=tokens,
+        )
+        batch = messaging.send_each_for_multicast(message, app=get_firebase_app())
+
+        results = []
+        for response in batch.responses:
+            if response.success:
+                results.append(OK)
+            elif isinstance(response.exception, (
+                messaging.UnregisteredError,
+                messaging.SenderIdMismatchError,
+            )):
+                results.append(INVALID)
+            else:
+                results.append(FAILED)
+        return results
+
+
+class FakeBackend:
+    """
+    Local stand-in for FCM (tests, benchmarks, dev without credentials).
+    Records every call; tokens in `invalid_tokens` come back INVALID and
+    `latency` seconds are slept per call to mimic the round trip.
+    """
+
+    def __init__(self, latency=0.0, invalid_tokens=()):
+        self.latency = latency
+        self.invalid_tokens = set(invalid_tokens)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def send(self, tokens, title, body, data):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.calls.append({
+                "tokens": list(tokens),
+                "title": title,
+                "body": body,
+                "data": data,
+            })
+
+        return [INVALID if token in self.invalid_tokens else OK for token in tokens]
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
@@ -0,0 +1,222 @@
+import atexit
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from users.tokens import prune_tokens
+
+from .backends import INVALID, OK
+
+logger = logging.getLogger(__name__)
+
+# FCM rejects multicast messages with more tokens than this
+FCM_MAX_TOKENS = 500
+
+
+class PushStats:
+    """Counters since the dispatcher started, shared by its worker threads."""
+
+    FIELDS = ("chunks", "sent", "failed", "invalid_pruned", "dropped_chunks", "errors")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self._counts)
+            uptime = time.monotonic() - self.started
+        data["uptime_seconds"] = round(uptime, 1)
+        data["sent_per_second"] = round(data["sent"] / uptime, 2) if uptime else 0.0
+        return data
+
+
+class PushDispatcher:
+    """
+    Sends pushes off the request thread. Tokens are split into chunks of
+    at most FCM_MAX_TOKENS, chunks run concurrently on a small thread pool
+    and dead tokens are deleted in bulk once their chunk comes back.
+
+    At most PUSH_MAX_PENDING_CHUNKS chunks are queued or in flight; past
+    that new chunks are dropped (and counted) rather than piling up memory.
+    """
+
+    def __init__(self, backend=None, workers=None, max_pending=None, sync=None):
+        self._backend = backend
+        self.workers = workers or getattr(settings, "PUSH_WORKERS", 4)
+        max_pending = max_pending or getattr(settings, "PUSH_MAX_PENDING_CHUNKS", 1000)
+        self.sync = getattr(settings, "PUSH_SYNC", False) if sync is None else sync
+
+        self.stats = PushStats()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        # call_later(): (due, seq, fn, args) heap served by one timer thread
+        self._delayed = []
+        self._delayed_seq = itertools.count()
+        self._delayed_cond = threading.Condition()
+        self._timer = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(settings.PUSH_BACKEND)()
+        return self._backend
+
+    def _get_executor(self):
+        # created on first push, so forked workers don't inherit dead threads
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="push",
+                    )
+        return self._executor
+
+    # -------------------------
+    # ENQUEUE
+    # -------------------------
+    def dispatch(self, tokens, title, body, data=None):
+        """Queue a push to `tokens`; returns the number of chunks queued."""
+        tokens = list(dict.fromkeys(tokens))
+        data = {key: str(value) for key, value in (data or {}).items()}
+
+        queued = 0
+        for start in range(0, len(tokens), FCM_MAX_TOKENS):
+            chunk = tokens[start:start + FCM_MAX_TOKENS]
+
+            if self.sync:
+                self._send_chunk(chunk, title, body, data)
+                queued += 1
+                continue
+
+            if not self._slots.acquire(blocking=False):
+                self.stats.add(dropped_chunks=1)
+                logger.warning("Push queue full, dropped a chunk of %d tokens", len(chunk))
+                continue
+
+            future = self._get_executor().submit(self._run_chunk, chunk, title, body, data)
+            future.add_done_callback(lambda _: self._slots.release())
+            queued += 1
+
+        return queued
+
+    def call_later(self, delay, fn, *args):
+        """Run fn(*args) on the push pool after `delay` seconds."""
+        if self.sync:
+            fn(*args)
+            return
+
+        with self._delayed_cond:
+            heapq.heappush(
+                self._delayed,
+                (time.monotonic() + delay, next(self._delayed_seq), fn, args),
+            )
+            if self._timer is None or not self._timer.is_alive():
+                self._timer = threading.Thread(
+                    target=self._run_timer, name="push-timer", daemon=True
+                )
+                self._timer.start()
+            self._delayed_cond.notify()
+
+    def _run_timer(self):
+        while True:
+            with self._delayed_cond:
+                while not self._delayed or self._delayed[0][0] > time.monotonic():
+                    timeout = self._delayed[0][0] - time.monotonic() if self._delayed else None
+                    self._delayed_cond.wait(timeout)
+                entry = heapq.heappop(self._delayed)
+
+            try:
+                self._get_executor().submit(self._run_delayed, *entry[2:])
+            except RuntimeError:
+                # interpreter exit: the pool takes no more work; close()
+                # runs what is left
+                with self._delayed_cond:
+                    heapq.heappush(self._delayed, entry)
+                return
+
+    def _run_delayed(self, fn, args):
+        close_old_connections()
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception("Delayed push task %r failed", fn)
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait=True):
+        """Finish (or abandon) queued chunks; the next dispatch starts a new pool."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def close(self):
+        """
+        At interpreter exit: run the call_later() tasks still waiting
+        (early, on this thread) instead of dropping them with the timer.
+        """
+        with self._delayed_cond:
+            pending, self._delayed = sorted(self._delayed), []
+        if pending:
+            logger.warning("Running %d delayed push task(s) early at shutdown", len(pending))
+
+        # the pool may already refuse work; send inline from here on
+        self.sync = True
+        for _, _, fn, args in pending:
+            self._run_delayed(fn, args)
+        self.shutdown(wait=True)
+
+    # -------------------------
+    # WORKERS
+    # -------------------------
+    def _run_chunk(self, tokens, title, body, data):
+        close_old_connections()
+        try:
+            self._send_chunk(tokens, title, body, data)
+        finally:
+            close_old_connections()
+
+    def _send_chunk(self, tokens, title, body, data):
+        try:
+            results = self.backend.send(tokens, title, body, data)
+        except Exception:
+            logger.exception("Push chunk of %d tokens failed", len(tokens))
+            self.stats.add(chunks=1, errors=1, failed=len(tokens))
+            return
+
+        invalid = [token for token, result in zip(tokens, results) if result == INVALID]
+        sent = sum(1 for result in results if result == OK)
+
+        pruned = prune_tokens(invalid) if invalid else 0
+
+        self.stats.add(
+            chunks=1,
+            sent=sent,
+            failed=len(tokens) - sent,
+            invalid_pruned=pruned,
+        )
+
+
+dispatcher = PushDispatcher()
+atexit.register(dispatcher.close)
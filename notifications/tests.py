@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from users.models import FCMToken, User
+
+from .backends import FakeBackend
+from .dispatcher import FCM_MAX_TOKENS, PushDispatcher
+
+
+def make_dispatcher(**backend):
+    return PushDispatcher(backend=FakeBackend(**backend), sync=True)
+
+
+# ======================================================
+# DISPATCH
+# ======================================================
+class DispatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_tokens_are_sent_in_fcm_sized_chunks(self):
+        push = make_dispatcher()
+        tokens = [f"device-{i}" for i in range(FCM_MAX_TOKENS * 2 + 1)]
+
+        # duplicates are sent once
+        self.assertEqual(push.dispatch(tokens + tokens[:10], "Title", "Body"), 3)
+
+        sizes = [len(call["tokens"]) for call in push.backend.calls]
+        self.assertEqual(sizes, [FCM_MAX_TOKENS, FCM_MAX_TOKENS, 1])
+        self.assertEqual(push.stats.snapshot()["sent"], len(tokens))
+
+    def test_invalid_tokens_are_pruned(self):
+        user = User.objects.create(email="employee@test.local", name="employee", role="EMPLOYEE")
+        for token in ("alive", "dead"):
+            FCMToken.objects.create(user=user, token=token, device_type="android")
+        push = make_dispatcher(invalid_tokens=["dead"])
+
+        push.dispatch(["alive", "dead"], "Title", "Body")
+
+        self.assertEqual(list(FCMToken.objects.values_list("token", flat=True)), ["alive"])
+        stats = push.stats.snapshot()
+        self.assertEqual((stats["sent"], stats["failed"], stats["invalid_pruned"]), (1, 1, 1))
+
+
+# ======================================================
+# DELAYED TASKS
+# ======================================================
+class CloseTests(TestCase):
+    def test_pending_tasks_run_at_close(self):
+        push = PushDispatcher(backend=FakeBackend(), sync=False)
+        task = mock.Mock()
+        push.call_later(3600, task, "a")
+
+        with self.assertLogs("notifications.dispatcher", "WARNING"):
+            push.close()
+
+        task.assert_called_once_with("a")
+        self.assertEqual(push._delayed, [])
+
+    def test_timer_keeps_tasks_the_pool_refuses(self):
+        push = PushDispatcher(backend=FakeBackend(), sync=False)
+        task = mock.Mock()
+
+        with mock.patch.object(push, "_get_executor") as executor:
+            executor.return_value.submit.side_effect = RuntimeError("cannot schedule new futures after interpreter shutdown")
+            push.call_later(0, task)
+            push._timer.join(timeout=5)
+
+        self.assertFalse(push._timer.is_alive())
+        self.assertEqual(len(push._delayed), 1)
+
+        with self.assertLogs("notifications.dispatcher", "WARNING"):
+            push.close()
+        task.assert_called_once_with()
@@ -1,21 +1,60 @@
-from firebase_admin import messaging
-from users.models import FCMToken
+import threading
 
-def send_push_notification(users, title, body, data=None):
-    tokens = FCMToken.objects.filter(
-        user__in=users
-    ).values_list("token", flat=True)
+from django.conf import settings
+from django.db.models import QuerySet
+from users.presence import online_user_ids
+from users.tokens import user_tokens
 
+_app_lock = threading.Lock()
+
+
+def get_firebase_app():
+    """
+    Initialise the default Firebase app on first use instead of at settings
+    import, so workers that never push don't parse the credential file.
+    """
+    # firebase_admin pulls in grpc / google-cloud: import on first push only
+    import firebase_admin
+    from firebase_admin import credentials
+
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        pass
+
+    with _app_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            cred = credentials.Certificate(str(settings.FIREBASE_SERVICE_ACCOUNT_PATH))
+            return firebase_admin.initialize_app(cred)
+
+
+def send_push_notification(users, title, body, data=None, skip_online_in=None):
+    """
+    Queue a push to every device of `users` (users, ids or a User
+    queryset); returns immediately. Tokens come from the cached
+    user -> tokens map. skip_online_in: a presence scope (users.presence)
+    whose online users already got it in-app.
+    """
+    from .dispatcher import dispatcher
+
+    if isinstance(users, QuerySet):
+        user_ids = list(users.values_list("pk", flat=True))
+    else:
+        user_ids = [getattr(user, "pk", user) for user in users]
+
+    tokens_by_user = user_tokens(user_ids)
+
+    if skip_online_in:
+        online = online_user_ids(tokens_by_user, scope=skip_online_in)
+        tokens_by_user = {
+            user_id: tokens for user_id, tokens in tokens_by_user.items()
+            if user_id not in online
+        }
+
+    tokens = [token for device_tokens in tokens_by_user.values() for token in device_tokens]
     if not tokens:
-        return
-
-    message = messaging.MulticastMessage(
-        notification=messaging.Notification(
-            title=title,
-            body=body,
-        ),
-        data=data or {},
-        tokens=list(tokens),
-    )
-
-    messaging.send_multicast(message)
+        return 0
+
+    return dispatcher.dispatch(tokens, title, body, data)
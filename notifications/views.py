@@ -0,0 +1,18 @@
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.permissions import IsSuperAdmin
+
+from .dispatcher import dispatcher
+
+
+class PushStatsAPIView(APIView):
+    permission_classes = [IsSuperAdmin]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Push dispatcher counters for the worker serving this request."
+    )
+    def get(self, request):
+        return Response(dispatcher.stats.snapshot())
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.tokens import expire_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete FCM tokens whose device hasn't re-registered within --days."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "FCM_TOKEN_MAX_AGE_DAYS", 60),
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = expire_tokens(options["days"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} stale FCM tokens"))
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from time import monotonic, time
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import is_revoked
+from .models import User
+
+SUBPROTOCOL = "jwt"
+
+
+class ScopeUserCache:
+    """Small per-worker TTL cache: raw token -> validated scope user."""
+
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw):
+        with self._lock:
+            entry = self._users.get(raw)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < monotonic():
+                del self._users[raw]
+                return None
+            return user
+
+    def set(self, raw, user, token_exp):
+        # never outlive the token itself
+        ttl = min(self.ttl, max(0, token_exp - time()))
+        with self._lock:
+            self._users[raw] = (monotonic() + ttl, user)
+            self._users.move_to_end(raw)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+
+user_cache = ScopeUserCache(ttl=getattr(settings, "WS_USER_CACHE_TTL", 60))
+
+
+def get_raw_token(scope):
+    """
+    Token from `?token=<jwt>` or from the `Sec-WebSocket-Protocol: jwt, <jwt>`
+    header. Returns (token, subprotocol to echo back on accept).
+    """
+    subprotocols = scope.get("subprotocols") or []
+    if SUBPROTOCOL in subprotocols:
+        for value in subprotocols:
+            if value != SUBPROTOCOL:
+                return value, SUBPROTOCOL
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    token = query.get("token")
+    if token:
+        return token[0], None
+
+    return None, None
+
+
+@database_sync_to_async
+def get_db_user(user_id):
+    return User.objects.filter(id=user_id, is_active=True).first() or AnonymousUser()
+
+
+async def get_scope_user(raw):
+    user = user_cache.get(raw)
+    if user is not None:
+        return user
+
+    try:
+        token = AccessToken(raw)
+    except TokenError:
+        return AnonymousUser()
+
+    if is_revoked(token):
+        return AnonymousUser()
+
+    # tokens issued before role claims existed still need the row
+    if "role" in token:
+        user = TokenUser(token)
+    else:
+        user = await get_db_user(token[api_settings.USER_ID_CLAIM])
+
+    user_cache.set(raw, user, token["exp"])
+    return user
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Populates scope["user"] from a SimpleJWT access token. Users come from
+    the signed claims (see ClaimsTokenObtainPairSerializer), not sessions.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        raw, subprotocol = get_raw_token(scope)
+
+        scope["user"] = await get_scope_user(raw) if raw else AnonymousUser()
+        scope["auth_subprotocol"] = subprotocol
+
+        return await super().__call__(scope, receive, send)
+
+
+class AuthSubprotocolMixin:
+    """Echo the `jwt` subprotocol back when the token came in that way."""
+
+    async def accept(self, subprotocol=None, headers=None):
+        if subprotocol is None:
+            subprotocol = self.scope.get("auth_subprotocol")
+        await super().accept(subprotocol=subprotocol, headers=headers)
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 22:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_fcmtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fcmtoken',
+            name='last_seen_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='fcmtoken',
+            index=models.Index(fields=['last_seen_at'], name='users_fcmto_last_se_5156f3_idx'),
+        ),
+    ]
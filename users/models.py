@@ -1,8 +1,16 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .managers import UserManager
 import uuid
 
+
+def display_name(name, email):
+    # name is required on create, but older rows may have it blank
+    return name or email.split("@")[0]
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     class Role(models.TextChoices):
         SUPERADMIN = 'SUPERADMIN'
@@ -25,6 +33,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.email} ({self.role})"
 
+    @cached_property
+    def display_name(self):
+        return display_name(self.name, self.email)
+
 class Division(models.Model):
     name = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -67,6 +79,13 @@ class FCMToken(models.Model):
         choices=[("android", "Android"), ("ios", "iOS")]
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # refreshed on every registration; stale tokens are pruned by it
+    last_seen_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["last_seen_at"]),
+        ]
 
     def __str__(self):
         return f"{self.user.email} ({self.device_type})"
@@ -1,15 +1,77 @@
+from django.core.cache import caches
 from rest_framework.permissions import BasePermission
 
+from .models import EmployeeProfile
+
+MANAGED_KEY = "managed_employees:{}"
+MANAGED_TTL = 300
+
+
+def managed_employee_ids(admin_id):
+    """Ids (as str) of employees assigned to an admin, cached."""
+    cache = caches["tiered"]
+    key = MANAGED_KEY.format(admin_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = {
+            str(pk) for pk in EmployeeProfile.objects.filter(
+                admin_id=admin_id
+            ).values_list("user_id", flat=True)
+        }
+        cache.set(key, ids, MANAGED_TTL)
+    return ids
+
+
+def forget_managed_employees(admin_id):
+    if admin_id:
+        caches["tiered"].delete(MANAGED_KEY.format(admin_id))
+
+
+def role_of(user):
+    # AnonymousUser has no role
+    return getattr(user, "role", None)
+
+
+def manages_employee(user, employee_id):
+    role = role_of(user)
+    if role == 'SUPERADMIN':
+        return True
+
+    if role == 'ADMIN':
+        return str(employee_id) in managed_employee_ids(user.id)
+
+    return False
+
+
 class IsSuperAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == 'SUPERADMIN'
+        return role_of(request.user) == 'SUPERADMIN'
 
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == 'ADMIN'
+        return role_of(request.user) == 'ADMIN'
 
 
 class IsEmployee(BasePermission):
     def has_permission(self, request, view):
-        return request.user.role == 'EMPLOYEE'
+        return role_of(request.user) == 'EMPLOYEE'
+
+
+class IsAdminOrSuperAdmin(BasePermission):
+    def has_permission(self, request, view):
+        return role_of(request.user) in ('ADMIN', 'SUPERADMIN')
+
+
+class ManagesEmployee(BasePermission):
+    """
+    URL kwarg `user_id` must be an employee the requester may supervise:
+    SuperAdmin -> anyone, Admin -> own assigned employees only.
+    """
+    message = "This employee is not assigned to you"
+
+    def has_permission(self, request, view):
+        employee_id = view.kwargs.get("user_id")
+        if employee_id is None:
+            return False
+        return manages_employee(request.user, employee_id)
@@ -0,0 +1,131 @@
+# Who is online: every open ChatConsumer / location socket keeps a short
+# TTL key alive in the shared cache (Redis in production, locmem in dev
+# and tests). A worker that dies stops heartbeating and its users expire.
+# Sockets that receive something live (e.g. division broadcasts on the
+# chat socket) also keep a scoped key, so pushes skip only those users.
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+# a user is online while a socket refreshed their key within this window
+PRESENCE_TTL = getattr(settings, "PRESENCE_TTL_SECONDS", 60)
+HEARTBEAT_INTERVAL = PRESENCE_TTL / 3
+LAST_SEEN_TTL = 30 * 24 * 3600
+
+ONLINE_KEY = "presence:{}"
+SCOPED_ONLINE_KEY = "presence:{}:{}"
+LAST_SEEN_KEY = "last_seen:{}"
+
+# ChatConsumer sockets subscribed to the user's division broadcasts
+BROADCASTS = "broadcasts"
+
+# open sockets per (scope, user) in this worker (event loop only, no
+# locking); scope None = any socket
+local_sockets = Counter()
+
+
+def online_key(user_id, scope=None):
+    if scope is None:
+        return ONLINE_KEY.format(user_id)
+    return SCOPED_ONLINE_KEY.format(scope, user_id)
+
+
+def get_cache():
+    return caches["default"]
+
+
+async def touch(user_id, scopes=()):
+    now = time.time()
+    cache = get_cache()
+    await cache.aset_many(
+        {online_key(user_id, scope): now for scope in (None, *scopes)},
+        PRESENCE_TTL,
+    )
+    await cache.aset(LAST_SEEN_KEY.format(user_id), now, LAST_SEEN_TTL)
+
+
+async def user_connected(user_id, scopes=()):
+    for scope in (None, *scopes):
+        local_sockets[(scope, user_id)] += 1
+    await touch(user_id, scopes)
+
+
+async def user_disconnected(user_id, scopes=()):
+    closed = []
+    for scope in (None, *scopes):
+        local_sockets[(scope, user_id)] -= 1
+        if local_sockets[(scope, user_id)] <= 0:
+            del local_sockets[(scope, user_id)]
+            closed.append(online_key(user_id, scope))
+    if not closed:
+        return
+
+    cache = get_cache()
+    await cache.aset(LAST_SEEN_KEY.format(user_id), time.time(), LAST_SEEN_TTL)
+    # sockets of this user on other workers put the keys back on their
+    # next heartbeat
+    await cache.adelete_many(closed)
+
+
+# ======================================================
+# QUERIES
+# ======================================================
+def online_user_ids(user_ids, scope=None):
+    """
+    The subset of `user_ids` (as str) that is online, one cache round
+    trip; with `scope`, only users with a socket of that scope open.
+    """
+    keys = {online_key(user_id, scope): str(user_id) for user_id in user_ids}
+    return {keys[key] for key in get_cache().get_many(list(keys))}
+
+
+def presence(user_ids):
+    """{user_id (str): {"online": bool, "last_seen": datetime | None}}"""
+    user_ids = [str(user_id) for user_id in user_ids]
+    keys = [ONLINE_KEY.format(user_id) for user_id in user_ids]
+    keys += [LAST_SEEN_KEY.format(user_id) for user_id in user_ids]
+    values = get_cache().get_many(keys)
+
+    result = {}
+    for user_id in user_ids:
+        seen = values.get(LAST_SEEN_KEY.format(user_id))
+        result[user_id] = {
+            "online": ONLINE_KEY.format(user_id) in values,
+            "last_seen": datetime.fromtimestamp(seen, tz=dt_timezone.utc) if seen else None,
+        }
+    return result
+
+
+# ======================================================
+# CONSUMER MIXIN
+# ======================================================
+class PresenceMixin:
+    """
+    start_presence() once the socket is accepted, stop_presence() in
+    disconnect(); in between the user's keys are refreshed periodically.
+    """
+
+    async def start_presence(self, user_id, scopes=()):
+        self.presence_user_id = str(user_id)
+        self.presence_scopes = tuple(scopes)
+        await user_connected(self.presence_user_id, self.presence_scopes)
+        self.presence_task = asyncio.create_task(self._presence_heartbeat())
+
+    async def stop_presence(self):
+        task = getattr(self, "presence_task", None)
+        if task is not None:
+            task.cancel()
+            self.presence_task = None
+
+        if getattr(self, "presence_user_id", None):
+            await user_disconnected(self.presence_user_id, self.presence_scopes)
+            self.presence_user_id = None
+
+    async def _presence_heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await touch(self.presence_user_id, self.presence_scopes)
@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import User, EmployeeProfile,Division, FCMToken
+from .tokens import MAX_TOKENS_PER_USER
 
 class UserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -25,19 +29,83 @@ class DivisionSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 class EmployeeMiniSerializer(serializers.ModelSerializer):
-    full_name = serializers.SerializerMethodField()
-    division = serializers.CharField(source="profile.division.name", read_only=True)
+    # User has no first/last name or username: display_name is name (or email)
+    full_name = serializers.CharField(source="display_name", read_only=True)
+    # needs select_related("profile__division") on the queryset
+    division = serializers.CharField(source="profile.division.name", read_only=True, default=None)
 
     class Meta:
         model = User
         fields = ["id", "full_name", "email", "division"]
-
-    # Adding '-> str' fixes the warning
-    def get_full_name(self, obj) -> str:
-        name = f"{obj.first_name} {obj.last_name}".strip()
-        return name if name else obj.username
     
 class FCMTokenSerializer(serializers.ModelSerializer):
+    # re-registering a known token is an upsert, not a uniqueness error
+    token = serializers.CharField(max_length=255)
+
     class Meta:
         model = FCMToken
         fields = ["token", "device_type"]
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # more devices than a user may keep would be trimmed right away
+        kwargs.setdefault("max_length", MAX_TOKENS_PER_USER)
+        return super().many_init(*args, **kwargs)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Puts role / division / admin into the token so websocket (and hot API)
+    auth can build the user from claims without a DB lookup.
+    Claims refresh together with the access token (ClaimsTokenRefreshSerializer).
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        profile = EmployeeProfile.objects.filter(user=user).values(
+            "division_id", "admin_id"
+        ).first() or {}
+        admin_id = profile.get("admin_id")
+
+        token["role"] = user.role
+        token["name"] = user.name
+        token["division_id"] = profile.get("division_id")
+        token["admin_id"] = str(admin_id) if admin_id else None
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    The stock refresh copies role / division / admin from the refresh
+    token into the new access token. Here they are read from the DB
+    again, so a demotion or reassignment applies from the next refresh,
+    and deleted or deactivated users get no new access token.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"],
+                "no_active_account",
+            )
+
+        fresh = ClaimsTokenObtainPairSerializer.get_token(user)
+        data = {"access": str(fresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # blacklist app not installed
+                    pass
+            data["refresh"] = str(fresh)
+
+        return data
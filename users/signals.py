@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import revoke_user_tokens
+from .models import EmployeeProfile, User
+from .permissions import forget_managed_employees
+
+
+# role / division / admin live in token claims; any change invalidates them
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_on_user_change(sender, instance, created=False, **kwargs):
+    if not created:
+        revoke_user_tokens(instance.id, timezone.now().timestamp())
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+def revoke_on_profile_change(sender, instance, created=False, **kwargs):
+    revoke_user_tokens(instance.user_id, timezone.now().timestamp())
+
+
+# cached admin -> employees map (users.permissions) for old and new admin
+@receiver(pre_save, sender=EmployeeProfile)
+def forget_previous_admin(sender, instance, **kwargs):
+    if instance.pk:
+        previous = EmployeeProfile.objects.filter(pk=instance.pk).values_list(
+            "admin_id", flat=True
+        ).first()
+        forget_managed_employees(previous)
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+def forget_current_admin(sender, instance, **kwargs):
+    forget_managed_employees(instance.admin_id)
@@ -1,3 +1,279 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notifications.dispatcher import dispatcher
+from notifications.utils import send_push_notification
+
+from .authentication import revoke_user_tokens
+from .middleware import AuthSubprotocolMixin, JWTAuthMiddleware, ScopeUserCache, user_cache
+from .models import Division, EmployeeProfile, FCMToken, User
+from .presence import BROADCASTS, local_sockets, online_user_ids, user_connected, user_disconnected
+from .serializers import ClaimsTokenObtainPairSerializer
+from .tokens import MAX_TOKENS_PER_USER, register_tokens, user_tokens
+
+
+def make_user(email, role="EMPLOYEE", **extra):
+    return User.objects.create_user(email=email, password="x", name=email.split("@")[0], role=role, **extra)
+
+
+# ======================================================
+# TOKEN CLAIMS
+# ======================================================
+class TokenRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user("admin@test.local", role="ADMIN")
+        response = self.client.post(
+            "/api/auth/login/", {"email": "admin@test.local", "password": "x"}, format="json"
+        )
+        self.refresh = response.data["refresh"]
+
+    def refresh_token(self):
+        return self.client.post("/api/auth/refresh/", {"refresh": self.refresh}, format="json")
+
+    def test_refresh_reloads_role(self):
+        self.user.role = "EMPLOYEE"
+        self.user.save()
+
+        response = self.refresh_token()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data["access"])["role"], "EMPLOYEE")
+
+    def test_refreshed_token_is_not_revoked(self):
+        self.user.role = "EMPLOYEE"
+        self.user.save()
+
+        access = self.refresh_token().data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        # employee-only endpoint, claims-authenticated
+        response = self.client.post("/api/locations/send/", {"latitude": "23.8", "longitude": "90.4"}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_deactivated_user_cannot_refresh(self):
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_deleted_user_cannot_refresh(self):
+        self.user.delete()
+
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+
+# ======================================================
+# WEBSOCKET AUTH
+# ======================================================
+class WhoAmIConsumer(AuthSubprotocolMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        if self.scope["user"].is_anonymous:
+            await self.close()
+            return
+        await self.accept()
+        await self.send(text_data=str(self.scope["user"].id))
+
+
+class JWTAuthMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache._users.clear()
+        self.user = make_user("employee@test.local")
+        self.token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.app = JWTAuthMiddleware(WhoAmIConsumer.as_asgi())
+
+    async def connect(self, path="/ws/", subprotocols=None):
+        communicator = WebsocketCommunicator(self.app, path, subprotocols=subprotocols)
+        connected, subprotocol = await communicator.connect()
+        user_id = await communicator.receive_from() if connected else None
+        await communicator.disconnect()
+        return connected, subprotocol, user_id
+
+    async def test_token_in_query_string(self):
+        connected, subprotocol, user_id = await self.connect(f"/ws/?token={self.token}")
+
+        self.assertTrue(connected)
+        self.assertIsNone(subprotocol)
+        self.assertEqual(user_id, str(self.user.id))
+
+    async def test_token_in_subprotocol_is_echoed(self):
+        connected, subprotocol, user_id = await self.connect(subprotocols=["jwt", str(self.token)])
+
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, "jwt")
+        self.assertEqual(user_id, str(self.user.id))
+
+    async def test_missing_or_bad_token_is_rejected(self):
+        self.assertFalse((await self.connect())[0])
+        self.assertFalse((await self.connect("/ws/?token=not-a-jwt"))[0])
+
+    async def test_expired_token_is_rejected(self):
+        self.token.set_exp(lifetime=-timedelta(minutes=1))
+
+        self.assertFalse((await self.connect(f"/ws/?token={self.token}"))[0])
+
+    async def test_revoked_token_is_rejected(self):
+        revoke_user_tokens(self.user.id, self.token["iat"] + 1)
+
+        self.assertFalse((await self.connect(f"/ws/?token={self.token}"))[0])
+
+
+class ScopeUserCacheTests(SimpleTestCase):
+    def test_entries_expire_after_ttl(self):
+        users = ScopeUserCache(ttl=60)
+        with mock.patch("users.middleware.monotonic", return_value=1000):
+            users.set("raw", "user", token_exp=time.time() + 3600)
+            self.assertEqual(users.get("raw"), "user")
+        with mock.patch("users.middleware.monotonic", return_value=1061):
+            self.assertIsNone(users.get("raw"))
+
+    def test_entries_never_outlive_the_token(self):
+        users = ScopeUserCache(ttl=60)
+        with mock.patch("users.middleware.monotonic", return_value=1000):
+            users.set("raw", "user", token_exp=time.time() + 10)
+        with mock.patch("users.middleware.monotonic", return_value=1011):
+            self.assertIsNone(users.get("raw"))
+
+    def test_oldest_entries_are_evicted(self):
+        users = ScopeUserCache(ttl=60, max_size=2)
+        for raw in ("a", "b", "c"):
+            users.set(raw, raw, token_exp=time.time() + 3600)
+
+        self.assertEqual([users.get(raw) for raw in "abc"], [None, "b", "c"])
+
+
+# ======================================================
+# FCM TOKENS
+# ======================================================
+class RegisterTokensTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = make_user("employee@test.local")
+        self.client.force_authenticate(self.user)
+
+    def test_duplicate_tokens_in_one_request(self):
+        response = self.client.post("/api/fcm-token/", [
+            {"token": "device-a", "device_type": "android"},
+            {"token": "device-a", "device_type": "ios"},
+        ], format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(FCMToken.objects.get(token="device-a").device_type, "ios")
+
+    def test_too_many_tokens_in_one_request(self):
+        response = self.client.post("/api/fcm-token/", [
+            {"token": f"device-{i}", "device_type": "android"}
+            for i in range(MAX_TOKENS_PER_USER + 1)
+        ], format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_token_map_is_cached_in_one_query(self):
+        register_tokens(self.user, [{"token": "device-a", "device_type": "android"}])
+        other = make_user("other@test.local")
+
+        with self.assertNumQueries(1):
+            tokens = user_tokens([self.user.id, other.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(user_tokens([self.user.id, other.id]), tokens)
+
+        self.assertEqual(tokens, {str(self.user.id): ["device-a"], str(other.id): []})
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = caches["tiered"]
+        self.tiered.local.clear()
+
+    def test_get_many_reads_shared_once_for_local_misses(self):
+        self.tiered.set_many({"a": 1, "b": 2})
+        self.tiered.local.delete("b")
+
+        with mock.patch.object(self.tiered.shared, "get_many", wraps=self.tiered.shared.get_many) as shared_get:
+            self.assertEqual(self.tiered.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+
+        shared_get.assert_called_once_with(["b", "c"], version=None)
+        self.assertEqual(self.tiered.local.get("b"), 2)
+
+    def test_delete_many_clears_both_tiers(self):
+        self.tiered.set_many({"a": 1, "b": 2})
+        self.tiered.delete_many(["a", "b"])
+
+        self.assertEqual(self.tiered.get_many(["a", "b"]), {})
+        self.assertEqual(self.tiered.shared.get_many(["a", "b"]), {})
+
+
+# ======================================================
+# PRESENCE
+# ======================================================
+class ScopedPresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_sockets.clear()
+        self.chatting = make_user("chatting@test.local")
+        self.tracking = make_user("tracking@test.local")
+        for user in (self.chatting, self.tracking):
+            register_tokens(user, [{"token": f"device-{user.email}", "device_type": "android"}])
+
+    async def connect(self):
+        await user_connected(str(self.chatting.id), (BROADCASTS,))
+        # location socket only: never sees a broadcast live
+        await user_connected(str(self.tracking.id))
+
+    def test_push_skips_only_users_online_in_the_scope(self):
+        async_to_sync(self.connect)()
+
+        with mock.patch.object(dispatcher, "dispatch", return_value=1) as dispatch:
+            send_push_notification([self.chatting, self.tracking], "Announcement", "hi", skip_online_in=BROADCASTS)
+
+        self.assertEqual(dispatch.call_args.args[0], ["device-tracking@test.local"])
+
+    def test_scoped_key_goes_with_the_socket(self):
+        async_to_sync(self.connect)()
+        async_to_sync(user_disconnected)(str(self.chatting.id), (BROADCASTS,))
+
+        ids = [self.chatting.id, self.tracking.id]
+        self.assertEqual(online_user_ids(ids, scope=BROADCASTS), set())
+        self.assertEqual(online_user_ids(ids), {str(self.tracking.id)})
+
+
+# ======================================================
+# QUERY BUDGETS
+# ======================================================
+class DivisionQueryBudgetTests(TestCase):
+    """List endpoints run a fixed number of queries whatever the page size (no N+1)."""
+
+    def setUp(self):
+        cache.clear()
+        self.division = Division.objects.create(name="Budget Division")
+        self.admin = make_user("admin@test.local", role="SUPERADMIN")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_employees(self, count):
+        for _ in range(count):
+            n = User.objects.count()
+            user = User.objects.create(email=f"employee{n}@test.local", name=f"Employee {n}", role="EMPLOYEE")
+            EmployeeProfile.objects.create(user=user, admin=self.admin, division=self.division)
+
+    def test_division_employees(self):
+        url = f"/api/divisions/{self.division.id}/employees/"
+        for size in (3, 25):
+            self.add_employees(size)
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,116 @@
+# FCM device tokens: registration with a per-user cap, a cached
+# user -> tokens map for the push dispatcher, and stale-token expiry.
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FCMToken
+
+TOKENS_KEY = "fcm_tokens:{}"
+TOKENS_TTL = 600
+# devices kept per user; registering another drops the least recently seen
+MAX_TOKENS_PER_USER = getattr(settings, "FCM_MAX_TOKENS_PER_USER", 5)
+
+
+def get_cache():
+    return caches["tiered"]
+
+
+def forget_tokens(user_ids):
+    keys = [TOKENS_KEY.format(user_id) for user_id in user_ids if user_id]
+    if keys:
+        get_cache().delete_many(keys)
+
+
+def user_tokens(user_ids):
+    """{user_id (str): [token, ...]} for `user_ids`; misses cost one query."""
+    cache = get_cache()
+    keys = {TOKENS_KEY.format(user_id): str(user_id) for user_id in user_ids}
+    cached = cache.get_many(list(keys))
+
+    result = {keys[key]: tokens for key, tokens in cached.items()}
+    missing = [user_id for key, user_id in keys.items() if key not in cached]
+
+    if missing:
+        loaded = {user_id: [] for user_id in missing}
+        for user_id, token in FCMToken.objects.filter(
+            user_id__in=missing
+        ).values_list("user_id", "token"):
+            loaded[str(user_id)].append(token)
+
+        cache.set_many(
+            {TOKENS_KEY.format(user_id): tokens for user_id, tokens in loaded.items()},
+            TOKENS_TTL,
+        )
+        result.update(loaded)
+
+    return result
+
+
+def register_tokens(user, devices):
+    """
+    Upsert [{"token", "device_type"}, ...] for `user` in one statement,
+    then trim the user to MAX_TOKENS_PER_USER most recently seen tokens.
+    Returns the number of distinct tokens registered.
+    """
+    now = timezone.now()
+    # ON CONFLICT DO UPDATE can't touch one row twice: last entry wins
+    devices = list({device["token"]: device for device in devices}.values())
+    tokens = [device["token"] for device in devices]
+
+    with transaction.atomic():
+        # a token moving between accounts (shared device) invalidates both
+        previous_owners = set(FCMToken.objects.filter(
+            token__in=tokens
+        ).exclude(user_id=user.id).values_list("user_id", flat=True))
+
+        FCMToken.objects.bulk_create(
+            [
+                FCMToken(
+                    user_id=user.id,
+                    token=device["token"],
+                    device_type=device["device_type"],
+                    last_seen_at=now,
+                )
+                for device in devices
+            ],
+            update_conflicts=True,
+            unique_fields=["token"],
+            update_fields=["user", "device_type", "last_seen_at"],
+        )
+
+        stale = FCMToken.objects.filter(user_id=user.id).order_by(
+            "-last_seen_at", "-id"
+        ).values_list("id", flat=True)[MAX_TOKENS_PER_USER:]
+        FCMToken.objects.filter(id__in=list(stale)).delete()
+
+    forget_tokens(previous_owners | {user.id})
+    return len(devices)
+
+
+def prune_tokens(tokens):
+    """Delete dead tokens (reported by FCM); returns how many were removed."""
+    rows = FCMToken.objects.filter(token__in=tokens)
+    user_ids = set(rows.values_list("user_id", flat=True))
+    deleted, _ = rows.delete()
+    forget_tokens(user_ids)
+    return deleted
+
+
+def expire_tokens(days, batch_size=1000):
+    """Delete tokens not registered for `days` days, in batches. Returns the count."""
+    cutoff = timezone.now() - timedelta(days=days)
+    total = 0
+    while True:
+        batch = list(FCMToken.objects.filter(
+            last_seen_at__lt=cutoff
+        ).values_list("id", "user_id")[:batch_size])
+        if not batch:
+            return total
+
+        FCMToken.objects.filter(id__in=[pk for pk, _ in batch]).delete()
+        forget_tokens({user_id for _, user_id in batch})
+        total += len(batch)
@@ -5,6 +5,7 @@ from .views import (
     UserViewSet,
     DivisionListAPIView,
     DivisionEmployeeAPIView,
+    DivisionPresenceAPIView,
     SaveFCMTokenAPIView,
 )
 
@@ -19,5 +20,6 @@ urlpatterns = [
     path("divisions/",DivisionListAPIView.as_view(),name="division-list"),
     path("divisions/<int:division_id>/employees/",DivisionEmployeeAPIView.as_view(),name="division-employees"
     ),
+    path("divisions/<int:division_id>/presence/",DivisionPresenceAPIView.as_view(),name="division-presence"),
     path("fcm-token/",SaveFCMTokenAPIView.as_view(),name="save-fcm-token"),
 ]
@@ -1,12 +1,14 @@
 from rest_framework.viewsets import ModelViewSet
-from .models import User,Division,FCMToken
+from .models import User,Division,EmployeeProfile
+from .presence import presence
+from .tokens import register_tokens
 from .serializers import UserCreateSerializer,DivisionSerializer,EmployeeMiniSerializer,FCMTokenSerializer
-from .permissions import IsSuperAdmin,IsAdmin
+from .permissions import IsSuperAdmin,IsAdminOrSuperAdmin
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiTypes
 
 class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
@@ -25,12 +27,12 @@ def perform_update(self, serializer):
 
 class DivisionListAPIView(ListAPIView):
     serializer_class = DivisionSerializer
-    permission_classes = [IsAdmin,IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin]
     queryset = Division.objects.all()
 
 class DivisionEmployeeAPIView(ListAPIView):
     serializer_class = EmployeeMiniSerializer
-    permission_classes = [IsAdmin,IsSuperAdmin]
+    permission_classes = [IsAdminOrSuperAdmin]
 
     def get_queryset(self):
         division_id = self.kwargs["division_id"]
@@ -39,13 +41,33 @@ class DivisionEmployeeAPIView(ListAPIView):
         qs = User.objects.filter(
             profile__division_id=division_id,
             role="EMPLOYEE"
-        )
+        ).select_related("profile__division").only(
+            "id", "name", "email", "profile__division", "profile__division__name"
+        ).order_by("name")
 
         if user.role == "ADMIN":
             qs = qs.filter(profile__admin=user)
 
         return qs
 
+class DivisionPresenceAPIView(APIView):
+    permission_classes = [IsAdminOrSuperAdmin]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Online state and last seen of every employee in the division (one cache round trip)."
+    )
+    def get(self, request, division_id):
+        profiles = EmployeeProfile.objects.filter(division_id=division_id)
+        if request.user.role == "ADMIN":
+            profiles = profiles.filter(admin_id=request.user.id)
+
+        states = presence(profiles.values_list("user_id", flat=True))
+        return Response([
+            {"user_id": user_id, **state}
+            for user_id, state in states.items()
+        ])
+
 # Add this import at the top
 
 
@@ -54,19 +76,16 @@ class SaveFCMTokenAPIView(APIView):
 
     # This tells Swagger to use FCMTokenSerializer for the request body
     @extend_schema(
-        request=FCMTokenSerializer,
-        responses={200: {"type": "object", "properties": {"status": {"type": "string"}}}}
+        request=FCMTokenSerializer(many=True),
+        responses={200: {"type": "object", "properties": {"status": {"type": "string"}}}},
+        description="Register one device token or a list of them; refreshes their last-seen time."
     )
     def post(self, request):
-        serializer = FCMTokenSerializer(data=request.data)
+        many = isinstance(request.data, list)
+        serializer = FCMTokenSerializer(data=request.data, many=many)
         serializer.is_valid(raise_exception=True)
 
-        FCMToken.objects.update_or_create(
-            token=serializer.validated_data["token"],
-            defaults={
-                "user": request.user,
-                "device_type": serializer.validated_data["device_type"]
-            }
-        )
+        devices = serializer.validated_data if many else [serializer.validated_data]
+        count = register_tokens(request.user, devices)
 
-        return Response({"status": "token_saved"})
\ No newline at end of file
+        return Response({"status": "token_saved", "count": count})